@@ -2,15 +2,13 @@
 Views for the admin_portal app.
 """
 from datetime import datetime, timedelta
-from django.db.models import Count, Sum, Avg, Q
+from django.db.models import Count, Sum, F, Q
 from django.contrib.auth import get_user_model
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from health_records.models import (
-    WorkoutLog, MealLog, WaterLog, SleepLog, VitalsLog,
-    MedicationLog, MoodLog, HealthGoal
-)
+from health_records.models import WorkoutLog, MealLog, WaterLog, DailyRollup
+from health_records.cache import response_cache
 from .models import AuditLog, SystemMetric, SystemSetting, SystemNotification
 from .serializers import (
     AuditLogSerializer, SystemMetricSerializer, SystemSettingSerializer,
@@ -432,14 +430,34 @@ class DashboardViewSet(viewsets.ViewSet):
             last_login__date__gte=month_ago
         ).count()
         
-        # Health record statistics
-        total_workout_logs = WorkoutLog.objects.count()
-        total_meal_logs = MealLog.objects.count()
-        total_water_logs = WaterLog.objects.count()
-        total_sleep_logs = SleepLog.objects.count()
-        total_vitals_logs = VitalsLog.objects.count()
-        total_medication_logs = MedicationLog.objects.count()
-        total_mood_logs = MoodLog.objects.count()
+        # Health record statistics, summed from the per-user daily rollups
+        # in a single aggregate query
+        record_count = (
+            F('meal_count') + F('workout_count') + F('water_count') + F('sleep_count') +
+            F('vitals_count') + F('medication_taken') + F('medication_missed') + F('mood_count')
+        )
+        
+        record_totals = DailyRollup.objects.aggregate(
+            workout_logs=Sum('workout_count'),
+            meal_logs=Sum('meal_count'),
+            water_logs=Sum('water_count'),
+            sleep_logs=Sum('sleep_count'),
+            vitals_logs=Sum('vitals_count'),
+            medication_logs=Sum(F('medication_taken') + F('medication_missed')),
+            mood_logs=Sum('mood_count'),
+            records_today=Sum(record_count, filter=Q(date=today)),
+            records_week=Sum(record_count, filter=Q(date__gte=week_ago)),
+            records_month=Sum(record_count, filter=Q(date__gte=month_ago)),
+        )
+        record_totals = {key: value or 0 for key, value in record_totals.items()}
+        
+        total_workout_logs = record_totals['workout_logs']
+        total_meal_logs = record_totals['meal_logs']
+        total_water_logs = record_totals['water_logs']
+        total_sleep_logs = record_totals['sleep_logs']
+        total_vitals_logs = record_totals['vitals_logs']
+        total_medication_logs = record_totals['medication_logs']
+        total_mood_logs = record_totals['mood_logs']
         
         total_health_records = (
             total_workout_logs + total_meal_logs + total_water_logs + 
@@ -447,38 +465,9 @@ class DashboardViewSet(viewsets.ViewSet):
             total_mood_logs
         )
         
-        # Records today
-        records_today = (
-            WorkoutLog.objects.filter(date=today).count() +
-            MealLog.objects.filter(date=today).count() +
-            WaterLog.objects.filter(date=today).count() +
-            SleepLog.objects.filter(end_time__date=today).count() +
-            VitalsLog.objects.filter(date=today).count() +
-            MedicationLog.objects.filter(date=today).count() +
-            MoodLog.objects.filter(date=today).count()
-        )
-        
-        # Records this week
-        records_week = (
-            WorkoutLog.objects.filter(date__gte=week_ago).count() +
-            MealLog.objects.filter(date__gte=week_ago).count() +
-            WaterLog.objects.filter(date__gte=week_ago).count() +
-            SleepLog.objects.filter(end_time__date__gte=week_ago).count() +
-            VitalsLog.objects.filter(date__gte=week_ago).count() +
-            MedicationLog.objects.filter(date__gte=week_ago).count() +
-            MoodLog.objects.filter(date__gte=week_ago).count()
-        )
-        
-        # Records this month
-        records_month = (
-            WorkoutLog.objects.filter(date__gte=month_ago).count() +
-            MealLog.objects.filter(date__gte=month_ago).count() +
-            WaterLog.objects.filter(date__gte=month_ago).count() +
-            SleepLog.objects.filter(end_time__date__gte=month_ago).count() +
-            VitalsLog.objects.filter(date__gte=month_ago).count() +
-            MedicationLog.objects.filter(date__gte=month_ago).count() +
-            MoodLog.objects.filter(date__gte=month_ago).count()
-        )
+        records_today = record_totals['records_today']
+        records_week = record_totals['records_week']
+        records_month = record_totals['records_month']
         
         # System health
         # This would normally be based on more sophisticated monitoring
@@ -680,4 +669,11 @@ class DashboardViewSet(viewsets.ViewSet):
             'start_date': start_date.strftime('%Y-%m-%d'),
             'end_date': end_date.strftime('%Y-%m-%d'),
             'data_volume': all_dates
-        })
\ No newline at end of file
+        })
+    
+    @action(detail=False, methods=['get'])
+    def cache_stats(self, request):
+        """
+        Hit and miss counters of this process's summary and report cache.
+        """
+        return Response(response_cache.stats())
@@ -0,0 +1,206 @@
+"""
+Streaming anomaly detection for VitalsLog readings.
+
+``VitalsStatistic`` keeps a running count, mean and M2 per user and field
+(Welford's method). Each new reading is scored against the statistics of
+the readings before it and then folded in, so a save reads and writes the
+user's few statistic rows however long their history is. Readings more
+than ``ANOMALY_DETECTION['Z_THRESHOLD']`` standard deviations from the mean
+create an ``anomaly`` Insight.
+"""
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from health_records.models import VitalsLog
+from .models import Insight, VitalsStatistic
+
+# field -> (label, unit) of every VitalsLog field with running statistics
+VITALS_FIELDS = {
+    'heart_rate': ('heart rate', 'bpm'),
+    'blood_pressure_systolic': ('systolic blood pressure', 'mmHg'),
+    'blood_pressure_diastolic': ('diastolic blood pressure', 'mmHg'),
+    'temperature': ('body temperature', '°C'),
+    'oxygen_saturation': ('blood oxygen', '%'),
+    'glucose': ('blood glucose', 'mg/dL'),
+    'weight': ('weight', 'kg'),
+}
+
+
+def reading(log, field):
+    """
+    Return ``log``'s value for ``field`` as a float, or None.
+    """
+    value = getattr(log, field)
+    return float(value) if value is not None else None
+
+
+def _add(statistic, value):
+    statistic.count += 1
+    delta = value - statistic.mean
+    statistic.mean += delta / statistic.count
+    statistic.m2 += delta * (value - statistic.mean)
+
+
+def _remove(statistic, value):
+    if statistic.count <= 1:
+        statistic.count, statistic.mean, statistic.m2 = 0, 0.0, 0.0
+        return
+
+    previous_mean = statistic.mean
+    statistic.count -= 1
+    statistic.mean = (previous_mean * (statistic.count + 1) - value) / statistic.count
+    statistic.m2 = max(0.0, statistic.m2 - (value - previous_mean) * (value - statistic.mean))
+
+
+def z_score(statistic, value):
+    """
+    Distance of ``value`` from the running mean in sample standard
+    deviations, or None while the spread is unknown or zero.
+    """
+    # Rounding can leave a tiny M2 behind for constant readings.
+    if statistic.count < 2 or statistic.m2 <= 1e-12 * statistic.count * max(1.0, statistic.mean ** 2):
+        return None
+    return (value - statistic.mean) / math.sqrt(statistic.m2 / (statistic.count - 1))
+
+
+def _anomaly(log, field, value, statistic, score, threshold):
+    label, unit = VITALS_FIELDS[field]
+    direction = 'above' if score > 0 else 'below'
+    return Insight(
+        user_id=log.user_id,
+        insight_type='anomaly',
+        title=f'Unusual {label} reading',
+        description=(
+            f"Your {label} of {value:g} {unit} on {log.date} is {abs(score):.1f} standard deviations "
+            f"{direction} your average of {statistic.mean:.1f} {unit}."
+        ),
+        data_points={
+            'vitals_log': log.pk,
+            'field': field,
+            'value': value,
+            'date': str(log.date),
+            'mean': statistic.mean,
+            'standard_deviation': math.sqrt(statistic.m2 / (statistic.count - 1)),
+            'z_score': score,
+            'threshold': threshold,
+        },
+    )
+
+
+def delete_anomalies(log, fields=None):
+    """
+    Delete the anomaly insights raised for ``log``, optionally only those
+    for some fields, e.g. because the reading was deleted or changed.
+    """
+    insights = Insight.objects.filter(user_id=log.user_id, insight_type='anomaly', data_points__vitals_log=log.pk)
+    if fields is not None:
+        insights = insights.filter(data_points__field__in=list(fields))
+    # Deleted through the queryset so the insight signals still fire.
+    insights.delete()
+
+
+def _locked_statistics(user_id):
+    """
+    Return the user's statistic rows by field, locked for update and
+    created first if missing.
+    """
+    statistics = VitalsStatistic.objects.select_for_update().filter(user_id=user_id)
+    rows = {statistic.field: statistic for statistic in statistics}
+    if len(rows) < len(VITALS_FIELDS):
+        VitalsStatistic.objects.bulk_create(
+            [VitalsStatistic(user_id=user_id, field=field) for field in VITALS_FIELDS if field not in rows],
+            ignore_conflicts=True
+        )
+        rows = {statistic.field: statistic for statistic in statistics.all()}
+    return rows
+
+
+def update_vitals_statistics(user_id, added=(), removed=(), detect_fields=None):
+    """
+    Take ``removed`` readings out of the user's running statistics, then
+    score and fold in ``added`` ones in order. ``detect_fields`` limits
+    which fields are scored. Returns the anomaly insights created.
+    """
+    config = getattr(settings, 'ANOMALY_DETECTION', {})
+    threshold = config.get('Z_THRESHOLD', 3.0)
+    min_samples = max(2, config.get('MIN_SAMPLES', 10))
+    fields = set(config.get('FIELDS', ()))
+    if detect_fields is not None:
+        fields &= set(detect_fields)
+
+    with transaction.atomic():
+        statistics = _locked_statistics(user_id)
+        changed = set()
+        anomalies = []
+
+        for log in removed:
+            for field in VITALS_FIELDS:
+                value = reading(log, field)
+                if value is not None:
+                    _remove(statistics[field], value)
+                    changed.add(field)
+
+        for log in added:
+            for field in VITALS_FIELDS:
+                value = reading(log, field)
+                if value is None:
+                    continue
+
+                statistic = statistics[field]
+                if field in fields and statistic.count >= min_samples:
+                    score = z_score(statistic, value)
+                    if score is not None and abs(score) > threshold:
+                        anomalies.append(_anomaly(log, field, value, statistic, score, threshold))
+
+                _add(statistic, value)
+                changed.add(field)
+
+        if changed:
+            now = timezone.now()
+            for field in changed:
+                statistics[field].updated_at = now
+            VitalsStatistic.objects.bulk_update(
+                [statistics[field] for field in changed], ['count', 'mean', 'm2', 'updated_at']
+            )
+
+        # Saved one by one so the insight signals invalidate cached reports.
+        for insight in anomalies:
+            insight.save()
+
+    return anomalies
+
+
+def rebuild_vitals_statistics(user_ids=None):
+    """
+    Recompute the running statistics from the stored readings, optionally
+    only for some users, folding them in one at a time as saves do.
+    Returns the number of rows written.
+    """
+    logs = VitalsLog.objects.all()
+    existing = VitalsStatistic.objects.all()
+    if user_ids is not None:
+        logs = logs.filter(user_id__in=user_ids)
+        existing = existing.filter(user_id__in=user_ids)
+
+    rows = []
+    statistics = {}
+    readings = logs.order_by('user_id', 'pk').values_list('user_id', *VITALS_FIELDS)
+    for user_id, *values in readings.iterator(chunk_size=2000):
+        if not statistics or rows[-1].user_id != user_id:
+            statistics = {
+                field: VitalsStatistic(user_id=user_id, field=field, count=0, mean=0.0, m2=0.0)
+                for field in VITALS_FIELDS
+            }
+            rows.extend(statistics.values())
+        for field, value in zip(VITALS_FIELDS, values):
+            if value is not None:
+                _add(statistics[field], float(value))
+
+    with transaction.atomic():
+        existing.delete()
+        VitalsStatistic.objects.bulk_create(rows, batch_size=1000)
+
+    return len(rows)
@@ -0,0 +1,161 @@
+"""
+Pairwise correlations between daily metrics.
+
+The metrics are aligned into one ``days x metrics`` matrix with missing
+days as NaN. ``correlation_matrix`` then computes the Pearson coefficients
+for every pair at once from masked matrix products, using the days on
+which both metrics of a pair have data. Spearman ranks each pair over
+those same days, so it is computed pair by pair.
+"""
+import numpy as np
+
+from .series import get_series
+
+DEFAULT_METRICS = (
+    'sleep_duration', 'sleep_quality', 'mood', 'energy', 'stress',
+    'calories', 'water', 'workout_minutes', 'weight', 'heart_rate',
+)
+
+
+def daily_matrix(user, metrics, start_date, end_date):
+    """
+    Return a float array with one row per day from ``start_date`` to
+    ``end_date`` and one column per metric, NaN where there is no data.
+    """
+    rows = get_series(user, metrics, start_date, end_date, 'day')
+    return np.array(
+        [[row[metric] for metric in metrics] for row in rows],
+        dtype=np.float64
+    ).reshape(len(rows), len(metrics))
+
+
+def _ranks(values):
+    """
+    Average ranks of a 1-d array without missing values, ties sharing the
+    mean of their positions.
+    """
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    starts = np.cumsum(counts) - counts
+    return (starts + (counts + 1) / 2)[inverse]
+
+
+def _center(values, mask):
+    counts = mask.sum(axis=0)
+    totals = np.where(mask, values, 0.0).sum(axis=0)
+    means = np.divide(totals, counts, out=np.zeros(values.shape[1]), where=counts > 0)
+    return np.where(mask, values - means, 0.0)
+
+
+def _pearson(left, right, min_points):
+    """
+    Pearson coefficient of every column of ``left`` with every column of
+    ``right`` over the rows where both are present, with the row counts.
+    """
+    left_mask = ~np.isnan(left)
+    right_mask = ~np.isnan(right)
+    # Centering first keeps the sums of squares small.
+    left = _center(left, left_mask)
+    right = _center(right, right_mask)
+    left_mask = left_mask.astype(np.float64)
+    right_mask = right_mask.astype(np.float64)
+
+    counts = left_mask.T @ right_mask
+    squares_left = (left ** 2).T @ right_mask
+    squares_right = left_mask.T @ (right ** 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sum_left = left.T @ right_mask
+        sum_right = left_mask.T @ right
+        covariance = left.T @ right - sum_left * sum_right / counts
+        variance_left = squares_left - sum_left ** 2 / counts
+        variance_right = squares_right - sum_right ** 2 / counts
+        coefficients = covariance / np.sqrt(variance_left * variance_right)
+
+    # Pairs with too few shared days, or where a metric is constant over
+    # them, have no coefficient.
+    undefined = (
+        (counts < min_points)
+        | ~(variance_left > 1e-10 * squares_left)
+        | ~(variance_right > 1e-10 * squares_right)
+    )
+    coefficients = np.clip(coefficients, -1.0, 1.0)
+    coefficients[undefined] = np.nan
+    return coefficients, counts.astype(np.int64)
+
+
+def _spearman(left, right, min_points):
+    """
+    Spearman coefficient of every column of ``left`` with every column of
+    ``right``: the Pearson coefficient of their ranks among the rows where
+    both are present.
+    """
+    left_valid = ~np.isnan(left)
+    right_valid = ~np.isnan(right)
+    symmetric = left is right
+    coefficients = np.full((left.shape[1], right.shape[1]), np.nan)
+
+    for row in range(left.shape[1]):
+        for column in range(right.shape[1]):
+            if symmetric and column < row:
+                coefficients[row, column] = coefficients[column, row]
+                continue
+            both = left_valid[:, row] & right_valid[:, column]
+            if both.sum() < min_points:
+                continue
+            # Ranks of n values always average (n + 1) / 2.
+            middle = (both.sum() + 1) / 2
+            left_ranks = _ranks(left[both, row]) - middle
+            right_ranks = _ranks(right[both, column]) - middle
+            variance = np.dot(left_ranks, left_ranks) * np.dot(right_ranks, right_ranks)
+            if variance > 0:
+                coefficients[row, column] = np.clip(np.dot(left_ranks, right_ranks) / np.sqrt(variance), -1.0, 1.0)
+    return coefficients
+
+
+def correlation_matrix(values, lag=0, min_points=5):
+    """
+    Pearson and Spearman coefficients between the columns of ``values``.
+
+    With ``lag`` the row metric on day ``t`` is compared with the column
+    metric on day ``t + lag``, so the matrices are no longer symmetric.
+    Returns ``(pearson, spearman, counts)``; undefined coefficients are NaN.
+    """
+    if lag:
+        left, right = values[:-lag], values[lag:]
+    else:
+        left = right = values
+
+    pearson, counts = _pearson(left, right, min_points)
+    spearman = _spearman(left, right, min_points)
+    return pearson, spearman, counts
+
+
+def coefficient_lists(matrix):
+    """
+    Return ``matrix`` as nested lists rounded to four places, with None for
+    undefined coefficients.
+    """
+    return [
+        [None if np.isnan(value) else round(value, 4) for value in row]
+        for row in matrix.tolist()
+    ]
+
+
+def strongest_pairs(metrics, pearson, spearman, counts, lag=0):
+    """
+    List the metric pairs with a Pearson coefficient, strongest first.
+    Without lag each unordered pair appears once.
+    """
+    rows, columns = np.nonzero(~np.isnan(pearson))
+    pairs = [
+        {
+            'metric1': metrics[row],
+            'metric2': metrics[column],
+            'pearson': round(float(pearson[row, column]), 4),
+            'spearman': None if np.isnan(spearman[row, column]) else round(float(spearman[row, column]), 4),
+            'days': int(counts[row, column]),
+        }
+        for row, column in zip(rows.tolist(), columns.tolist())
+        if lag or row < column
+    ]
+    pairs.sort(key=lambda pair: -abs(pair['pearson']))
+    return pairs
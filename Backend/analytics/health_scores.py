@@ -0,0 +1,326 @@
+"""
+Health score calculation.
+
+``score_days`` feeds the rollups, latest vitals readings and goals of any
+number of days to ``analytics.scoring.compute_scores`` as arrays.
+``calculate_health_scores`` scores a range of days for many users from a
+few grouped queries and writes the HealthScore rows in bulk, for backfills
+after imports; ``score_users_for_day`` does the same for one day of the
+nightly job with a single read and a single write.
+
+Every score stores an input fingerprint: a hash of the day's rollup
+revision, the goals and the scoring version. Any change to the day's logs
+increments the rollup revision, so a matching fingerprint means the stored
+score is still current and the logs need not be read.
+"""
+import hashlib
+import math
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from health_records.models import DailyRollup, VitalsLog
+from health_records.versions import bump_data_versions
+from users.models import UserPreference
+from .models import HealthScore
+from .scoring import SCORING_VERSION, compute_scores
+
+# Longest range a single calculate_range request may score.
+MAX_RANGE_DAYS = 3660
+
+DEFAULT_CALORIE_GOAL = UserPreference._meta.get_field('daily_calorie_goal').default
+DEFAULT_WATER_GOAL = UserPreference._meta.get_field('daily_water_goal').default
+
+SCORE_FIELDS = (
+    'overall_score', 'nutrition_score', 'activity_score', 'sleep_score',
+    'hydration_score', 'vitals_score', 'mood_score',
+)
+
+SCORE_PLACES = Decimal('0.01')
+
+VITALS_SCORE_FIELDS = ('heart_rate', 'blood_pressure_systolic', 'blood_pressure_diastolic')
+
+
+def _details(rollup, vitals, daily_calorie_goal, daily_water_goal):
+    avg_mood = float(rollup.avg_mood)
+    return {
+        'nutrition': {
+            'total_calories': rollup.calories_consumed,
+            'daily_calorie_goal': daily_calorie_goal,
+            'protein_sum': float(rollup.protein) or None,
+            'carbs_sum': float(rollup.carbs) or None,
+            'fat_sum': float(rollup.fat) or None,
+        },
+        'activity': {
+            'total_duration': rollup.workout_minutes,
+            'calories_burned': rollup.calories_burned,
+        },
+        'sleep': {
+            'duration': float(rollup.avg_sleep_duration) or None,
+            'quality': float(rollup.avg_sleep_quality) or None,
+        },
+        'hydration': {
+            'total_water': rollup.water_intake,
+            'daily_water_goal': daily_water_goal,
+        },
+        'vitals': {
+            field: vitals[field] or None for field in VITALS_SCORE_FIELDS
+        } if vitals else None,
+        'mood': {
+            'average_mood': avg_mood,
+        } if avg_mood else None,
+    }
+
+
+def score_days(days):
+    """
+    Score a list of ``(rollup, vitals, daily_calorie_goal,
+    daily_water_goal)`` tuples in one ``compute_scores`` call. ``vitals``
+    is a dict of the day's latest heart rate and blood pressure reading, or
+    None. Returns one dict per day with the score fields and calculation
+    details; vitals and mood scores are None without data.
+    """
+    # Zero goals are treated as unset rather than dividing by zero.
+    days = [
+        (rollup, vitals, calorie_goal or DEFAULT_CALORIE_GOAL, water_goal or DEFAULT_WATER_GOAL)
+        for rollup, vitals, calorie_goal, water_goal in days
+    ]
+    vitals_values = [
+        [vitals[field] or 0 if vitals else 0 for field in VITALS_SCORE_FIELDS]
+        for _, vitals, _, _ in days
+    ]
+    heart_rate, systolic, diastolic = np.array(vitals_values, dtype=np.float64).reshape(len(days), 3).T
+
+    scores = compute_scores(
+        calories=[rollup.calories_consumed for rollup, _, _, _ in days],
+        protein=[float(rollup.protein) for rollup, _, _, _ in days],
+        carbs=[float(rollup.carbs) for rollup, _, _, _ in days],
+        fat=[float(rollup.fat) for rollup, _, _, _ in days],
+        workout_minutes=[rollup.workout_minutes for rollup, _, _, _ in days],
+        sleep_duration=[float(rollup.avg_sleep_duration) for rollup, _, _, _ in days],
+        sleep_quality=[float(rollup.avg_sleep_quality) for rollup, _, _, _ in days],
+        water=[rollup.water_intake for rollup, _, _, _ in days],
+        heart_rate=heart_rate,
+        blood_pressure_systolic=systolic,
+        blood_pressure_diastolic=diastolic,
+        mood=[float(rollup.avg_mood) for rollup, _, _, _ in days],
+        calorie_goal=[calorie_goal for _, _, calorie_goal, _ in days],
+        water_goal=[water_goal for _, _, _, water_goal in days],
+    )
+    columns = {field: scores[field].tolist() for field in SCORE_FIELDS}
+
+    results = []
+    for index, day in enumerate(days):
+        result = {
+            field: None if math.isnan(values[index]) else values[index]
+            for field, values in columns.items()
+        }
+        result['calculation_details'] = _details(*day)
+        results.append(result)
+    return results
+
+
+def score_day(rollup, vitals, daily_calorie_goal, daily_water_goal):
+    """
+    Score a single day; see ``score_days``.
+    """
+    return score_days([(rollup, vitals, daily_calorie_goal, daily_water_goal)])[0]
+
+
+def input_fingerprint(rollup, daily_calorie_goal, daily_water_goal):
+    """
+    Fingerprint of everything a day's score is calculated from. ``rollup``
+    may be the unsaved empty rollup of a day without logs.
+    """
+    return hashlib.sha256('|'.join([
+        str(SCORING_VERSION),
+        str(rollup.revision),
+        rollup.updated_at.isoformat() if rollup.updated_at else '',
+        str(daily_calorie_goal or DEFAULT_CALORIE_GOAL),
+        str(daily_water_goal or DEFAULT_WATER_GOAL),
+    ]).encode()).hexdigest()
+
+
+def latest_vitals(user_ids, start_date, end_date):
+    """
+    Return the latest vitals reading of each (user, date) in the range as
+    a dict of the fields ``score_day`` uses, read with one query.
+    """
+    rows = (
+        VitalsLog.objects
+        .filter(user_id__in=user_ids, date__range=(start_date, end_date))
+        .order_by('user_id', 'date', 'time', 'pk')
+        .values_list('user_id', 'date', *VITALS_SCORE_FIELDS)
+    )
+    # Ascending order, so the last reading of each day wins.
+    return {
+        (row[0], row[1]): dict(zip(VITALS_SCORE_FIELDS, row[2:]))
+        for row in rows
+    }
+
+
+def user_goals(user_ids):
+    """
+    Return ``{user_id: (daily_calorie_goal, daily_water_goal)}``, with the
+    defaults for users without preferences.
+    """
+    goals = dict.fromkeys(user_ids, (DEFAULT_CALORIE_GOAL, DEFAULT_WATER_GOAL))
+    for user_id, calorie_goal, water_goal in UserPreference.objects.filter(
+        user_id__in=user_ids
+    ).values_list('user_id', 'daily_calorie_goal', 'daily_water_goal'):
+        goals[user_id] = (calorie_goal, water_goal)
+    return goals
+
+
+def apply_scores(health_score, scores):
+    """
+    Copy the output of ``score_day`` onto a HealthScore instance, rounded
+    as stored so a fresh score serializes like a stored one.
+    """
+    for field in SCORE_FIELDS:
+        value = scores[field]
+        setattr(health_score, field, None if value is None else Decimal(value).quantize(SCORE_PLACES))
+    health_score.calculation_details = scores['calculation_details']
+
+
+def calculate_health_scores(user_ids, start_date, end_date, batch_size=500):
+    """
+    Score every day from ``start_date`` to ``end_date`` that has logs, for
+    each user in ``user_ids``, and upsert the HealthScore rows.
+
+    Rollups, vitals, goals and existing scores are each read with one
+    query; existing rows are written with ``bulk_update`` and new ones with
+    ``bulk_create``, which updates rows created concurrently on the
+    ``(user, calculation_date)`` key. Days whose input fingerprint matches
+    the stored score are skipped. No recommendations are generated.
+    Returns the number of scores written.
+    """
+    user_ids = list(user_ids)
+    goals = user_goals(user_ids)
+    vitals = latest_vitals(user_ids, start_date, end_date)
+    rollups = {
+        (rollup.user_id, rollup.date): rollup
+        for rollup in DailyRollup.objects.filter(user_id__in=user_ids, date__range=(start_date, end_date))
+    }
+
+    days = {key for key, rollup in rollups.items() if rollup.record_count} | set(vitals)
+    if not days:
+        return 0
+
+    existing = {
+        (score.user_id, score.calculation_date): score
+        for score in HealthScore.objects.filter(
+            user_id__in=user_ids, calculation_date__range=(start_date, end_date)
+        ).defer('calculation_details')
+    }
+
+    inputs = {}
+    for user_id, day in sorted(days):
+        rollup = rollups.get((user_id, day)) or DailyRollup(user_id=user_id, date=day)
+        fingerprint = input_fingerprint(rollup, *goals[user_id])
+        health_score = existing.get((user_id, day))
+        if health_score is None or health_score.input_fingerprint != fingerprint:
+            inputs[(user_id, day)] = (rollup, vitals.get((user_id, day)), *goals[user_id]), fingerprint
+    if not inputs:
+        return 0
+
+    scored = score_days([day_inputs for day_inputs, _ in inputs.values()])
+
+    now = timezone.now()
+    updated, created = [], []
+    for ((user_id, day), (_, fingerprint)), scores in zip(inputs.items(), scored):
+        health_score = existing.get((user_id, day))
+        if health_score is None:
+            health_score = HealthScore(user_id=user_id, calculation_date=day)
+            created.append(health_score)
+        else:
+            updated.append(health_score)
+        apply_scores(health_score, scores)
+        health_score.input_fingerprint = fingerprint
+        health_score.updated_at = now
+
+    update_fields = [*SCORE_FIELDS, 'calculation_details', 'input_fingerprint', 'updated_at']
+    with transaction.atomic():
+        HealthScore.objects.bulk_update(updated, update_fields, batch_size=batch_size)
+        HealthScore.objects.bulk_create(
+            created,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['user', 'calculation_date'],
+            update_fields=update_fields
+        )
+
+    # Bulk writes skip the signals that invalidate cached reports.
+    bump_data_versions({user_id for user_id, _ in inputs})
+    return len(inputs)
+
+
+def score_users_for_day(user_ids, day, batch_size=None):
+    """
+    Score ``day`` for every user in ``user_ids`` with logs on it.
+
+    The rollups are read with one query that also joins the goals and
+    picks the latest vitals reading and stored fingerprint, and the
+    HealthScore rows of days whose inputs changed are upserted with one
+    ``bulk_create``. No recommendations are generated. Returns the number
+    of scores written.
+    """
+    latest = (
+        VitalsLog.objects
+        .filter(user_id=OuterRef('user_id'), date=OuterRef('date'))
+        .order_by('-time', '-pk')
+    )
+    stored = HealthScore.objects.filter(user_id=OuterRef('user_id'), calculation_date=OuterRef('date'))
+    queryset = (
+        DailyRollup.objects
+        .filter(user_id__in=user_ids, date=day)
+        .annotate(
+            calorie_goal=F('user__preferences__daily_calorie_goal'),
+            water_goal=F('user__preferences__daily_water_goal'),
+            stored_fingerprint=Subquery(stored.values('input_fingerprint')[:1]),
+            **{f'latest_{field}': Subquery(latest.values(field)[:1]) for field in VITALS_SCORE_FIELDS}
+        )
+        .order_by('user_id')
+    )
+
+    rollups, fingerprints = [], []
+    for rollup in queryset:
+        fingerprint = input_fingerprint(rollup, rollup.calorie_goal, rollup.water_goal)
+        if rollup.record_count and fingerprint != rollup.stored_fingerprint:
+            rollups.append(rollup)
+            fingerprints.append(fingerprint)
+    if not rollups:
+        return 0
+
+    scored = score_days([
+        (
+            rollup,
+            {field: getattr(rollup, f'latest_{field}') for field in VITALS_SCORE_FIELDS}
+            if rollup.vitals_count else None,
+            rollup.calorie_goal,
+            rollup.water_goal
+        )
+        for rollup in rollups
+    ])
+
+    health_scores = []
+    for rollup, fingerprint, scores in zip(rollups, fingerprints, scored):
+        health_score = HealthScore(user_id=rollup.user_id, calculation_date=day, input_fingerprint=fingerprint)
+        apply_scores(health_score, scores)
+        health_scores.append(health_score)
+
+    with transaction.atomic():
+        HealthScore.objects.bulk_create(
+            health_scores,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['user', 'calculation_date'],
+            update_fields=[*SCORE_FIELDS, 'calculation_details', 'input_fingerprint', 'updated_at']
+        )
+        # Bulk writes skip the signals that invalidate cached reports.
+        bump_data_versions([rollup.user_id for rollup in rollups])
+
+    return len(health_scores)
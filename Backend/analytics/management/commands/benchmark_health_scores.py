@@ -0,0 +1,162 @@
+"""
+Check the vectorized scoring engine against the per-day health score
+formula and measure its throughput.
+"""
+import math
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.scoring import compute_scores
+
+SCORE_FIELDS = (
+    'overall_score', 'nutrition_score', 'activity_score', 'sleep_score',
+    'hydration_score', 'vitals_score', 'mood_score',
+)
+
+
+def reference_scores(calories, protein, carbs, fat, workout_minutes, sleep_duration, sleep_quality,
+                     water, heart_rate, blood_pressure_systolic, blood_pressure_diastolic, mood,
+                     calorie_goal, water_goal):
+    """
+    The per-day formula of ``HealthScoreViewSet.calculate`` before it moved
+    to ``analytics.scoring``, on plain numbers. Missing values are zero.
+    """
+    calorie_score = 100 - min(100, abs(calories - calorie_goal) / calorie_goal * 100)
+    nutrition_score = calorie_score
+    if protein and carbs and fat:
+        total_macros = protein + carbs + fat
+        protein_pct = (protein / total_macros) * 100
+        carbs_pct = (carbs / total_macros) * 100
+        fat_pct = (fat / total_macros) * 100
+        macro_balance_score = 100 - (
+            abs(protein_pct - 25) +
+            abs(carbs_pct - 50) +
+            abs(fat_pct - 25)
+        ) / 2
+        nutrition_score = (calorie_score + macro_balance_score) / 2
+
+    activity_score = min(100, workout_minutes / 30 * 100)
+
+    duration_score = 100 - min(100, abs(sleep_duration - 8) / 8 * 100)
+    quality_score = sleep_quality / 5 * 100 if sleep_quality else 0
+    sleep_score = (duration_score + quality_score) / 2 if sleep_duration else 0
+
+    hydration_score = min(100, water / water_goal * 100)
+
+    vitals_score = None
+    if heart_rate:
+        hr_score = 100 - min(100, abs(heart_rate - (60 + 100) / 2) / 20 * 100)
+        bp_score = None
+        if blood_pressure_systolic and blood_pressure_diastolic:
+            systolic_score = 100 - min(100, abs(blood_pressure_systolic - 120) / 20 * 100)
+            diastolic_score = 100 - min(100, abs(blood_pressure_diastolic - 80) / 10 * 100)
+            bp_score = (systolic_score + diastolic_score) / 2
+        vitals_score = hr_score if bp_score is None else (hr_score + bp_score) / 2
+
+    mood_score = mood / 5 * 100 if mood else None
+
+    components = [
+        (nutrition_score, 0.25),
+        (activity_score, 0.25),
+        (sleep_score, 0.2),
+        (hydration_score, 0.15),
+    ]
+    if vitals_score:
+        components.append((vitals_score, 0.1))
+    if mood_score:
+        components.append((mood_score, 0.05))
+
+    total_weight = sum(weight for _, weight in components)
+    overall_score = sum(score * (weight / total_weight) for score, weight in components)
+
+    return {
+        'overall_score': overall_score,
+        'nutrition_score': nutrition_score,
+        'activity_score': activity_score,
+        'sleep_score': sleep_score,
+        'hydration_score': hydration_score,
+        'vitals_score': vitals_score or None,
+        'mood_score': mood_score or None,
+    }
+
+
+def _sometimes_zero(rng, values, probability):
+    return np.where(rng.random(values.shape) < probability, 0, values)
+
+
+class Command(BaseCommand):
+    help = 'Check the vectorized health scoring engine against the per-day formula and report scores per second.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000,
+                            help='Users in the generated input.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Days per user in the generated input.')
+        parser.add_argument('--runs', type=int, default=5,
+                            help='Timed runs per implementation; the best one is reported.')
+
+    def handle(self, *args, **options):
+        inputs = self._inputs(options['users'], options['days'])
+        count = options['users'] * options['days']
+        vectorized = compute_scores(**inputs)
+
+        # Per-element scalars from the same float64 values the engine saw
+        flat = {
+            name: np.broadcast_to(values, (options['users'], options['days'])).ravel().tolist()
+            for name, values in inputs.items()
+        }
+        names = list(flat)
+        rows = [dict(zip(names, values)) for values in zip(*flat.values())]
+
+        started = time.perf_counter()
+        expected = [reference_scores(**row) for row in rows]
+        reference_time = time.perf_counter() - started
+
+        actual = {field: vectorized[field].ravel().tolist() for field in SCORE_FIELDS}
+        for index, scores in enumerate(expected):
+            for field in SCORE_FIELDS:
+                value = actual[field][index]
+                value = None if math.isnan(value) else value
+                if value != scores[field]:
+                    raise CommandError(
+                        f'{field} differs for {rows[index]}: {value!r} instead of {scores[field]!r}.'
+                    )
+
+        self.stdout.write(f'{count:,} user-days identical to the per-day formula.')
+
+        best = None
+        for _ in range(options['runs']):
+            started = time.perf_counter()
+            compute_scores(**inputs)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        self.stdout.write(f'Per-day formula  {count / reference_time:>14,.0f} scores/s')
+        self.stdout.write(f'compute_scores   {count / best:>14,.0f} scores/s')
+        self.stdout.write(self.style.SUCCESS(f'Scores identical; speedup {reference_time / best:.0f}x.'))
+
+    def _inputs(self, users, days):
+        """
+        Random days shaped ``(users, days)`` with goals per user, including
+        the zero and missing values that switch formula branches.
+        """
+        rng = np.random.default_rng(0)
+        shape = (users, days)
+        return {
+            'calories': _sometimes_zero(rng, rng.integers(800, 4000, shape), 0.1).astype(np.float64),
+            'protein': _sometimes_zero(rng, np.round(rng.uniform(10, 200, shape), 2), 0.15),
+            'carbs': _sometimes_zero(rng, np.round(rng.uniform(20, 400, shape), 2), 0.15),
+            'fat': _sometimes_zero(rng, np.round(rng.uniform(5, 150, shape), 2), 0.15),
+            'workout_minutes': _sometimes_zero(rng, rng.integers(5, 120, shape), 0.3).astype(np.float64),
+            'sleep_duration': _sometimes_zero(rng, np.round(rng.uniform(3, 12, shape), 2), 0.1),
+            'sleep_quality': _sometimes_zero(rng, rng.integers(1, 6, shape), 0.1).astype(np.float64),
+            'water': _sometimes_zero(rng, rng.integers(100, 4000, shape), 0.1).astype(np.float64),
+            'heart_rate': _sometimes_zero(rng, rng.integers(40, 180, shape), 0.5).astype(np.float64),
+            'blood_pressure_systolic': _sometimes_zero(rng, rng.integers(90, 180, shape), 0.5).astype(np.float64),
+            'blood_pressure_diastolic': _sometimes_zero(rng, rng.integers(50, 110, shape), 0.5).astype(np.float64),
+            'mood': _sometimes_zero(rng, rng.integers(1, 6, shape) / rng.integers(1, 4, shape), 0.3),
+            'calorie_goal': rng.integers(1200, 3500, (users, 1)).astype(np.float64),
+            'water_goal': rng.integers(1000, 4000, (users, 1)).astype(np.float64),
+        }
@@ -0,0 +1,48 @@
+"""
+Calculate HealthScore rows for a range of past days.
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+
+from analytics.health_scores import calculate_health_scores
+
+
+class Command(BaseCommand):
+    help = 'Calculate health scores for every day with logs in a date range (backfill after imports).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='users', default=[],
+                            help='Email of a user to score (repeatable). Defaults to all users.')
+        parser.add_argument('--start', required=True, help='First date to score (YYYY-MM-DD).')
+        parser.add_argument('--end', help='Last date to score (YYYY-MM-DD). Defaults to today.')
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Number of users scored per batch.')
+
+    def handle(self, *args, **options):
+        start_date = self._parse_date(options['start'])
+        end_date = self._parse_date(options['end']) if options['end'] else datetime.now().date()
+        if start_date > end_date:
+            raise CommandError('--start must not be after --end.')
+
+        users = get_user_model().objects.order_by('pk')
+        if options['users']:
+            users = users.filter(email__in=options['users'])
+        user_ids = list(users.values_list('pk', flat=True))
+
+        batch_size = options['batch_size']
+        scored = 0
+
+        for offset in range(0, len(user_ids), batch_size):
+            scored += calculate_health_scores(user_ids[offset:offset + batch_size], start_date, end_date)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Calculated {scored} health scores for {len(user_ids)} users.'
+        ))
+
+    def _parse_date(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid date "{value}". Use YYYY-MM-DD.')
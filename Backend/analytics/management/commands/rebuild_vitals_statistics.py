@@ -0,0 +1,25 @@
+"""
+Recompute the running VitalsLog statistics used for anomaly detection.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from analytics.anomalies import rebuild_vitals_statistics
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user running vitals statistics from VitalsLog (backfill or repair).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='users', default=[],
+                            help='Email of a user to rebuild (repeatable). Defaults to all users.')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['users']:
+            user_ids = list(
+                get_user_model().objects.filter(email__in=options['users']).values_list('pk', flat=True)
+            )
+
+        written = rebuild_vitals_statistics(user_ids=user_ids)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} vitals statistic rows.'))
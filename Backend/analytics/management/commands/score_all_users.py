@@ -0,0 +1,150 @@
+"""
+Calculate the previous day's health score for every user with logs on it,
+in parallel worker processes. Progress is checkpointed in ScoringRun so a
+crashed run resumes where it stopped.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+
+
+def _init_worker():
+    # Forked workers (the Linux default) inherit the parent's configured
+    # Django and this is a no-op; spawn and forkserver workers (macOS,
+    # Windows) start from a fresh interpreter and need it.
+    django.setup()
+
+
+def _score_chunk(user_ids, day):
+    # Imported here so spawned workers can unpickle this function before
+    # _init_worker has set Django up.
+    from analytics.health_scores import score_users_for_day
+
+    started = time.perf_counter()
+    written = score_users_for_day(user_ids, day)
+    return written, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = 'Calculate health scores for every user for the previous day (nightly job; resumable).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day to score (YYYY-MM-DD). Defaults to yesterday.')
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Users read and written together by one worker task.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes; 1 scores in this process. Defaults to the CPU count; '
+                                 'always 1 on SQLite.')
+        parser.add_argument('--restart', action='store_true',
+                            help='Ignore the checkpoint of an earlier run for the same day and start over.')
+
+    def handle(self, *args, **options):
+        from analytics.models import ScoringRun
+        from health_records.models import DailyRollup
+
+        day = self._parse_date(options['date']) if options['date'] else timezone.localdate() - timedelta(days=1)
+        if options['chunk_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--chunk-size and --workers must be at least 1.')
+
+        workers = options['workers']
+        # SQLite allows one writer at a time; parallel workers would only
+        # wait for each other and fail with "database is locked".
+        if connection.vendor == 'sqlite' and workers > 1:
+            self.stdout.write('SQLite allows a single writer; scoring in this process.')
+            workers = 1
+
+        run, created = ScoringRun.objects.get_or_create(date=day)
+        if options['restart'] and not created:
+            run.last_user_id = run.users_scored = run.scores_written = 0
+            run.completed_at = None
+            run.save()
+        elif run.completed_at:
+            self.stdout.write(f'Health scores for {day} were already calculated; use --restart to run again.')
+            return
+        elif not created:
+            self.stdout.write(f'Resuming the run for {day} after user {run.last_user_id}.')
+
+        # Only users with logs on the day get a score.
+        user_ids = list(
+            DailyRollup.objects
+            .filter(date=day, user_id__gt=run.last_user_id)
+            .order_by('user_id')
+            .values_list('user_id', flat=True)
+        )
+        size = options['chunk_size']
+        chunks = [user_ids[offset:offset + size] for offset in range(0, len(user_ids), size)]
+
+        self._completed = {}
+        self._next_chunk = 0
+        started = time.perf_counter()
+
+        if workers == 1 or len(chunks) <= 1:
+            for index, chunk in enumerate(chunks):
+                self._chunk_done(run, chunks, index, _score_chunk(chunk, day), options['verbosity'])
+        else:
+            self._run_pool(run, chunks, day, workers, options['verbosity'])
+
+        elapsed = time.perf_counter() - started
+        run.completed_at = timezone.now()
+        run.save(update_fields=['completed_at', 'updated_at'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {len(user_ids)} users for {day} in {elapsed:.1f}s '
+            f'({len(user_ids) / elapsed if elapsed else 0:,.0f} users/s, {len(chunks)} chunks, '
+            f'{min(workers, max(len(chunks), 1))} workers); '
+            f'{run.scores_written} scores written in total.'
+        ))
+
+    def _run_pool(self, run, chunks, day, workers, verbosity):
+        # Forked workers inherit open connections; close them so each worker
+        # opens its own instead of sharing the parent's socket.
+        connections.close_all()
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            futures = {
+                executor.submit(_score_chunk, chunk, day): index
+                for index, chunk in enumerate(chunks)
+            }
+            try:
+                for future in as_completed(futures):
+                    self._chunk_done(run, chunks, futures[future], future.result(), verbosity)
+            except Exception as exc:
+                for future in futures:
+                    future.cancel()
+                raise CommandError(
+                    f'Scoring failed after user {run.last_user_id}: {exc}. Run the command again to resume.'
+                ) from exc
+
+    def _chunk_done(self, run, chunks, index, result, verbosity):
+        """
+        Record a finished chunk and move the checkpoint past every chunk
+        finished without gaps before it. Chunks finished out of order are
+        scored again after a crash, which the upsert makes harmless.
+        """
+        written, elapsed = result
+        self._completed[index] = written
+        if verbosity > 1:
+            self.stdout.write(
+                f'Chunk {index + 1}/{len(chunks)}: {len(chunks[index])} users, {written} scores in {elapsed:.2f}s'
+            )
+
+        if self._next_chunk not in self._completed:
+            return
+        while self._next_chunk in self._completed:
+            run.last_user_id = chunks[self._next_chunk][-1]
+            run.users_scored += len(chunks[self._next_chunk])
+            run.scores_written += self._completed.pop(self._next_chunk)
+            self._next_chunk += 1
+        run.save(update_fields=['last_user_id', 'users_scored', 'scores_written', 'updated_at'])
+
+    def _parse_date(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid date "{value}". Use YYYY-MM-DD.')
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.9 on 2026-10-17 05:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+VITALS_FIELDS = (
+    'heart_rate', 'blood_pressure_systolic', 'blood_pressure_diastolic',
+    'temperature', 'oxygen_saturation', 'glucose', 'weight',
+)
+
+
+def backfill_vitals_statistics(apps, schema_editor):
+    """
+    Fold every stored reading into its user's running statistics with
+    Welford's method, as analytics.anomalies does for new readings.
+    """
+    VitalsLog = apps.get_model('health_records', 'VitalsLog')
+    VitalsStatistic = apps.get_model('analytics', 'VitalsStatistic')
+
+    rows = []
+    statistics = {}
+    readings = VitalsLog.objects.order_by('user_id', 'pk').values_list('user_id', *VITALS_FIELDS)
+    for user_id, *values in readings.iterator(chunk_size=2000):
+        if not statistics or rows[-1].user_id != user_id:
+            statistics = {
+                field: VitalsStatistic(user_id=user_id, field=field, count=0, mean=0.0, m2=0.0)
+                for field in VITALS_FIELDS
+            }
+            rows.extend(statistics.values())
+        for field, value in zip(VITALS_FIELDS, values):
+            if value is None:
+                continue
+            statistic = statistics[field]
+            statistic.count += 1
+            delta = float(value) - statistic.mean
+            statistic.mean += delta / statistic.count
+            statistic.m2 += delta * (float(value) - statistic.mean)
+
+    VitalsStatistic.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('analytics', '0001_initial'),
+        ('health_records', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VitalsStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=30)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('mean', models.FloatField(default=0)),
+                ('m2', models.FloatField(default=0, help_text='Sum of squared deviations from the mean')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vitals_statistics', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'field')},
+            },
+        ),
+        migrations.RunPython(backfill_vitals_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.9 on 2026-10-17 05:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_vitalsstatistic'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoringRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('last_user_id', models.BigIntegerField(default=0, help_text='Every user up to this id has been scored')),
+                ('users_scored', models.PositiveIntegerField(default=0)),
+                ('scores_written', models.PositiveIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+    ]
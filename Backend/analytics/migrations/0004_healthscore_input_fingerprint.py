@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-17 05:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_scoringrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='healthscore',
+            name='input_fingerprint',
+            field=models.CharField(blank=True, help_text='Hash of the rollup revision and goals the score was calculated from', max_length=64),
+        ),
+    ]
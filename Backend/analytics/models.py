@@ -23,6 +23,10 @@ class HealthScore(models.Model):
     # Score metadata
     calculation_date = models.DateField()
     calculation_details = models.JSONField(default=dict)
+    input_fingerprint = models.CharField(
+        max_length=64, blank=True,
+        help_text='Hash of the rollup revision and goals the score was calculated from'
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -99,4 +103,41 @@ class Insight(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"{self.user.email} - {self.title}"
\ No newline at end of file
+        return f"{self.user.email} - {self.title}"
+
+class VitalsStatistic(models.Model):
+    """Running count, mean and M2 (Welford) of one VitalsLog field per user."""
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='vitals_statistics')
+    field = models.CharField(max_length=30)
+    count = models.PositiveIntegerField(default=0)
+    mean = models.FloatField(default=0)
+    m2 = models.FloatField(default=0, help_text='Sum of squared deviations from the mean')
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('user', 'field')
+    
+    def __str__(self):
+        return f"{self.user.email} - {self.field}: n={self.count}, mean={self.mean:.2f}"
+
+
+class ScoringRun(models.Model):
+    """Progress of the nightly health score job for one day, so a crashed run can resume."""
+    
+    date = models.DateField(unique=True)
+    last_user_id = models.BigIntegerField(default=0, help_text='Every user up to this id has been scored')
+    users_scored = models.PositiveIntegerField(default=0)
+    scores_written = models.PositiveIntegerField(default=0)
+    
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-date']
+    
+    def __str__(self):
+        state = 'complete' if self.completed_at else f'at user {self.last_user_id}'
+        return f"Health score run for {self.date} ({state})"
@@ -0,0 +1,133 @@
+"""
+Vectorized health scoring.
+
+``compute_scores`` evaluates the component and overall health scores for
+any number of users and days at once from NumPy arrays, with no database
+access. Single-day calculation, range backfills and the nightly job all
+score through it. Each operation mirrors the original per-day formula step
+by step, so the results match it exactly.
+"""
+import numpy as np
+
+# Stored in score fingerprints; increment when the formula changes so that
+# existing scores are recalculated.
+SCORING_VERSION = 1
+
+# component -> weight in the overall score. Vitals and mood only count on
+# days that have them, and the weights are renormalized.
+COMPONENT_WEIGHTS = {
+    'nutrition': 0.25,
+    'activity': 0.25,
+    'sleep': 0.2,
+    'hydration': 0.15,
+    'vitals': 0.1,
+    'mood': 0.05,
+}
+
+# Ideal share of protein, carbs and fat in the logged macronutrients, in %
+IDEAL_MACROS = (25, 50, 25)
+
+ACTIVITY_MINUTES_GOAL = 30
+SLEEP_HOURS_GOAL = 8
+HEART_RATE_NORMAL = 80
+SYSTOLIC_NORMAL = 120
+DIASTOLIC_NORMAL = 80
+
+
+def _array(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def _deviation_score(values, target, scale):
+    return 100 - np.minimum(100, np.abs(values - target) / scale * 100)
+
+
+def compute_scores(*, calories, protein, carbs, fat, workout_minutes, sleep_duration,
+                   sleep_quality, water, heart_rate, blood_pressure_systolic,
+                   blood_pressure_diastolic, mood, calorie_goal, water_goal):
+    """
+    Score every element of the input arrays, which must broadcast to one
+    shape, e.g. ``(users, days)`` with goals shaped ``(users, 1)``.
+
+    Sleep duration, sleep quality and mood are the day's averages. Zero
+    means no data for them and for the macros, heart rate and blood
+    pressure; NaN does too for the vitals. Returns a dict of float arrays
+    named like the HealthScore fields, with NaN for missing vitals and
+    mood scores.
+    """
+    calories, protein, carbs, fat = map(_array, (calories, protein, carbs, fat))
+    workout_minutes, water = _array(workout_minutes), _array(water)
+    sleep_duration, sleep_quality, mood = map(_array, (sleep_duration, sleep_quality, mood))
+    heart_rate = np.nan_to_num(_array(heart_rate))
+    systolic = np.nan_to_num(_array(blood_pressure_systolic))
+    diastolic = np.nan_to_num(_array(blood_pressure_diastolic))
+    calorie_goal, water_goal = _array(calorie_goal), _array(water_goal)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Nutrition: calorie deviation, averaged with the macronutrient
+        # balance on days where all three macros were logged
+        calorie_score = _deviation_score(calories, calorie_goal, calorie_goal)
+        total_macros = protein + carbs + fat
+        macro_balance_score = 100 - (
+            np.abs(protein / total_macros * 100 - IDEAL_MACROS[0]) +
+            np.abs(carbs / total_macros * 100 - IDEAL_MACROS[1]) +
+            np.abs(fat / total_macros * 100 - IDEAL_MACROS[2])
+        ) / 2
+        has_macros = (protein != 0) & (carbs != 0) & (fat != 0)
+        nutrition_score = np.where(has_macros, (calorie_score + macro_balance_score) / 2, calorie_score)
+
+        activity_score = np.minimum(100, workout_minutes / ACTIVITY_MINUTES_GOAL * 100)
+
+        # Sleep: distance from the goal duration, averaged with quality (1-5)
+        duration_score = _deviation_score(sleep_duration, SLEEP_HOURS_GOAL, SLEEP_HOURS_GOAL)
+        quality_score = np.where(sleep_quality != 0, sleep_quality / 5 * 100, 0.0)
+        sleep_score = np.where(sleep_duration != 0, (duration_score + quality_score) / 2, 0.0)
+
+        hydration_score = np.minimum(100, water / water_goal * 100)
+
+        # Vitals: heart rate, averaged with blood pressure when both
+        # readings are present
+        hr_score = _deviation_score(heart_rate, HEART_RATE_NORMAL, 20)
+        bp_score = (
+            _deviation_score(systolic, SYSTOLIC_NORMAL, 20) +
+            _deviation_score(diastolic, DIASTOLIC_NORMAL, 10)
+        ) / 2
+        has_bp = (systolic != 0) & (diastolic != 0)
+        vitals_score = np.where(has_bp, (hr_score + bp_score) / 2, hr_score)
+        vitals_score = np.where((heart_rate != 0) & (vitals_score != 0), vitals_score, np.nan)
+
+        mood_score = np.where(mood != 0, mood / 5 * 100, np.nan)
+
+    has_vitals = ~np.isnan(vitals_score)
+    has_mood = ~np.isnan(mood_score)
+    total_weight = (
+        COMPONENT_WEIGHTS['nutrition'] + COMPONENT_WEIGHTS['activity'] +
+        COMPONENT_WEIGHTS['sleep'] + COMPONENT_WEIGHTS['hydration'] +
+        np.where(has_vitals, COMPONENT_WEIGHTS['vitals'], 0.0) +
+        np.where(has_mood, COMPONENT_WEIGHTS['mood'], 0.0)
+    )
+
+    # Summed in the same order as the per-day formula
+    overall_score = (
+        nutrition_score * (COMPONENT_WEIGHTS['nutrition'] / total_weight) +
+        activity_score * (COMPONENT_WEIGHTS['activity'] / total_weight) +
+        sleep_score * (COMPONENT_WEIGHTS['sleep'] / total_weight) +
+        hydration_score * (COMPONENT_WEIGHTS['hydration'] / total_weight)
+    )
+    overall_score = overall_score + np.where(
+        has_vitals, np.nan_to_num(vitals_score) * (COMPONENT_WEIGHTS['vitals'] / total_weight), 0.0
+    )
+    overall_score = overall_score + np.where(
+        has_mood, np.nan_to_num(mood_score) * (COMPONENT_WEIGHTS['mood'] / total_weight), 0.0
+    )
+
+    shape = overall_score.shape
+    return {
+        'overall_score': np.broadcast_to(overall_score, shape),
+        'nutrition_score': np.broadcast_to(nutrition_score, shape),
+        'activity_score': np.broadcast_to(activity_score, shape),
+        'sleep_score': np.broadcast_to(sleep_score, shape),
+        'hydration_score': np.broadcast_to(hydration_score, shape),
+        'vitals_score': np.broadcast_to(vitals_score, shape),
+        'mood_score': np.broadcast_to(mood_score, shape),
+    }
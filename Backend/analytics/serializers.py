@@ -2,10 +2,11 @@
 Serializers for the analytics app.
 """
 from rest_framework import serializers
+from health_project.sparse_fields import DynamicFieldsMixin
 from .models import HealthScore, Recommendation, Insight
 
 
-class HealthScoreSerializer(serializers.ModelSerializer):
+class HealthScoreSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the HealthScore model."""
     
     class Meta:
@@ -14,7 +15,7 @@ class HealthScoreSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
 
-class RecommendationSerializer(serializers.ModelSerializer):
+class RecommendationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the Recommendation model."""
     
     class Meta:
@@ -23,7 +24,7 @@ class RecommendationSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
         
 
-class InsightSerializer(serializers.ModelSerializer):
+class InsightSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the Insight model."""
     
     class Meta:
@@ -0,0 +1,148 @@
+"""
+Bucketed time series of health metrics for ``/api/analytics/series/``.
+
+Each metric is an aggregate over one source model. The requested metrics
+are grouped by model and every model is read with a single
+``GROUP BY bucket`` query, so a dashboard's charts cost one query per model
+instead of one loop per chart.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Avg, Count, DateField, DateTimeField, Max, Min, Q, Sum
+from django.db.models.functions import Trunc
+
+from health_records.models import (
+    WorkoutLog, MealLog, WaterLog, SleepLog, VitalsLog,
+    MedicationLog, MoodLog
+)
+from .models import HealthScore
+
+BUCKETS = ('day', 'week', 'month', 'year')
+MAX_BUCKETS = 3660
+
+# metric name -> (source model, aggregate over the bucket)
+SERIES_METRICS = {
+    'calories': (MealLog, Sum('total_calories')),
+    'protein': (MealLog, Sum('protein')),
+    'carbs': (MealLog, Sum('carbs')),
+    'fat': (MealLog, Sum('fat')),
+    'meals': (MealLog, Count('id')),
+    'workout_minutes': (WorkoutLog, Sum('duration')),
+    'calories_burned': (WorkoutLog, Sum('calories_burned')),
+    'distance': (WorkoutLog, Sum('distance')),
+    'workouts': (WorkoutLog, Count('id')),
+    'water': (WaterLog, Sum('amount')),
+    'sleep_duration': (SleepLog, Avg('duration')),
+    'sleep_quality': (SleepLog, Avg('quality')),
+    'sleep_interruptions': (SleepLog, Avg('interruptions')),
+    'weight': (VitalsLog, Avg('weight')),
+    'weight_min': (VitalsLog, Min('weight')),
+    'weight_max': (VitalsLog, Max('weight')),
+    'heart_rate': (VitalsLog, Avg('heart_rate')),
+    'blood_pressure_systolic': (VitalsLog, Avg('blood_pressure_systolic')),
+    'blood_pressure_diastolic': (VitalsLog, Avg('blood_pressure_diastolic')),
+    'temperature': (VitalsLog, Avg('temperature')),
+    'oxygen_saturation': (VitalsLog, Avg('oxygen_saturation')),
+    'glucose': (VitalsLog, Avg('glucose')),
+    'mood': (MoodLog, Avg('mood')),
+    'energy': (MoodLog, Avg('energy')),
+    'stress': (MoodLog, Avg('stress')),
+    'medications_taken': (MedicationLog, Count('id', filter=Q(taken=True))),
+    'medications_missed': (MedicationLog, Count('id', filter=Q(taken=False))),
+    'health_score': (HealthScore, Avg('overall_score')),
+}
+
+# Models not dated by a ``date`` column. Sleep counts for the day it ends,
+# as in the daily rollups.
+DATE_FIELDS = {
+    SleepLog: 'end_time',
+    HealthScore: 'calculation_date',
+}
+
+
+def bucket_start(day, bucket):
+    """
+    Return the first day of the bucket containing ``day``.
+    """
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    if bucket == 'month':
+        return day.replace(day=1)
+    if bucket == 'year':
+        return day.replace(month=1, day=1)
+    return day
+
+
+def bucket_count(start, end, bucket):
+    """
+    Return how many buckets overlap ``start``..``end``, without listing them.
+    """
+    if bucket == 'week':
+        return (bucket_start(end, bucket) - bucket_start(start, bucket)).days // 7 + 1
+    if bucket == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    if bucket == 'year':
+        return end.year - start.year + 1
+    return (end - start).days + 1
+
+
+def bucket_starts(start, end, bucket):
+    """
+    Return the first day of every bucket overlapping ``start``..``end``.
+    """
+    starts = []
+    current = bucket_start(start, bucket)
+    while current <= end:
+        starts.append(current)
+        if bucket == 'day':
+            current += timedelta(days=1)
+        elif bucket == 'week':
+            current += timedelta(days=7)
+        elif bucket == 'month':
+            current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+        else:
+            current = date(current.year + 1, 1, 1)
+    return starts
+
+
+def _value(value):
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def get_series(user, metrics, start, end, bucket):
+    """
+    Return one row per bucket from ``start`` to ``end`` with the value of
+    each metric, or None for buckets without data.
+    """
+    by_model = {}
+    for metric in metrics:
+        model, aggregate = SERIES_METRICS[metric]
+        by_model.setdefault(model, {})[metric] = aggregate
+
+    rows = {
+        day: {'date': day, **dict.fromkeys(metrics)}
+        for day in bucket_starts(start, end, bucket)
+    }
+
+    for model, aggregates in by_model.items():
+        field = DATE_FIELDS.get(model, 'date')
+        lookup = f'{field}__range'
+        if isinstance(model._meta.get_field(field), DateTimeField):
+            lookup = f'{field}__date__range'
+
+        # Aliased, since metrics such as ``weight`` share a name with a column.
+        queryset = (
+            model.objects
+            .filter(user=user, **{lookup: (start, end)})
+            .annotate(bucket=Trunc(field, bucket, output_field=DateField()))
+            .order_by()
+            .values('bucket')
+            .annotate(**{f'series_{metric}': aggregate for metric, aggregate in aggregates.items()})
+        )
+        for values in queryset:
+            row = rows.get(values.pop('bucket'))
+            if row is not None:
+                row.update({alias[len('series_'):]: _value(value) for alias, value in values.items()})
+
+    return list(rows.values())
@@ -0,0 +1,106 @@
+"""
+Signal handlers for the analytics app.
+"""
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from health_records.models import VitalsLog
+from health_records.signals import _is_user_deletion, health_logs_bulk_created
+from health_records.versions import bump_data_versions
+
+from .anomalies import VITALS_FIELDS, delete_anomalies, reading, update_vitals_statistics
+from .models import HealthScore, Insight
+
+
+def bump_version_on_save(sender, instance, raw=False, **kwargs):
+    """
+    Reports include health scores and insights, so writes to them
+    invalidate the user's cached responses too.
+    """
+    if raw:
+        return
+    
+    bump_data_versions([instance.user_id])
+
+
+def bump_version_on_delete(sender, instance, origin=None, **kwargs):
+    if _is_user_deletion(origin):
+        return
+    
+    bump_data_versions([instance.user_id])
+
+
+def _touches_statistics(update_fields):
+    return update_fields is None or any(
+        field in VITALS_FIELDS or field in ('user', 'user_id') for field in update_fields
+    )
+
+
+@receiver(pre_save, sender=VitalsLog, dispatch_uid='vitals_statistics_previous')
+def remember_previous_reading(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Keep the stored version of an edited reading so it can be taken back
+    out of the running statistics. Saves that leave the readings alone
+    skip the query.
+    """
+    instance._vitals_previous = None
+    if raw or instance._state.adding or not _touches_statistics(update_fields):
+        return
+    
+    instance._vitals_previous = sender._default_manager.filter(pk=instance.pk).first()
+
+
+@receiver(post_save, sender=VitalsLog, dispatch_uid='vitals_statistics_save')
+def update_vitals_statistics_on_save(sender, instance, created=False, raw=False, **kwargs):
+    """
+    Fold the reading into the running statistics. An edit takes the stored
+    version out first, drops the anomalies raised for the fields whose
+    value changed and only scores those fields again.
+    """
+    if raw:
+        return
+    
+    if created:
+        update_vitals_statistics(instance.user_id, added=[instance])
+        return
+    
+    previous = getattr(instance, '_vitals_previous', None)
+    if previous is None:
+        return
+    
+    if previous.user_id != instance.user_id:
+        delete_anomalies(previous)
+        update_vitals_statistics(previous.user_id, removed=[previous])
+        update_vitals_statistics(instance.user_id, added=[instance])
+        return
+    
+    changed = [field for field in VITALS_FIELDS if reading(previous, field) != reading(instance, field)]
+    if changed:
+        delete_anomalies(instance, changed)
+        update_vitals_statistics(instance.user_id, added=[instance], removed=[previous], detect_fields=changed)
+
+
+@receiver(post_delete, sender=VitalsLog, dispatch_uid='vitals_statistics_delete')
+def update_vitals_statistics_on_delete(sender, instance, origin=None, **kwargs):
+    if _is_user_deletion(origin):
+        return
+    
+    delete_anomalies(instance)
+    update_vitals_statistics(instance.user_id, removed=[instance])
+
+
+@receiver(health_logs_bulk_created)
+def update_vitals_statistics_on_bulk_create(sender, instances, **kwargs):
+    if sender is not VitalsLog:
+        return
+    
+    by_user = {}
+    for instance in instances:
+        by_user.setdefault(instance.user_id, []).append(instance)
+    for user_id, logs in by_user.items():
+        update_vitals_statistics(user_id, added=logs)
+
+
+for model in (HealthScore, Insight):
+    post_save.connect(bump_version_on_save, sender=model, dispatch_uid=f'version_save_{model.__name__}')
+    post_delete.connect(bump_version_on_delete, sender=model, dispatch_uid=f'version_delete_{model.__name__}')
@@ -0,0 +1,464 @@
+"""
+Tests for the analytics app.
+"""
+import io
+import math
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from health_records.cache import response_cache
+from health_records.models import SleepLog, VitalsLog, WaterLog
+from users.models import User, UserPreference
+from .anomalies import rebuild_vitals_statistics
+from .correlations import correlation_matrix
+from .management.commands.benchmark_health_scores import SCORE_FIELDS, reference_scores
+from .scoring import compute_scores
+from .health_scores import MAX_RANGE_DAYS, calculate_health_scores, score_users_for_day
+from .models import HealthScore, Insight, ScoringRun, VitalsStatistic
+from .series import MAX_BUCKETS
+from .trends import Series, T_CRITICAL_95, _t_critical, analyze_series, ewma, linear_trend, week_over_week
+
+# One day per row, chosen to reach every branch of the per-day formula:
+# missing macros, sleep, vitals, blood pressure and mood, and values past
+# the caps.
+INPUT_NAMES = (
+    'calories', 'protein', 'carbs', 'fat', 'workout_minutes', 'sleep_duration', 'sleep_quality',
+    'water', 'heart_rate', 'blood_pressure_systolic', 'blood_pressure_diastolic', 'mood',
+    'calorie_goal', 'water_goal',
+)
+DAYS = [
+    (2000, 100, 250, 70, 30, 8, 4, 2500, 72, 118, 79, 3.5, 2000, 2500),
+    (2450, 120.5, 310.25, 82.75, 45, 7.25, 3, 1800, 65, 0, 0, 4, 2200, 2000),
+    (1500, 0, 200, 50, 0, 0, 0, 900, 0, 130, 85, 0, 1800, 3000),
+    (0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 2000, 2500),
+    (5200, 300, 40, 10, 240, 13.5, 5, 6000, 180, 180, 110, 5, 1200, 1000),
+    (1800, 90, 220, 60, 15, 3.5, 1, 1200, 100, 0, 80, 1.6666666666666667, 2500, 3500),
+    (3100, 25.5, 25.5, 25.5, 29, 8.5, 2.5, 2499, 40, 90, 50, 2, 3000, 2500),
+]
+
+
+class ComputeScoresTests(SimpleTestCase):
+
+    def test_matches_the_per_day_formula(self):
+        columns = {name: [day[index] for day in DAYS] for index, name in enumerate(INPUT_NAMES)}
+        scores = compute_scores(**columns)
+
+        for index, day in enumerate(DAYS):
+            expected = reference_scores(**dict(zip(INPUT_NAMES, map(float, day))))
+            for field in SCORE_FIELDS:
+                value = scores[field][index].item()
+                with self.subTest(day=day, field=field):
+                    self.assertEqual(None if math.isnan(value) else value, expected[field])
+
+    def test_broadcasts_goals_per_user(self):
+        scores = compute_scores(
+            calories=[[2000, 1000], [2000, 1000]], protein=0, carbs=0, fat=0, workout_minutes=0,
+            sleep_duration=0, sleep_quality=0, water=[[1000, 2000], [1000, 2000]], heart_rate=0,
+            blood_pressure_systolic=0, blood_pressure_diastolic=0, mood=0,
+            calorie_goal=[[2000], [1000]], water_goal=[[2000], [1000]]
+        )
+
+        self.assertEqual(scores['nutrition_score'].tolist(), [[100.0, 50.0], [0.0, 100.0]])
+        self.assertEqual(scores['hydration_score'].tolist(), [[50.0, 100.0], [100.0, 100.0]])
+
+
+def reference_ewma(values, span):
+    alpha = 2 / (span + 1)
+    result = [values[0]]
+    for value in values[1:]:
+        result.append(alpha * value + (1 - alpha) * result[-1])
+    return result
+
+
+def reference_trend(days, values):
+    count = len(values)
+    day_mean, value_mean = sum(days) / count, sum(values) / count
+    spread = sum((day - day_mean) ** 2 for day in days)
+    slope = sum((day - day_mean) * (value - value_mean) for day, value in zip(days, values)) / spread
+    intercept = value_mean - slope * day_mean
+    residual_sum = sum((value - intercept - slope * day) ** 2 for day, value in zip(days, values))
+    margin = _t_critical(count - 2) * math.sqrt(residual_sum / (count - 2) / spread)
+    return slope, slope - margin, slope + margin
+
+
+def reference_week_over_week(days, values):
+    weeks = {}
+    for day, value in zip(days, values):
+        weeks.setdefault(day - timedelta(days=day.weekday()), []).append(value)
+    result, previous = [], None
+    for start in sorted(weeks):
+        mean = sum(weeks[start]) / len(weeks[start])
+        result.append((start.isoformat(), mean, None if previous is None else mean - previous))
+        previous = mean
+    return result
+
+
+class TrendEngineTests(SimpleTestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # Irregular gaps, repeated days and a slow drift with noise.
+        offsets = np.cumsum(rng.integers(0, 4, size=400))
+        self.days = [date(2021, 3, 1) + timedelta(days=int(offset)) for offset in offsets]
+        self.values = (70 + 0.01 * offsets + rng.normal(0, 0.8, size=len(offsets))).round(2).tolist()
+
+    def series(self, days, values):
+        return Series(np.array(days, dtype='datetime64[D]'), {'value': np.array(values, dtype=np.float64)})
+
+    def test_ewma_matches_the_recurrence(self):
+        for span in (1, 2, 7, 30, 400):
+            with self.subTest(span=span):
+                np.testing.assert_allclose(ewma(self.values, span), reference_ewma(self.values, span), rtol=1e-9)
+        # Long enough to be evaluated in several blocks.
+        values = (self.values * 10)[:3000]
+        np.testing.assert_allclose(ewma(values, 2), reference_ewma(values, 2), rtol=1e-9)
+
+    def test_linear_trend_matches_the_per_point_formula(self):
+        for count in (3, 4, 10, 32, 33, len(self.values)):
+            days, values = self.days[:count], self.values[:count]
+            with self.subTest(count=count):
+                trend = linear_trend(np.array(days, dtype='datetime64[D]'), values)
+                slope, low, high = reference_trend([(day - days[0]).days for day in days], values)
+                self.assertAlmostEqual(trend['slope_per_day'], slope, places=9)
+                self.assertAlmostEqual(trend['slope_ci_low'], low, places=9)
+                self.assertAlmostEqual(trend['slope_ci_high'], high, places=9)
+                self.assertAlmostEqual(trend['slope_per_week'], slope * 7, places=9)
+
+    def test_linear_trend_needs_three_points_on_two_days(self):
+        day = np.datetime64('2024-01-01')
+        self.assertIsNone(linear_trend(np.array([day, day + 1], dtype='datetime64[D]'), [1.0, 2.0]))
+        self.assertIsNone(linear_trend(np.array([day] * 3, dtype='datetime64[D]'), [1.0, 2.0, 3.0]))
+        exact = linear_trend(np.array([day, day + 1, day + 3], dtype='datetime64[D]'), [1.0, 3.0, 7.0])
+        self.assertEqual((exact['slope_per_day'], exact['r_squared']), (2.0, 1.0))
+        self.assertEqual(exact['slope_ci_low'], exact['slope_ci_high'])
+
+    def test_t_critical_values(self):
+        self.assertEqual(_t_critical(1), 12.706)
+        self.assertEqual(_t_critical(len(T_CRITICAL_95)), T_CRITICAL_95[-1])
+        # Beyond the table the approximation stays within 0.005 of the exact quantiles.
+        for degrees, exact in [(31, 2.0395), (40, 2.0211), (60, 2.0003), (120, 1.9799), (1000, 1.9623)]:
+            with self.subTest(degrees=degrees):
+                self.assertAlmostEqual(_t_critical(degrees), exact, delta=0.005)
+
+    def test_week_over_week_matches_calendar_weeks(self):
+        weeks = week_over_week(np.array(self.days, dtype='datetime64[D]'), self.values)
+        expected = reference_week_over_week(self.days, self.values)
+        self.assertEqual([week['week_start'] for week in weeks], [start for start, _, _ in expected])
+        for week, (_, mean, delta) in zip(weeks, expected):
+            self.assertAlmostEqual(week['mean'], mean, places=9)
+            if delta is None:
+                self.assertIsNone(week['delta'])
+            else:
+                self.assertAlmostEqual(week['delta'], delta, places=9)
+
+    def test_short_series(self):
+        self.assertIsNone(analyze_series(self.series([], []), 'value'))
+
+        single = analyze_series(self.series(self.days[:1], self.values[:1]), 'value')
+        self.assertEqual((single['count'], single['ewma'], single['rolling_mean']), (1, self.values[0], None))
+        self.assertIsNone(single['linear_trend'])
+        self.assertEqual(single['week_over_week'][0]['delta'], None)
+
+        result = analyze_series(self.series(self.days[:7], self.values[:7]), 'value', window=7, span=3)
+        self.assertAlmostEqual(result['rolling_mean'], sum(self.values[:7]) / 7, places=9)
+        self.assertAlmostEqual(result['ewma'], reference_ewma(self.values[:7], 3)[-1], places=9)
+        self.assertEqual([point['rolling_mean'] is None for point in result['data_points']], [True] * 6 + [False])
+
+
+class CorrelationTests(SimpleTestCase):
+    nan = float('nan')
+
+    def test_spearman_ranks_each_pair_over_shared_days(self):
+        # Shared days hold x = 1, 4, 5, 6 and y = 2, 1, 5, 4, ranked 1-4 and
+        # 2, 1, 4, 3: d² = 4, so rho = 1 - 6 * 4 / (4 * 15) = 0.6. Ranking
+        # over each metric's own days would give 0.641.
+        values = np.array([
+            [1, 2], [2, self.nan], [self.nan, 3], [4, 1], [5, 5], [6, 4],
+        ], dtype=np.float64)
+        pearson, spearman, counts = correlation_matrix(values, min_points=4)
+
+        self.assertAlmostEqual(spearman[0, 1], 0.6)
+        self.assertAlmostEqual(spearman[1, 0], 0.6)
+        self.assertEqual(counts[0, 1], 4)
+        np.testing.assert_allclose(np.diag(spearman), [1.0, 1.0])
+
+    def test_spearman_ties_and_lag(self):
+        # With the second column one day later the shared days hold x = 1,
+        # 4, 4, 6 and y = 2, 1, 5, 4. Ranks 1, 2.5, 2.5, 4 and 2, 1, 4, 3
+        # have covariance 1.5 and variances 4.5 and 5: rho = 1 / sqrt(10).
+        values = np.array([
+            [1, 0], [2, 2], [self.nan, self.nan], [4, 3], [4, 1], [6, 5], [99, 4],
+        ], dtype=np.float64)
+        _, spearman, counts = correlation_matrix(values, lag=1, min_points=4)
+
+        self.assertAlmostEqual(spearman[0, 1], 1 / math.sqrt(10))
+        self.assertEqual(counts[0, 1], 4)
+
+    def test_too_few_shared_days_or_constant_ranks(self):
+        values = np.array([[1, 2, 3], [2, self.nan, 3], [3, 1, 3], [4, 5, 3]], dtype=np.float64)
+        _, spearman, _ = correlation_matrix(values, min_points=4)
+        self.assertTrue(np.isnan(spearman[0, 1]))
+        self.assertTrue(np.isnan(spearman[0, 2]))
+        self.assertAlmostEqual(spearman[0, 0], 1.0)
+
+
+class AnalyticsTestCase(TestCase):
+    """
+    Base case with an authenticated user and API client.
+    """
+
+    def setUp(self):
+        cache.clear()
+        # User ids and data versions repeat between tests
+        response_cache.clear()
+        self.user = User.objects.create_user(email='user@example.com', password='password')
+        UserPreference.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class SeriesTests(AnalyticsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for day, amount in [(date(2024, 1, 15), 1), (date(2024, 1, 31), 10), (date(2024, 2, 4), 20),
+                            (date(2024, 2, 5), 40), (date(2024, 2, 29), 80), (date(2024, 3, 1), 160)]:
+            WaterLog.objects.create(user=self.user, amount=amount, date=day, time=time(12))
+        for end, quality in [(datetime(2024, 2, 29, 23, 30), 2), (datetime(2024, 3, 1, 0, 30), 5)]:
+            end = end.replace(tzinfo=dt_timezone.utc)
+            SleepLog.objects.create(user=self.user, start_time=end - timedelta(hours=8), end_time=end,
+                                    duration=8, quality=quality)
+
+    def series(self, **params):
+        response = self.client.get('/api/analytics/series/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return {row['date']: row for row in response.json()['series']}
+
+    def test_week_buckets_start_on_monday_and_clip_to_the_range(self):
+        rows = self.series(metrics='water,sleep_quality', bucket='week', start='2024-01-31', end='2024-02-29')
+
+        self.assertEqual(list(rows), ['2024-01-29', '2024-02-05', '2024-02-12', '2024-02-19', '2024-02-26'])
+        self.assertEqual([row['water'] for row in rows.values()], [30, 40, None, None, 80])
+        # Sleep counts for the day it ended; the night ending on 1 March is out of range.
+        self.assertEqual(rows['2024-02-26']['sleep_quality'], 2)
+
+    def test_month_and_year_buckets(self):
+        months = self.series(metrics='water', bucket='month', start='2024-01-31', end='2024-03-01')
+        self.assertEqual({day: row['water'] for day, row in months.items()},
+                         {'2024-01-01': 10, '2024-02-01': 140, '2024-03-01': 160})
+
+        years = self.series(metrics='water,sleep_quality', bucket='year', start='2023-12-31', end='2024-12-31')
+        self.assertEqual(years['2023-01-01']['water'], None)
+        self.assertEqual(years['2024-01-01']['water'], 311)
+        self.assertEqual(years['2024-01-01']['sleep_quality'], 3.5)
+
+    def test_bucket_limit(self):
+        start = date(2000, 1, 1)
+        cases = [
+            ('day', start + timedelta(days=MAX_BUCKETS - 1), 200),
+            ('day', start + timedelta(days=MAX_BUCKETS), 400),
+            # 2000-01-01 is a Saturday, so its first week ends on 2 January.
+            ('week', date(2000, 1, 2) + timedelta(weeks=MAX_BUCKETS - 1), 200),
+            ('week', date(2000, 1, 3) + timedelta(weeks=MAX_BUCKETS - 1), 400),
+            ('month', date(2000 + MAX_BUCKETS // 12 - 1, 12, 31), 200),
+            ('month', date(2000 + MAX_BUCKETS // 12, 1, 1), 400),
+        ]
+        for bucket, end, expected in cases:
+            with self.subTest(bucket=bucket, end=end):
+                response = self.client.get('/api/analytics/series/', {
+                    'metrics': 'water', 'bucket': bucket, 'start': start.isoformat(), 'end': end.isoformat()
+                })
+                self.assertEqual(response.status_code, expected)
+                if expected == 200:
+                    self.assertEqual(len(response.json()['series']), MAX_BUCKETS)
+
+
+class VitalsStatisticsTests(AnalyticsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.logs = [
+            VitalsLog.objects.create(user=self.user, heart_rate=rate, weight=Decimal(weight) if weight else None,
+                                     date=date(2024, 1, 1) + timedelta(days=index), time=time(8))
+            for index, (rate, weight) in enumerate([
+                (62, '71.20'), (65, None), (61, '71.05'), (64, '70.90'), (63, None),
+                (66, '71.40'), (60, '70.85'), (64, '71.10'), (62, None), (65, '71.00'),
+            ])
+        ]
+
+    def assertMatchesReadings(self):
+        for field in ('heart_rate', 'weight', 'glucose'):
+            values = np.array([
+                float(value) for value in VitalsLog.objects.filter(user=self.user).values_list(field, flat=True)
+                if value is not None
+            ])
+            statistic = VitalsStatistic.objects.get(user=self.user, field=field)
+            with self.subTest(field=field):
+                self.assertEqual(statistic.count, len(values))
+                if len(values):
+                    self.assertAlmostEqual(statistic.mean, values.mean(), places=9)
+                    self.assertAlmostEqual(statistic.m2, ((values - values.mean()) ** 2).sum(), places=9)
+
+    def test_statistics_follow_edits_and_deletes(self):
+        self.assertMatchesReadings()
+
+        self.logs[0].heart_rate = 90
+        self.logs[0].weight = None
+        self.logs[0].save()
+        self.logs[1].weight = Decimal('72.30')
+        self.logs[1].save(update_fields=['weight'])
+        self.logs[2].notes = 'after a run'
+        self.logs[2].save(update_fields=['notes'])
+        self.logs[3].delete()
+        self.assertMatchesReadings()
+
+        rebuild_vitals_statistics()
+        self.assertMatchesReadings()
+
+    def test_anomalies_go_with_their_reading(self):
+        outlier = VitalsLog.objects.create(user=self.user, heart_rate=140, date=date(2024, 2, 1), time=time(8))
+        insights = Insight.objects.filter(user=self.user, insight_type='anomaly')
+        self.assertEqual(list(insights.values_list('data_points__vitals_log', flat=True)), [outlier.pk])
+
+        outlier.heart_rate = 63
+        outlier.save()
+        self.assertFalse(insights.exists())
+
+        outlier.heart_rate = 150
+        outlier.save(update_fields=['heart_rate'])
+        self.assertEqual(insights.count(), 1)
+
+        outlier.delete()
+        self.assertFalse(insights.exists())
+        self.assertMatchesReadings()
+
+
+class CalculateRangeTests(AnalyticsTestCase):
+    url = '/api/analytics/health-scores/calculate_range/'
+
+    def test_scores_days_with_logs_inside_the_range(self):
+        for day in (date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 4), date(2024, 1, 5)):
+            WaterLog.objects.create(user=self.user, amount=1500, date=day, time=time(12))
+        VitalsLog.objects.create(user=self.user, heart_rate=64, date=date(2024, 1, 3), time=time(8))
+
+        response = self.client.post(self.url, {'start_date': '2024-01-02', 'end_date': '2024-01-04'}, format='json')
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.data['scored'], 3)
+        self.assertEqual([score['calculation_date'] for score in response.data['scores']],
+                         ['2024-01-04', '2024-01-03', '2024-01-02'])
+        self.assertEqual(HealthScore.objects.filter(user=self.user).count(), 3)
+
+        single = self.client.post(self.url, {'start_date': '2024-01-05', 'end_date': '2024-01-05'}, format='json')
+        self.assertEqual(single.data['scored'], 1)
+
+    def test_range_bounds(self):
+        start = date(2000, 1, 1)
+        last_day = start + timedelta(days=MAX_RANGE_DAYS - 1)
+        cases = [
+            ({'start_date': start.isoformat(), 'end_date': last_day.isoformat()}, 200),
+            ({'start_date': start.isoformat(), 'end_date': (last_day + timedelta(days=1)).isoformat()}, 400),
+            ({'start_date': '2024-01-02', 'end_date': '2024-01-01'}, 400),
+            ({'end_date': '2024-01-01'}, 400),
+            ({'start_date': '2024-02-30'}, 400),
+            ({'start_date': 20240101}, 400),
+        ]
+        for data, expected in cases:
+            with self.subTest(data=data):
+                response = self.client.post(self.url, data, format='json')
+                self.assertEqual(response.status_code, expected, response.content)
+        self.assertFalse(HealthScore.objects.exists())
+
+
+class ScoreAllUsersTests(AnalyticsTestCase):
+    day = date(2024, 1, 2)
+
+    def setUp(self):
+        super().setUp()
+        self.users = [self.user]
+        for index in range(3):
+            user = User.objects.create_user(email=f'user{index}@example.com', password='password')
+            UserPreference.objects.create(user=user)
+            self.users.append(user)
+        for user in self.users:
+            WaterLog.objects.create(user=user, amount=2000, date=self.day, time=time(12))
+
+    def score(self, *args):
+        out = io.StringIO()
+        call_command('score_all_users', '--date', self.day.isoformat(), '--chunk-size', '1', '--workers', '4',
+                     *args, stdout=out)
+        return out.getvalue()
+
+    def scored_users(self):
+        return set(HealthScore.objects.filter(calculation_date=self.day).values_list('user_id', flat=True))
+
+    def test_resumes_after_the_watermark(self):
+        ScoringRun.objects.create(date=self.day, last_user_id=self.users[1].pk, users_scored=2, scores_written=2)
+
+        output = self.score()
+
+        self.assertIn(f'Resuming the run for {self.day} after user {self.users[1].pk}.', output)
+        self.assertIn('scoring in this process', output)
+        self.assertEqual(self.scored_users(), {self.users[2].pk, self.users[3].pk})
+        run = ScoringRun.objects.get(date=self.day)
+        self.assertEqual((run.last_user_id, run.users_scored, run.scores_written), (self.users[3].pk, 4, 4))
+        self.assertIsNotNone(run.completed_at)
+
+        self.assertIn('already calculated', self.score())
+        self.assertEqual(len(self.scored_users()), 2)
+
+        self.score('--restart')
+        self.assertEqual(self.scored_users(), {user.pk for user in self.users})
+        run.refresh_from_db()
+        self.assertEqual((run.users_scored, run.scores_written), (4, 2))
+
+
+class InputFingerprintTests(AnalyticsTestCase):
+    day = date(2024, 1, 2)
+
+    def setUp(self):
+        super().setUp()
+        self.water = WaterLog.objects.create(user=self.user, amount=1500, date=self.day, time=time(12))
+
+    def calculate(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/analytics/health-scores/calculate/', {'date': self.day.isoformat()},
+                                        format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [query['sql'] for query in queries if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+
+    def test_unchanged_inputs_skip_the_write(self):
+        self.assertTrue(self.calculate())
+        score = HealthScore.objects.get(user=self.user, calculation_date=self.day)
+
+        # Neither the day's logs nor the goals changed.
+        self.assertEqual(self.calculate(), [])
+        self.assertEqual(calculate_health_scores([self.user.pk], self.day, self.day), 0)
+        self.assertEqual(score_users_for_day([self.user.pk], self.day), 0)
+        # A save that leaves the rollup inputs alone keeps the fingerprint.
+        self.water.time = time(13)
+        self.water.save(update_fields=['time'])
+        self.assertEqual(self.calculate(), [])
+        score.refresh_from_db()
+        unchanged = score.updated_at
+
+        self.water.amount = 2500
+        self.water.save()
+        self.assertTrue(self.calculate())
+        score.refresh_from_db()
+        self.assertGreater(score.updated_at, unchanged)
+        self.assertEqual(self.calculate(), [])
+
+        preferences = self.user.preferences
+        preferences.daily_water_goal = 3000
+        preferences.save()
+        self.assertEqual(calculate_health_scores([self.user.pk], self.day, self.day), 1)
+        self.assertEqual(score_users_for_day([self.user.pk], self.day), 0)
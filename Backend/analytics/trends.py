@@ -0,0 +1,247 @@
+"""
+NumPy trend engine for numeric health log fields.
+
+``load_series`` reads one or more numeric fields of a log model into arrays
+in a single query; the remaining functions work on those arrays without
+Python-level loops over the points, so multi-year daily series take
+milliseconds.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+from django.db import models
+from django.db.models.functions import TruncDate
+
+from health_records.models import (
+    WorkoutLog, MealLog, WaterLog, SleepLog, VitalsLog, MoodLog
+)
+
+# source name -> (model, field the points are dated by)
+TREND_SOURCES = {
+    'vitals': (VitalsLog, 'date'),
+    'sleep': (SleepLog, 'start_time'),
+    'workouts': (WorkoutLog, 'date'),
+    'meals': (MealLog, 'date'),
+    'water': (WaterLog, 'date'),
+    'mood': (MoodLog, 'date'),
+}
+
+NUMERIC_FIELDS = (models.IntegerField, models.DecimalField, models.FloatField)
+
+# Two-sided 95% Student t critical values for 1..30 degrees of freedom.
+T_CRITICAL_95 = (
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+)
+
+Series = namedtuple('Series', ['dates', 'columns'])
+
+
+def numeric_fields(model):
+    """
+    Return the names of ``model``'s numeric columns, excluding the key.
+    """
+    return [
+        field.name for field in model._meta.concrete_fields
+        if isinstance(field, NUMERIC_FIELDS) and not field.primary_key
+    ]
+
+
+def load_series(user, source, fields, start_date, end_date):
+    """
+    Load ``fields`` of ``user``'s ``source`` logs between the two dates,
+    oldest first, skipping rows where any field is null.
+
+    ``dates`` is a ``datetime64[D]`` array; ``columns`` maps each field to
+    an int64 array for integer fields and a float64 array otherwise.
+    """
+    model, date_field = TREND_SOURCES[source]
+    queryset = model.objects.filter(user=user)
+    if isinstance(model._meta.get_field(date_field), models.DateTimeField):
+        queryset = queryset.filter(**{f'{date_field}__date__range': (start_date, end_date)})
+        queryset = queryset.annotate(point_date=TruncDate(date_field))
+    else:
+        queryset = queryset.filter(**{f'{date_field}__range': (start_date, end_date)})
+        queryset = queryset.annotate(point_date=models.F(date_field))
+
+    for field in fields:
+        queryset = queryset.filter(**{f'{field}__isnull': False})
+
+    rows = list(queryset.order_by(date_field, 'pk').values_list('point_date', *fields))
+    dates = np.array([row[0] for row in rows], dtype='datetime64[D]')
+
+    columns = {}
+    for index, field in enumerate(fields, start=1):
+        integer = isinstance(model._meta.get_field(field), models.IntegerField)
+        columns[field] = np.array([row[index] for row in rows], dtype=np.int64 if integer else np.float64)
+
+    return Series(dates, columns)
+
+
+def rolling_mean(values, window):
+    """
+    Mean of each point and the ``window - 1`` points before it; NaN until
+    ``window`` points are available.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full(values.shape, np.nan)
+    if window < 1 or len(values) < window:
+        return result
+
+    sums = np.cumsum(np.concatenate(([0.0], values)))
+    result[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return result
+
+
+def ewma(values, span):
+    """
+    Exponentially weighted moving average with ``alpha = 2 / (span + 1)``,
+    seeded with the first value.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    result = np.empty(values.shape)
+    if not len(values):
+        return result
+
+    alpha = 2.0 / (span + 1)
+    decay = 1.0 - alpha
+    result[0] = previous = values[0]
+    if decay == 0:
+        result[1:] = values[1:]
+        return result
+
+    # y_k = decay**k * (y_0 + alpha * sum(x_j / decay**j)), evaluated in
+    # blocks short enough that decay**-k stays within float range.
+    block = max(1, int(600 / -np.log(decay)))
+    for start in range(1, len(values), block):
+        chunk = values[start:start + block]
+        powers = decay ** np.arange(1, len(chunk) + 1)
+        result[start:start + len(chunk)] = powers * (previous + alpha * np.cumsum(chunk / powers))
+        previous = result[start + len(chunk) - 1]
+    return result
+
+
+def _t_critical(degrees):
+    if degrees <= len(T_CRITICAL_95):
+        return T_CRITICAL_95[degrees - 1]
+    return 1.96 + 2.4 / degrees
+
+
+def linear_trend(dates, values):
+    """
+    Least-squares line through the points, with the slope per day, its 95%
+    confidence interval and R², or None with fewer than three points on
+    more than one day.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    count = len(values)
+    if count < 3:
+        return None
+
+    days = (dates - dates[0]).astype(np.float64)
+    day_mean = days.mean()
+    value_mean = values.mean()
+    spread = np.sum((days - day_mean) ** 2)
+    if spread == 0:
+        return None
+
+    slope = np.sum((days - day_mean) * (values - value_mean)) / spread
+    intercept = value_mean - slope * day_mean
+    residuals = values - (intercept + slope * days)
+    residual_sum = float(np.sum(residuals ** 2))
+    total_sum = float(np.sum((values - value_mean) ** 2))
+
+    standard_error = np.sqrt(residual_sum / (count - 2) / spread)
+    margin = _t_critical(count - 2) * standard_error
+    return {
+        'slope_per_day': float(slope),
+        'slope_per_week': float(slope * 7),
+        'slope_ci_low': float(slope - margin),
+        'slope_ci_high': float(slope + margin),
+        'intercept': float(intercept),
+        'r_squared': 1 - residual_sum / total_sum if total_sum else 1.0,
+    }
+
+
+def window_delta(values, window):
+    """
+    Return the means of the last ``window`` points and of the ``window``
+    points before them, or None if there are fewer than ``2 * window``.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if window < 1 or len(values) < 2 * window:
+        return None
+    return float(values[-window:].mean()), float(values[-2 * window:-window].mean())
+
+
+def week_over_week(dates, values):
+    """
+    Mean per calendar week (Monday first) with the change from the previous
+    week that has data.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return []
+
+    # 1970-01-01 was a Thursday, so shifting by three days aligns weeks to Monday.
+    weeks = (dates.astype(np.int64) + 3) // 7
+    week_ids, inverse = np.unique(weeks, return_inverse=True)
+    means = np.bincount(inverse, weights=values) / np.bincount(inverse)
+    deltas = np.concatenate(([np.nan], np.diff(means)))
+    starts = (week_ids * 7 - 3).astype('datetime64[D]')
+
+    return [
+        {
+            'week_start': str(start),
+            'mean': float(mean),
+            'delta': None if np.isnan(delta) else float(delta),
+        }
+        for start, mean, delta in zip(starts, means, deltas)
+    ]
+
+
+def as_points(series, names):
+    """
+    Return ``series`` as ``{'date': ..., name: value}`` dicts, where
+    ``names`` maps each output name to a column.
+    """
+    columns = [(name, series.columns[field].tolist()) for name, field in names.items()]
+    return [
+        {'date': day, **{name: values[index] for name, values in columns}}
+        for index, day in enumerate(np.datetime_as_string(series.dates).tolist())
+    ]
+
+
+def _optional(values):
+    return [None if math.isnan(value) else value for value in values.tolist()]
+
+
+def analyze_series(series, field, window=7, span=7):
+    """
+    Rolling mean, EWMA, linear trend and week-over-week means for one
+    column of ``series``.
+    """
+    values = series.columns[field]
+    if not len(values):
+        return None
+
+    rolling = _optional(rolling_mean(values, window))
+    smoothed = ewma(values, span).tolist()
+
+    return {
+        'count': len(values),
+        'mean': float(values.mean()),
+        'latest': values[-1].item(),
+        'rolling_mean': rolling[-1],
+        'ewma': smoothed[-1],
+        'linear_trend': linear_trend(series.dates, values),
+        'week_over_week': week_over_week(series.dates, values),
+        'data_points': [
+            {'date': day, 'value': value, 'rolling_mean': mean, 'ewma': average}
+            for day, value, mean, average in zip(
+                np.datetime_as_string(series.dates).tolist(), values.tolist(), rolling, smoothed
+            )
+        ],
+    }
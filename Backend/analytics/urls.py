@@ -5,7 +5,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     HealthScoreViewSet, RecommendationViewSet, InsightViewSet,
-    TrendAnalysisViewSet, CorrelationAnalysisViewSet, GoalTrackingViewSet
+    TrendAnalysisViewSet, CorrelationAnalysisViewSet, GoalTrackingViewSet,
+    SeriesViewSet
 )
 
 router = DefaultRouter()
@@ -15,6 +16,7 @@ router.register(r'insights', InsightViewSet)
 router.register(r'trends', TrendAnalysisViewSet, basename='trends')
 router.register(r'correlations', CorrelationAnalysisViewSet, basename='correlations')
 router.register(r'goals', GoalTrackingViewSet, basename='goal-tracking')
+router.register(r'series', SeriesViewSet, basename='series')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -2,24 +2,32 @@
 Views for the analytics app.
 """
 from datetime import datetime, timedelta
-import statistics
-from django.db.models import Q, Avg, Count, Sum
-from rest_framework import viewsets, permissions, status, mixins
+from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from users.permissions import IsOwner
-from health_records.models import (
-    WorkoutLog, MealLog, WaterLog, SleepLog, VitalsLog,
-    MedicationLog, MoodLog, HealthGoal
-)
+from health_project.renderers import ColumnarFormatMixin
+from health_project.sparse_fields import SparseFieldsViewMixin
+from health_records.models import SleepLog, MoodLog, HealthGoal
+from health_records.cache import cache_response
+from health_records.rollups import get_rollups
+from health_records.versions import condition_on_data_version
 from .models import HealthScore, Recommendation, Insight
 from .serializers import (
     HealthScoreSerializer, RecommendationSerializer, InsightSerializer,
     TrendAnalysisSerializer, CorrelationAnalysisSerializer
 )
+from .health_scores import (
+    MAX_RANGE_DAYS, apply_scores, calculate_health_scores, input_fingerprint, latest_vitals, score_day
+)
+from .correlations import (
+    DEFAULT_METRICS, coefficient_lists, correlation_matrix, daily_matrix, strongest_pairs
+)
+from .series import BUCKETS, MAX_BUCKETS, SERIES_METRICS, bucket_count, get_series
+from .trends import TREND_SOURCES, analyze_series, as_points, load_series, numeric_fields, window_delta
 
 
-class HealthScoreViewSet(viewsets.ReadOnlyModelViewSet):
+class HealthScoreViewSet(SparseFieldsViewMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for health scores.
     """
@@ -58,188 +66,20 @@ class HealthScoreViewSet(viewsets.ReadOnlyModelViewSet):
                 calculation_date=calculation_date
             )
         
-        # Get relevant health data
-        # This could be encapsulated in a separate scoring service
-        
-        # Nutrition score (based on meals)
-        meals = MealLog.objects.filter(
-            user=request.user,
-            date=calculation_date
-        )
-        
+        # Get relevant health data from the precomputed daily rollup
+        rollup, = get_rollups(request.user, calculation_date, calculation_date)
         user_preferences = request.user.preferences
-        daily_calorie_goal = user_preferences.daily_calorie_goal
-        
-        total_calories = meals.aggregate(total=Sum('total_calories'))['total'] or 0
-        protein_sum = meals.aggregate(total=Sum('protein'))['total'] or 0
-        carbs_sum = meals.aggregate(total=Sum('carbs'))['total'] or 0
-        fat_sum = meals.aggregate(total=Sum('fat'))['total'] or 0
-        
-        # Simple scoring logic - could be much more sophisticated
-        calorie_score = 100 - min(100, abs(total_calories - daily_calorie_goal) / daily_calorie_goal * 100)
-        nutrition_score = calorie_score
-        
-        # Calculate macronutrient balance score if we have the data
-        if protein_sum and carbs_sum and fat_sum:
-            total_macros = protein_sum + carbs_sum + fat_sum
-            protein_pct = (protein_sum / total_macros) * 100
-            carbs_pct = (carbs_sum / total_macros) * 100
-            fat_pct = (fat_sum / total_macros) * 100
-            
-            # Ideal macronutrient distribution (this is simplified)
-            ideal_protein = 25  # 25% of total calories from protein
-            ideal_carbs = 50    # 50% of total calories from carbs
-            ideal_fat = 25      # 25% of total calories from fat
-            
-            macro_balance_score = 100 - (
-                abs(protein_pct - ideal_protein) +
-                abs(carbs_pct - ideal_carbs) +
-                abs(fat_pct - ideal_fat)
-            ) / 2
-            
-            # Combine with calorie score
-            nutrition_score = (calorie_score + macro_balance_score) / 2
-        
-        # Activity score (based on workouts)
-        workouts = WorkoutLog.objects.filter(
-            user=request.user,
-            date=calculation_date
-        )
-        
-        total_duration = workouts.aggregate(total=Sum('duration'))['total'] or 0
-        calories_burned = workouts.aggregate(total=Sum('calories_burned'))['total'] or 0
-        
-        # Base score on minutes of activity (150 min/week is ~21 min/day recommended)
-        activity_score = min(100, total_duration / 30 * 100)
-        
-        # Sleep score
-        # Find sleep logs that end on the given date
-        end_time_min = datetime.combine(calculation_date, datetime.min.time())
-        end_time_max = datetime.combine(calculation_date, datetime.max.time())
-        
-        sleep_logs = SleepLog.objects.filter(
-            user=request.user,
-            end_time__range=(end_time_min, end_time_max)
-        )
-        
-        sleep_duration = sleep_logs.aggregate(total=Avg('duration'))['total'] or 0
-        sleep_quality = sleep_logs.aggregate(avg=Avg('quality'))['avg'] or 0
-        
-        # Score based on 7-9 hours optimal sleep duration and quality
-        duration_score = 100 - min(100, abs(sleep_duration - 8) / 8 * 100)
-        quality_score = sleep_quality / 5 * 100 if sleep_quality else 0
-        sleep_score = (duration_score + quality_score) / 2 if sleep_duration else 0
-        
-        # Hydration score
-        water_logs = WaterLog.objects.filter(
-            user=request.user,
-            date=calculation_date
-        )
-        
-        total_water = water_logs.aggregate(total=Sum('amount'))['total'] or 0
-        daily_water_goal = user_preferences.daily_water_goal
-        
-        hydration_score = min(100, total_water / daily_water_goal * 100)
-        
-        # Vitals score
-        vitals = VitalsLog.objects.filter(
-            user=request.user,
-            date=calculation_date
-        ).order_by('-time').first()
-        
-        vitals_score = None
-        if vitals:
-            # Simplified scoring based on heart rate in normal range
-            if vitals.heart_rate:
-                hr_normal_min, hr_normal_max = 60, 100
-                hr_score = 100 - min(100, abs(vitals.heart_rate - (hr_normal_min + hr_normal_max)/2) / 20 * 100)
-                
-                # Blood pressure scoring (if available)
-                bp_score = None
-                if vitals.blood_pressure_systolic and vitals.blood_pressure_diastolic:
-                    # Simplified scoring based on normal ranges
-                    systolic_normal = 120
-                    diastolic_normal = 80
-                    
-                    systolic_score = 100 - min(100, abs(vitals.blood_pressure_systolic - systolic_normal) / 20 * 100)
-                    diastolic_score = 100 - min(100, abs(vitals.blood_pressure_diastolic - diastolic_normal) / 10 * 100)
-                    
-                    bp_score = (systolic_score + diastolic_score) / 2
-                
-                # Combine available scores
-                vitals_score = hr_score if bp_score is None else (hr_score + bp_score) / 2
-        
-        # Mood score
-        mood_logs = MoodLog.objects.filter(
-            user=request.user,
-            date=calculation_date
-        )
+        goals = (user_preferences.daily_calorie_goal, user_preferences.daily_water_goal)
         
-        avg_mood = mood_logs.aggregate(avg=Avg('mood'))['avg'] or 0
-        mood_score = avg_mood / 5 * 100 if avg_mood else None
-        
-        # Calculate overall health score (weighted average of component scores)
-        components = [
-            (nutrition_score, 0.25),  # 25% weight
-            (activity_score, 0.25),   # 25% weight
-            (sleep_score, 0.2),       # 20% weight
-            (hydration_score, 0.15),  # 15% weight
-        ]
+        # Nothing the score depends on has changed since it was calculated
+        fingerprint = input_fingerprint(rollup, *goals)
+        if existing_score and existing_score.input_fingerprint == fingerprint:
+            return Response(HealthScoreSerializer(existing_score).data)
         
-        # Add optional components if available
-        if vitals_score:
-            components.append((vitals_score, 0.1))  # 10% weight
-        
-        if mood_score:
-            components.append((mood_score, 0.05))  # 5% weight
-            
-        # Calculate weighted average for overall score
-        total_weight = sum(weight for _, weight in components)
-        overall_score = sum(score * (weight/total_weight) for score, weight in components)
-        
-        # Save calculated scores
-        health_score.overall_score = overall_score
-        health_score.nutrition_score = nutrition_score
-        health_score.activity_score = activity_score
-        health_score.sleep_score = sleep_score
-        health_score.hydration_score = hydration_score
-        
-        if vitals_score:
-            health_score.vitals_score = vitals_score
-            
-        if mood_score:
-            health_score.mood_score = mood_score
-            
-        # Save calculation details
-        health_score.calculation_details = {
-            'nutrition': {
-                'total_calories': total_calories,
-                'daily_calorie_goal': daily_calorie_goal,
-                'protein_sum': float(protein_sum) if protein_sum else None,
-                'carbs_sum': float(carbs_sum) if carbs_sum else None,
-                'fat_sum': float(fat_sum) if fat_sum else None,
-            },
-            'activity': {
-                'total_duration': total_duration,
-                'calories_burned': calories_burned,
-            },
-            'sleep': {
-                'duration': float(sleep_duration) if sleep_duration else None,
-                'quality': float(sleep_quality) if sleep_quality else None,
-            },
-            'hydration': {
-                'total_water': total_water,
-                'daily_water_goal': daily_water_goal,
-            },
-            'vitals': {
-                'heart_rate': vitals.heart_rate if vitals and vitals.heart_rate else None,
-                'blood_pressure_systolic': vitals.blood_pressure_systolic if vitals and vitals.blood_pressure_systolic else None,
-                'blood_pressure_diastolic': vitals.blood_pressure_diastolic if vitals and vitals.blood_pressure_diastolic else None,
-            } if vitals else None,
-            'mood': {
-                'average_mood': float(avg_mood) if avg_mood else None,
-            } if avg_mood else None,
-        }
+        vitals = latest_vitals([request.user.pk], calculation_date, calculation_date)
+        scores = score_day(rollup, vitals.get((request.user.pk, calculation_date)), *goals)
+        apply_scores(health_score, scores)
+        health_score.input_fingerprint = fingerprint
         
         health_score.save()
         
@@ -248,6 +88,39 @@ class HealthScoreViewSet(viewsets.ReadOnlyModelViewSet):
         
         return Response(HealthScoreSerializer(health_score).data)
     
+    @action(detail=False, methods=['post'])
+    def calculate_range(self, request):
+        """
+        Calculate and save health scores for every day with logs between
+        start_date and end_date, e.g. after a bulk import.
+        """
+        try:
+            start_date = datetime.strptime(request.data.get('start_date', ''), '%Y-%m-%d').date()
+            end_date = datetime.strptime(
+                request.data.get('end_date', datetime.now().strftime('%Y-%m-%d')), '%Y-%m-%d'
+            ).date()
+        except (TypeError, ValueError):
+            return Response({'error': 'start_date and end_date must use YYYY-MM-DD.'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        if start_date > end_date:
+            return Response({'error': 'start_date must not be after end_date.'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        if (end_date - start_date).days >= MAX_RANGE_DAYS:
+            return Response({'error': f'At most {MAX_RANGE_DAYS} days can be calculated at once.'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        scored = calculate_health_scores([request.user.pk], start_date, end_date)
+        scores = self.get_queryset().filter(calculation_date__range=(start_date, end_date))
+        
+        return Response({
+            'start_date': start_date,
+            'end_date': end_date,
+            'scored': scored,
+            'scores': HealthScoreSerializer(scores, many=True).data,
+        })
+    
     def _generate_recommendations(self, health_score):
         """
         Generate recommendations based on health scores.
@@ -303,7 +176,7 @@ class HealthScoreViewSet(viewsets.ReadOnlyModelViewSet):
             )
 
 
-class RecommendationViewSet(viewsets.ReadOnlyModelViewSet):
+class RecommendationViewSet(SparseFieldsViewMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for recommendations.
     """
@@ -339,7 +212,7 @@ class RecommendationViewSet(viewsets.ReadOnlyModelViewSet):
         return Response({'status': 'recommendation dismissed'})
 
 
-class InsightViewSet(viewsets.ReadOnlyModelViewSet):
+class InsightViewSet(SparseFieldsViewMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for insights.
     """
@@ -361,7 +234,7 @@ class InsightViewSet(viewsets.ReadOnlyModelViewSet):
         return Response({'status': 'insight marked as read'})
 
 
-class TrendAnalysisViewSet(viewsets.ViewSet):
+class TrendAnalysisViewSet(ColumnarFormatMixin, viewsets.ViewSet):
     """
     ViewSet for trend analysis.
     """
@@ -380,20 +253,9 @@ class TrendAnalysisViewSet(viewsets.ViewSet):
         start_date = end_date - timedelta(days=days)
         
         # Get weight measurements in date range
-        vitals_logs = VitalsLog.objects.filter(
-            user=request.user,
-            date__range=(start_date, end_date),
-            weight__isnull=False
-        ).order_by('date')
-        
-        # Format data points
-        data_points = [
-            {
-                'date': log.date.strftime('%Y-%m-%d'),
-                'value': float(log.weight)
-            }
-            for log in vitals_logs
-        ]
+        series = load_series(request.user, 'vitals', ['weight'], start_date, end_date)
+        weights = series.columns['weight']
+        data_points = as_points(series, {'value': 'weight'})
         
         if len(data_points) < 2:
             return Response({
@@ -401,9 +263,8 @@ class TrendAnalysisViewSet(viewsets.ViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Calculate simple trend
-        weights = [point['value'] for point in data_points]
-        first_weight = weights[0]
-        last_weight = weights[-1]
+        first_weight = float(weights[0])
+        last_weight = float(weights[-1])
         weight_change = last_weight - first_weight
         
         if weight_change > 0:
@@ -452,20 +313,9 @@ class TrendAnalysisViewSet(viewsets.ViewSet):
         start_date = end_date - timedelta(days=days)
         
         # Get sleep logs in date range
-        sleep_logs = SleepLog.objects.filter(
-            user=request.user,
-            start_time__date__range=(start_date, end_date)
-        ).order_by('start_time')
-        
-        # Format data points
-        data_points = [
-            {
-                'date': log.start_time.date().strftime('%Y-%m-%d'),
-                'duration': float(log.duration),
-                'quality': log.quality
-            }
-            for log in sleep_logs
-        ]
+        series = load_series(request.user, 'sleep', ['duration', 'quality'], start_date, end_date)
+        durations = series.columns['duration']
+        data_points = as_points(series, {'duration': 'duration', 'quality': 'quality'})
         
         if len(data_points) < 2:
             return Response({
@@ -473,16 +323,12 @@ class TrendAnalysisViewSet(viewsets.ViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Calculate trends
-        durations = [point['duration'] for point in data_points]
-        avg_duration = sum(durations) / len(durations)
+        avg_duration = float(durations.mean())
         
         # Check for trend in last week vs. previous period
-        if len(durations) >= 14:
-            recent_durations = durations[-7:]
-            earlier_durations = durations[-14:-7]
-            
-            recent_avg = sum(recent_durations) / len(recent_durations)
-            earlier_avg = sum(earlier_durations) / len(earlier_durations)
+        week_averages = window_delta(durations, 7)
+        if week_averages is not None:
+            recent_avg, earlier_avg = week_averages
             
             duration_change = recent_avg - earlier_avg
             
@@ -524,6 +370,54 @@ class TrendAnalysisViewSet(viewsets.ViewSet):
         
         serializer = TrendAnalysisSerializer(result)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def metric(self, request):
+        """
+        Rolling mean, EWMA, least-squares slope and week-over-week means for
+        any numeric field of a log type.
+        """
+        source = request.query_params.get('source', '')
+        if source not in TREND_SOURCES:
+            return Response({'error': f"Invalid source. Must be one of: {', '.join(TREND_SOURCES)}."}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        model, _ = TREND_SOURCES[source]
+        fields = numeric_fields(model)
+        field = request.query_params.get('field', '')
+        if field not in fields:
+            return Response({'error': f"Invalid field. Must be one of: {', '.join(fields)}."}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            days = int(request.query_params.get('days', 90))
+            window = int(request.query_params.get('window', 7))
+            span = int(request.query_params.get('span', 7))
+        except ValueError:
+            return Response({'error': 'days, window and span must be integers.'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        if days < 1 or window < 1 or span < 1:
+            return Response({'error': 'days, window and span must be positive.'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        end_date = datetime.now().date()
+        start_date = end_date - timedelta(days=days)
+        series = load_series(request.user, source, [field], start_date, end_date)
+        
+        if len(series.dates) < 2:
+            return Response({
+                'error': 'Not enough data points for trend analysis'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'source': source,
+            'field': field,
+            'time_period': f'last {days} days',
+            'window': window,
+            'span': span,
+            **analyze_series(series, field, window, span)
+        })
 
 
 class CorrelationAnalysisViewSet(viewsets.ViewSet):
@@ -531,6 +425,8 @@ class CorrelationAnalysisViewSet(viewsets.ViewSet):
     ViewSet for correlation analysis.
     """
     permission_classes = [permissions.IsAuthenticated]
+    max_lag = 30
+    min_points = 5
     
     @action(detail=False, methods=['get'])
     def sleep_mood(self, request):
@@ -682,6 +578,54 @@ class CorrelationAnalysisViewSet(viewsets.ViewSet):
         
         serializer = CorrelationAnalysisSerializer(result)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    @condition_on_data_version
+    @cache_response
+    def matrix(self, request):
+        """
+        Pearson and Spearman coefficients between every pair of daily metrics,
+        optionally with the second metric ``lag`` days later.
+        """
+        metrics = [
+            metric.strip()
+            for metric in request.query_params.get('metrics', '').split(',')
+            if metric.strip()
+        ] or list(DEFAULT_METRICS)
+        
+        unknown = [metric for metric in metrics if metric not in SERIES_METRICS]
+        if unknown:
+            return Response({'error': f"Unknown metric(s): {', '.join(unknown)}."}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        metrics = list(dict.fromkeys(metrics))
+        
+        try:
+            days = int(request.query_params.get('days', 90))
+            lag = int(request.query_params.get('lag', 0))
+        except ValueError:
+            return Response({'error': 'days and lag must be integers.'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        if not 1 <= days <= MAX_BUCKETS or not 0 <= lag <= self.max_lag:
+            return Response({'error': f'days must be between 1 and {MAX_BUCKETS} and lag between 0 and {self.max_lag}.'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        end_date = datetime.now().date()
+        start_date = end_date - timedelta(days=days - 1)
+        
+        values = daily_matrix(request.user, metrics, start_date, end_date)
+        pearson, spearman, counts = correlation_matrix(values, lag, self.min_points)
+        
+        return Response({
+            'start_date': start_date,
+            'end_date': end_date,
+            'lag': lag,
+            'metrics': metrics,
+            'pearson': coefficient_lists(pearson),
+            'spearman': coefficient_lists(spearman),
+            'days': counts.tolist(),
+            'pairs': strongest_pairs(metrics, pearson, spearman, counts, lag)
+        })
 
 
 class GoalTrackingViewSet(viewsets.ViewSet):
@@ -737,4 +681,61 @@ class GoalTrackingViewSet(viewsets.ViewSet):
                 'status': status
             })
         
-        return Response(goals_data)
\ No newline at end of file
+        return Response(goals_data)
+
+class SeriesViewSet(ColumnarFormatMixin, viewsets.ViewSet):
+    """
+    ViewSet for bucketed metric time series.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    @condition_on_data_version
+    @cache_response
+    def list(self, request):
+        """
+        Return ``metrics`` bucketed by ``bucket`` between ``start`` and ``end``.
+        """
+        metrics = [
+            metric.strip()
+            for metric in request.query_params.get('metrics', '').split(',')
+            if metric.strip()
+        ]
+        if not metrics:
+            return Response({'error': f"Pass metrics as a comma-separated list of: {', '.join(SERIES_METRICS)}."}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        unknown = [metric for metric in metrics if metric not in SERIES_METRICS]
+        if unknown:
+            return Response({'error': f"Unknown metric(s): {', '.join(unknown)}."}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        metrics = list(dict.fromkeys(metrics))
+        
+        bucket = request.query_params.get('bucket', 'day')
+        if bucket not in BUCKETS:
+            return Response({'error': f"Invalid bucket. Must be one of: {', '.join(BUCKETS)}."}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            end_str = request.query_params.get('end')
+            end_date = datetime.strptime(end_str, '%Y-%m-%d').date() if end_str else datetime.now().date()
+            start_str = request.query_params.get('start')
+            start_date = datetime.strptime(start_str, '%Y-%m-%d').date() if start_str else end_date - timedelta(days=29)
+        except ValueError:
+            return Response({'error': 'Invalid date format. Use YYYY-MM-DD.'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        if start_date > end_date:
+            return Response({'error': 'start must not be after end.'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        if bucket_count(start_date, end_date, bucket) > MAX_BUCKETS:
+            return Response({'error': f'At most {MAX_BUCKETS} buckets can be requested; use a larger bucket.'}, 
+                           status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'start': start_date,
+            'end': end_date,
+            'bucket': bucket,
+            'metrics': metrics,
+            'series': get_series(request.user, metrics, start_date, end_date, bucket)
+        })
@@ -0,0 +1,71 @@
+"""
+MessagePack extension types accepted in request bodies.
+
+Responses carry exactly the values the JSON renderer would: decimals,
+dates, times, datetimes and UUIDs are strings, whichever endpoint they
+come from. A field therefore has the same type in every response, and
+clients parse it the way they parse the JSON API.
+
+Clients may send those values as extension types whose payload is the
+same UTF-8 string; the parser decodes them back into Python objects:
+
+====  ==========================================
+code  payload
+====  ==========================================
+1     ``Decimal`` as a decimal string
+2     ``date`` as ``YYYY-MM-DD``
+3     ``time`` as ISO 8601
+4     ``datetime`` as ISO 8601, with its offset if aware
+====  ==========================================
+
+Incoming msgpack timestamps (extension -1) are decoded as UTC datetimes.
+Free-form JSON fields such as ``MealLog.food_items`` must still hold plain
+JSON values.
+"""
+import datetime
+import decimal
+
+import msgpack
+
+DECIMAL_EXT = 1
+DATE_EXT = 2
+TIME_EXT = 3
+DATETIME_EXT = 4
+
+DECODERS = {
+    DECIMAL_EXT: decimal.Decimal,
+    DATE_EXT: datetime.date.fromisoformat,
+    TIME_EXT: datetime.time.fromisoformat,
+    DATETIME_EXT: datetime.datetime.fromisoformat,
+}
+
+
+def encode_ext(obj):
+    """
+    Return the extension type for ``obj``, or None if it has none. Used by
+    Python clients as ``msgpack.packb(data, default=encode_ext)``.
+    """
+    # datetime is a date subclass, so it is checked first.
+    if isinstance(obj, datetime.datetime):
+        return msgpack.ExtType(DATETIME_EXT, obj.isoformat().encode())
+    if isinstance(obj, datetime.date):
+        return msgpack.ExtType(DATE_EXT, obj.isoformat().encode())
+    if isinstance(obj, datetime.time):
+        return msgpack.ExtType(TIME_EXT, obj.isoformat().encode())
+    if isinstance(obj, decimal.Decimal):
+        return msgpack.ExtType(DECIMAL_EXT, str(obj).encode())
+    return None
+
+
+def decode_ext(code, data):
+    """
+    ``ext_hook`` for ``msgpack.unpackb``. Unknown codes are left as
+    ``ExtType`` values.
+    """
+    decoder = DECODERS.get(code)
+    if decoder is None:
+        return msgpack.ExtType(code, data)
+    try:
+        return decoder(data.decode())
+    except decimal.InvalidOperation:
+        raise ValueError(f'Invalid decimal extension value {data!r}.')
@@ -0,0 +1,28 @@
+"""
+Project-wide DRF parsers.
+"""
+import msgpack
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from .msgpack_ext import decode_ext
+
+
+class MessagePackParser(BaseParser):
+    """
+    Parses ``application/msgpack`` request bodies, decoding the extension
+    types in ``msgpack_ext`` back into Decimals, dates, times and datetimes.
+    """
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(
+                stream.read(),
+                ext_hook=decode_ext,
+                timestamp=3,
+                raw=False,
+                strict_map_key=False,
+            )
+        except (ValueError, TypeError, msgpack.UnpackException) as exc:
+            raise ParseError(f'MessagePack parse error - {str(exc) or type(exc).__name__}')
@@ -0,0 +1,102 @@
+"""
+Project-wide DRF renderers.
+"""
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in ``JSONRenderer`` that encodes with orjson when it is installed.
+
+    Dates, times, datetimes and Decimals are passed to DRF's own
+    ``JSONEncoder.default`` so they come out exactly as before. Indented
+    output (browsable API, ``; indent=N``), payloads orjson cannot encode
+    and installs without orjson use the stdlib renderer. Unlike the stdlib
+    renderer, NaN and infinity are written as ``null`` instead of raising.
+    """
+    options = (
+        (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+    )
+
+    def __init__(self):
+        self._default = self.encoder_class().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self._default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same escaping as JSONRenderer keeps the output a strict JavaScript subset.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders ``application/msgpack``. Values msgpack has no type for are
+    converted as for JSON, so the decoded body equals the JSON one; see
+    ``msgpack_ext`` for why no extension types are sent.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    encoder_class = encoders.JSONEncoder
+
+    def __init__(self):
+        self.default = self.encoder_class().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=self.default, use_bin_type=True, datetime=False)
+
+
+def to_columns(data):
+    """
+    Turn every non-empty list of objects in ``data`` into an object of
+    lists, one per key. Rows missing a key get ``None`` in that column.
+    """
+    if isinstance(data, dict):
+        return {key: to_columns(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        if data and all(isinstance(row, dict) for row in data):
+            keys = dict.fromkeys(key for row in data for key in row)
+            return {key: [to_columns(row.get(key)) for row in data] for key in keys}
+        return [to_columns(item) for item in data]
+    return data
+
+
+class ColumnarJSONRenderer(ORJSONRenderer):
+    """
+    JSON selected with ``?format=columnar``: row arrays are sent as
+    per-key arrays (``{"date": [...], "calories": [...]}``) that charts can
+    use directly.
+    """
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_columns(data), accepted_media_type, renderer_context)
+
+
+class ColumnarFormatMixin:
+    """
+    Viewset mixin that offers ``?format=columnar`` next to the default
+    renderers.
+    """
+    def get_renderers(self):
+        return [*super().get_renderers(), ColumnarJSONRenderer()]
@@ -5,6 +5,7 @@ Django settings for health_project project.
 import os
 from datetime import timedelta
 from pathlib import Path
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -147,6 +148,33 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Caching. Set REDIS_URL to share cached responses between processes
+# (requires the redis package).
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'health-tracker',
+        }
+    }
+
+# Per-user summary and report cache: an in-process LRU in front of the
+# shared cache, when there is one
+RESPONSE_CACHE = {
+    'MAX_ENTRIES': int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 2048)),
+    'TIMEOUT': int(os.getenv('RESPONSE_CACHE_TIMEOUT', 3600)),
+    'SHARED_ALIAS': 'default' if REDIS_URL else None,
+}
+
 # Custom user model
 AUTH_USER_MODEL = 'users.User'
 
@@ -158,6 +186,17 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'health_project.renderers.ORJSONRenderer',
+        'health_project.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'health_project.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
 }
@@ -184,6 +223,25 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
 ]
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+
+# Deleted records are reported to sync clients for this long
+SYNC_TOMBSTONE_RETENTION = timedelta(days=int(os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', 90)))
+
+# Idempotency keys for create requests
+IDEMPOTENCY_KEY_TTL = timedelta(hours=int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', 24)))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', 10000))
+# Unfinished requests hold their key this long; then a retry may take it over
+IDEMPOTENCY_LEASE = timedelta(minutes=int(os.getenv('IDEMPOTENCY_LEASE_MINUTES', 5)))
+
+# Vitals readings further than Z_THRESHOLD standard deviations from the
+# user's running mean create an anomaly insight once MIN_SAMPLES readings
+# of that field exist.
+ANOMALY_DETECTION = {
+    'FIELDS': ('heart_rate', 'blood_pressure_systolic', 'blood_pressure_diastolic', 'glucose', 'temperature'),
+    'Z_THRESHOLD': float(os.getenv('ANOMALY_Z_THRESHOLD', 3.0)),
+    'MIN_SAMPLES': int(os.getenv('ANOMALY_MIN_SAMPLES', 10)),
+}
 
 # Security settings for production
 if not DEBUG:
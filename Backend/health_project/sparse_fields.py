@@ -0,0 +1,76 @@
+"""
+Sparse fieldsets: ``?fields=date,amount`` and ``?exclude=notes``.
+
+``DynamicFieldsMixin`` trims the fields a model serializer renders on GET
+requests and ``SparseFieldsViewMixin`` trims the SELECT to match with
+``.only()``, so a chart that needs two columns neither loads nor ships the
+rest.
+"""
+from rest_framework.exceptions import ValidationError
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def _param_names(request, param):
+    names = set()
+    for value in request.query_params.getlist(param):
+        names.update(name.strip() for name in value.split(',') if name.strip())
+    return names
+
+
+def requested_fields(request):
+    """
+    Return ``(fields, exclude)`` from the query string; ``fields`` is None
+    when every field is wanted.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None, set()
+    return _param_names(request, 'fields') or None, _param_names(request, 'exclude')
+
+
+class DynamicFieldsMixin:
+    """
+    Model serializer mixin that honours ``?fields=`` and ``?exclude=`` on
+    read requests. Unknown field names are rejected with a 400.
+    """
+    def get_field_names(self, declared_fields, info):
+        names = super().get_field_names(declared_fields, info)
+        fields, exclude = requested_fields(self.context.get('request'))
+        if fields is None and not exclude:
+            return names
+
+        unknown = ((fields or set()) | exclude) - set(names)
+        if unknown:
+            raise ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}."})
+
+        return [
+            name for name in names
+            if (fields is None or name in fields) and name not in exclude
+        ]
+
+
+class SparseFieldsViewMixin:
+    """
+    Viewset mixin that loads only the model columns the serializer renders,
+    plus the primary key and any fields named in ``keyset_ordering``.
+    """
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+
+        fields, exclude = requested_fields(self.request)
+        if fields is None and not exclude:
+            return queryset
+
+        serializer = self.get_serializer()
+        model_fields = {
+            field.name for field in queryset.model._meta.concrete_fields
+        }
+        # The owner is kept for object permission checks.
+        keep = {queryset.model._meta.pk.name} | ({'user'} & model_fields)
+        keep.update(field.lstrip('-') for field in getattr(self, 'keyset_ordering', ()))
+
+        columns = [
+            field.source for field in serializer.fields.values()
+            if field.source in model_fields
+        ]
+        return queryset.only(*keep, *columns)
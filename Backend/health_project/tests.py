@@ -0,0 +1,136 @@
+"""
+Tests for the project-wide renderers.
+"""
+import io
+import json
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import skipIf
+
+import msgpack
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from .msgpack_ext import encode_ext
+from .parsers import MessagePackParser
+from .renderers import MessagePackRenderer, ORJSONRenderer, orjson, to_columns
+
+# Payloads whose bytes must match JSONRenderer exactly.
+GOLDEN_CASES = {
+    'empty containers': [[], {}, ()],
+    'scalars': [None, True, False, 0, -1, 2 ** 63 - 1, 2 ** 64, 0.1, 0.1 + 0.2, -0.0, 123456789.125],
+    'strings': ['', 'plain', 'quote " backslash \\ newline \n tab \t', '\x00\x1f', 'café ☃ \U0001f600'],
+    'line separators': ['a\u2028b\u2029c'],
+    'lazy strings': [gettext_lazy('Daily Report')],
+    'decimals': [Decimal('0'), Decimal('1.10'), Decimal('-72.50'), Decimal('1E+3'), Decimal('123456789.123456789')],
+    'dates': [date(2024, 2, 29), date(1, 1, 1)],
+    'times': [time(0, 0), time(7, 30, 15), time(23, 59, 59, 999999)],
+    'naive datetimes': [datetime(2024, 1, 1, 8, 0), datetime(2024, 1, 1, 8, 0, 0, 1234)],
+    'utc datetimes': [datetime(2024, 1, 1, 8, 0, tzinfo=dt_timezone.utc)],
+    'zoned datetimes': [
+        datetime(2024, 7, 1, 8, 0, 0, 500, tzinfo=dt_timezone(timedelta(hours=1))),
+        datetime(2024, 7, 1, 8, 0, tzinfo=dt_timezone(timedelta(hours=5, minutes=30))),
+    ],
+    'timedeltas': [timedelta(minutes=90)],
+    'non-string keys': [{1: 'a', 2.5: 'b', None: 'd'}, {True: 'c', False: 'e'}],
+    'ordered and serializer containers': [
+        OrderedDict([('b', 1), ('a', 2)]),
+        ReturnDict([('id', 1), ('weight', '72.50')], serializer=None),
+        ReturnList([{'id': 1}], serializer=None),
+    ],
+    'nested': [{'report': {'days': [{'date': date(2024, 1, 1), 'weight': Decimal('72.5'), 'scores': [1.5, None]}]}}],
+}
+
+# Floats that orjson spells differently (``1e16`` vs ``1e+16``); the values
+# must still parse to the same numbers.
+EQUIVALENT_CASES = {
+    'float exponents': [1e16, 1e-7, 1e22, 5e-324, 1.7976931348623157e308],
+}
+
+
+@skipIf(orjson is None, 'orjson is not installed; ORJSONRenderer uses the stdlib renderer.')
+class ORJSONRendererTests(SimpleTestCase):
+
+    def setUp(self):
+        self.stdlib, self.fast = JSONRenderer(), ORJSONRenderer()
+
+    def test_output_matches_json_renderer(self):
+        for name, cases in GOLDEN_CASES.items():
+            for case in cases:
+                with self.subTest(name=name, case=case):
+                    self.assertEqual(self.fast.render([case]), self.stdlib.render([case]))
+
+    def test_float_exponents_parse_to_the_same_values(self):
+        for name, cases in EQUIVALENT_CASES.items():
+            for case in cases:
+                with self.subTest(name=name, case=case):
+                    self.assertEqual(json.loads(self.fast.render([case])), json.loads(self.stdlib.render([case])))
+
+
+class MessagePackTests(SimpleTestCase):
+
+    values = {
+        'date': date(2024, 2, 29),
+        'naive datetime': datetime(2024, 1, 1, 8, 0, 0, 1234),
+        'zoned datetime': datetime(2024, 7, 1, 8, 0, tzinfo=dt_timezone(timedelta(hours=5, minutes=30))),
+        'time': time(7, 30, 15),
+        'decimal': Decimal('-72.50'),
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    }
+
+    def setUp(self):
+        self.renderer, self.parser = MessagePackRenderer(), MessagePackParser()
+
+    def parse(self, body):
+        return self.parser.parse(io.BytesIO(body))
+
+    def test_responses_hold_the_json_values(self):
+        for name, value in self.values.items():
+            with self.subTest(name=name):
+                payload = {'value': value, 'nested': [{'value': value}]}
+                self.assertEqual(self.parse(self.renderer.render(payload)),
+                                 json.loads(JSONRenderer().render(payload)))
+
+    def test_request_extension_types_round_trip(self):
+        for name, value in self.values.items():
+            with self.subTest(name=name):
+                # UUIDs have no extension type and are sent as strings.
+                body = msgpack.packb({'value': value}, default=lambda obj: encode_ext(obj) or str(obj))
+                parsed = self.parse(body)['value']
+                self.assertEqual(parsed, str(value) if name == 'uuid' else value)
+                self.assertEqual(type(parsed), str if name == 'uuid' else type(value))
+
+    def test_msgpack_timestamps_decode_as_utc(self):
+        moment = datetime(2024, 1, 1, 8, 0, tzinfo=dt_timezone.utc)
+        self.assertEqual(self.parse(msgpack.packb(moment, datetime=True)), moment)
+
+
+class ColumnarTests(SimpleTestCase):
+
+    def test_rows_become_one_list_per_key(self):
+        rows = [{'date': '2024-01-01', 'value': 1}, {'value': 2, 'note': 'x'}]
+        self.assertEqual(to_columns(rows), {
+            'date': ['2024-01-01', None],
+            'value': [1, 2],
+            'note': [None, 'x'],
+        })
+
+    def test_nested_rows_and_other_values(self):
+        data = {
+            'days': [{'date': 'a', 'scores': [{'v': 1}, {'v': 2}]}],
+            'empty': [],
+            'plain': [1, 'two', None],
+            'mixed': [{'v': 1}, 2],
+            'totals': {'calories': 10},
+        }
+        self.assertEqual(to_columns(data), {
+            'days': {'date': ['a'], 'scores': [{'v': [1, 2]}]},
+            'empty': [],
+            'plain': [1, 'two', None],
+            'mixed': [{'v': 1}, 2],
+            'totals': {'calories': 10},
+        })
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class HealthRecordsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'health_records'
\ No newline at end of file
+    name = 'health_records'
+
+    def ready(self):
+        from . import signals  # noqa: F401
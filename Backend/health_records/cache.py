@@ -0,0 +1,160 @@
+"""
+Per-user response cache for summaries and reports.
+
+Responses are keyed by (user, endpoint, query parameters, data version).
+Any write to a user's records bumps their data version, so their cached
+responses stop matching immediately while other users' entries stay valid.
+Entries live in a bounded in-process LRU and, when ``RESPONSE_CACHE``
+names a shared cache alias, in that backend as well.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .versions import get_request_data_version
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU mapping with a fixed number of entries.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._data)
+    
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+    
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+    
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class ResponseCache:
+    """
+    Two-tier cache: an in-process LRU in front of an optional shared
+    Django cache backend. Keeps hit and miss counters for monitoring.
+    """
+    def __init__(self, max_entries=2048, timeout=3600, shared_alias=None):
+        self.local = LRUCache(max_entries)
+        self.timeout = timeout
+        self.shared_alias = shared_alias
+        self._lock = threading.Lock()
+        self.reset_stats()
+    
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+    
+    def make_key(self, user_id, endpoint, params, version):
+        query = '&'.join(f'{name}={value}' for name, value in sorted(params.items()))
+        digest = hashlib.sha256(query.encode('utf-8')).hexdigest()[:16]
+        return f'response:{user_id}:{endpoint}:{version}:{digest}'
+    
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            self._count('local_hits')
+            return value
+        
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+                self._count('shared_hits')
+                return value
+        
+        self._count('misses')
+        return None
+    
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value, self.timeout)
+    
+    def clear(self):
+        self.local.clear()
+    
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['local_hits'] + stats['shared_hits']) / lookups if lookups else 0
+        stats['local_entries'] = len(self.local)
+        stats['local_max_entries'] = self.local.max_size
+        stats['shared_backend'] = self.shared_alias
+        return stats
+    
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+    
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+
+response_cache = ResponseCache(**{
+    key.lower(): value for key, value in getattr(settings, 'RESPONSE_CACHE', {}).items()
+})
+
+
+def cache_response(view_method):
+    """
+    Serve a GET action from ``response_cache``. Requests with ``save=true``
+    write a SavedReport and always run the view.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        params = request.query_params
+        if params.get('save', 'false').lower() == 'true':
+            return view_method(self, request, *args, **kwargs)
+        
+        version, _ = get_request_data_version(request)
+        # The data does not depend on the output format, and views default
+        # to today's date, so the day is part of the key.
+        params = params.dict()
+        params.pop(api_settings.URL_FORMAT_OVERRIDE, None)
+        key = response_cache.make_key(
+            request.user.pk,
+            f'{self.basename}.{self.action}',
+            {**params, '_today': date.today().isoformat()},
+            version
+        )
+        
+        data = response_cache.get(key)
+        if data is not None:
+            return Response(data)
+        
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            response_cache.set(key, response.data)
+        return response
+    
+    return wrapper
@@ -0,0 +1,176 @@
+"""
+Read-only fast path for the health log list endpoints.
+
+Building a ``ModelSerializer`` representation per row instantiates a model
+and walks every serializer field. For plain model fields the result only
+depends on the column value, so ``FastReader`` reads ``.values()`` rows and
+applies one precompiled converter per column instead. Converters reproduce
+the DRF field output exactly; serializers with any other kind of field
+fall back to the normal path.
+"""
+import datetime
+import decimal
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.settings import ISO_8601, api_settings
+
+from .cache import LRUCache
+
+# Fields whose representation of a column value is the value itself.
+IDENTITY_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.BooleanField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class _Unsupported(Exception):
+    """
+    Raised by a converter factory for field options it cannot reproduce.
+    """
+
+
+def _identity(field):
+    return None
+
+
+def _float(field):
+    return float
+
+
+def _json(field):
+    if field.binary:
+        raise _Unsupported
+    return None
+
+
+def _iso_format(field):
+    if getattr(field, 'format', ISO_8601).lower() != ISO_8601:
+        raise _Unsupported
+    return lambda value: value.isoformat()
+
+
+def _datetime(field):
+    if getattr(field, 'format', ISO_8601).lower() != ISO_8601:
+        raise _Unsupported
+
+    def convert(value, tz=None):
+        if tz is not None:
+            value = value.astimezone(tz) if timezone.is_aware(value) else timezone.make_aware(value, tz)
+        elif timezone.is_aware(value):
+            value = timezone.make_naive(value, datetime.timezone.utc)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    convert.needs_timezone = True
+    return convert
+
+
+def _decimal(field):
+    if field.localize or field.decimal_places is None:
+        raise _Unsupported
+
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    rounding = field.rounding
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+
+    def convert(value):
+        quantized = value.quantize(exponent, rounding=rounding, context=context)
+        return '{:f}'.format(quantized) if coerce_to_string else quantized
+    return convert
+
+
+CONVERTER_FACTORIES = {
+    serializers.FloatField: _float,
+    serializers.JSONField: _json,
+    serializers.DateField: _iso_format,
+    serializers.TimeField: _iso_format,
+    serializers.DateTimeField: _datetime,
+    serializers.DecimalField: _decimal,
+}
+CONVERTER_FACTORIES.update({field_class: _identity for field_class in IDENTITY_FIELDS})
+
+
+class FastReader:
+    """
+    Precompiled ``.values()`` reader for one serializer field set.
+    """
+    # Keyed by serializer class and field names, which ``?fields=`` varies.
+    _cache = LRUCache(256)
+
+    def __init__(self, columns):
+        # (output name, column, converter or None) per readable field
+        self.columns = columns
+
+    @classmethod
+    def for_serializer(cls, serializer):
+        """
+        Return the reader for ``serializer``'s current fields, or None if
+        one of them needs the regular serializer.
+        """
+        fields = list(serializer._readable_fields)
+        key = (type(serializer), tuple(field.field_name for field in fields))
+        # Wrapped in a tuple so that serializers without a reader are cached too.
+        entry = cls._cache.get(key)
+        if entry is None:
+            entry = (cls._compile(serializer.Meta.model, fields),)
+            cls._cache.set(key, entry)
+        return entry[0]
+
+    @classmethod
+    def _compile(cls, model, fields):
+        model_fields = {field.name for field in model._meta.concrete_fields}
+        columns = []
+        for field in fields:
+            factory = CONVERTER_FACTORIES.get(type(field))
+            if factory is None or field.source not in model_fields:
+                return None
+            try:
+                converter = factory(field)
+            except _Unsupported:
+                return None
+            columns.append((field.field_name, field.source, converter))
+        return cls(columns)
+
+    def values(self, queryset, extra=()):
+        """
+        ``queryset.values()`` with the columns this reader needs, plus
+        ``extra`` columns used by pagination.
+        """
+        names = [column for _, column, _ in self.columns]
+        names += [name for name in extra if name not in names]
+        return queryset.values(*names)
+
+    def render(self, rows):
+        """
+        Convert ``.values()`` rows into serializer-identical dicts.
+        """
+        tz = timezone.get_current_timezone() if settings.USE_TZ else None
+        columns = []
+        for name, column, converter in self.columns:
+            if getattr(converter, 'needs_timezone', False):
+                converter = _bind_timezone(converter, tz)
+            columns.append((name, column, converter))
+
+        return [
+            {
+                name: (
+                    row[column] if converter is None or row[column] is None
+                    else converter(row[column])
+                )
+                for name, column, converter in columns
+            }
+            for row in rows
+        ]
+
+
+def _bind_timezone(converter, tz):
+    return lambda value: converter(value, tz)
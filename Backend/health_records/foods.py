@@ -0,0 +1,141 @@
+"""
+Extraction of ``MealLog.food_items`` into ``FoodItemEntry`` rows.
+
+``food_items`` is free-form JSON; the usual shape is a list of objects with
+a ``name`` and optional ``calories``, ``protein``, ``carbs``, ``fat`` and
+``quantity``. Plain strings are accepted as names. Names are normalized and
+stored once in ``FoodName``.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .models import MealLog, FoodName, FoodItemEntry
+
+NAME_KEYS = ('name', 'food', 'item')
+DECIMAL_LIMIT = Decimal('1000000')
+
+
+def normalize_food_name(name):
+    return ' '.join(str(name).split()).lower()[:200]
+
+
+def _decimal(value):
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        value = Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        return None
+    return value if abs(value) < DECIMAL_LIMIT else None
+
+
+def _integer(value):
+    value = _decimal(value)
+    return int(value.to_integral_value()) if value is not None else None
+
+
+def parse_food_items(food_items):
+    """
+    Return ``(name, values)`` pairs for the recognizable items of a
+    ``food_items`` value, skipping entries without a name.
+    """
+    if isinstance(food_items, (str, dict)):
+        food_items = [food_items]
+    if not isinstance(food_items, list):
+        return []
+
+    items = []
+    for item in food_items:
+        if isinstance(item, str):
+            item = {'name': item}
+        if not isinstance(item, dict):
+            continue
+
+        name = next((item[key] for key in NAME_KEYS if isinstance(item.get(key), str)), '')
+        name = normalize_food_name(name)
+        if not name:
+            continue
+
+        items.append((name, {
+            'quantity': _decimal(item.get('quantity')),
+            'calories': _integer(item.get('calories')),
+            'protein': _decimal(item.get('protein')),
+            'carbs': _decimal(item.get('carbs')),
+            'fat': _decimal(item.get('fat')),
+        }))
+    return items
+
+
+def get_food_ids(names):
+    """
+    Map each name to its ``FoodName`` id, creating missing names.
+    """
+    names = set(names)
+    if not names:
+        return {}
+
+    food_ids = dict(FoodName.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = names - food_ids.keys()
+    if missing:
+        FoodName.objects.bulk_create([FoodName(name=name) for name in missing], ignore_conflicts=True)
+        food_ids.update(FoodName.objects.filter(name__in=missing).values_list('name', 'id'))
+    return food_ids
+
+
+def sync_food_entries(meals, replace=True):
+    """
+    Write the food item entries of ``meals``. With ``replace`` their
+    existing entries are removed first; new meals have none.
+    """
+    meals = [meal for meal in meals if meal.pk is not None]
+    if not meals:
+        return 0
+
+    parsed = [(meal, parse_food_items(meal.food_items)) for meal in meals]
+
+    with transaction.atomic():
+        if replace:
+            FoodItemEntry.objects.filter(meal__in=[meal.pk for meal in meals]).delete()
+
+        food_ids = get_food_ids(name for _, items in parsed for name, _ in items)
+        entries = [
+            FoodItemEntry(
+                meal_id=meal.pk,
+                user_id=meal.user_id,
+                food_id=food_ids[name],
+                date=meal.date,
+                position=position,
+                **values
+            )
+            for meal, items in parsed
+            for position, (name, values) in enumerate(items)
+        ]
+        FoodItemEntry.objects.bulk_create(entries, batch_size=1000)
+
+    return len(entries)
+
+
+def rebuild_food_entries(user_ids=None, batch_size=1000):
+    """
+    Re-extract the food item entries of all meals, optionally only for some
+    users. Returns the number of entries written.
+    """
+    meals = MealLog.objects.order_by('pk').only('pk', 'user_id', 'date', 'food_items')
+    entries = FoodItemEntry.objects.all()
+    if user_ids is not None:
+        meals = meals.filter(user_id__in=user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+
+    entries.delete()
+
+    written = 0
+    batch = []
+    for meal in meals.iterator(chunk_size=batch_size):
+        batch.append(meal)
+        if len(batch) == batch_size:
+            written += sync_food_entries(batch, replace=False)
+            batch = []
+    written += sync_food_entries(batch, replace=False)
+
+    return written
@@ -0,0 +1,138 @@
+"""
+Idempotency-Key support for create endpoints.
+
+A client that retries a create request with the same ``Idempotency-Key``
+header gets the stored response back instead of a second row. Keys live in
+the ``IdempotencyKey`` table for ``IDEMPOTENCY_KEY_TTL``; finished keys are
+also held in a bounded in-process LRU so replays usually skip the database.
+A request that never finishes (e.g. its worker was killed) only holds its
+key for ``IDEMPOTENCY_LEASE``, after which a retry can take the key over.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import LRUCache
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+_finished_keys = LRUCache(getattr(settings, 'IDEMPOTENCY_CACHE_SIZE', 10000))
+
+
+def _fingerprint(request):
+    digest = hashlib.sha256()
+    digest.update(request.method.encode('utf-8'))
+    digest.update(request.path.encode('utf-8'))
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _lookup(user_id, key):
+    """
+    Return the live ``IdempotencyKey`` for ``(user_id, key)``, dropping it if
+    it has expired or is an unfinished reservation past its lease.
+    """
+    record = _finished_keys.get((user_id, key))
+    if record is None:
+        record = IdempotencyKey.objects.filter(user_id=user_id, key=key).first()
+    
+    if record is None:
+        return None
+    
+    now = timezone.now()
+    abandoned = record.status_code is None and record.started_at <= now - settings.IDEMPOTENCY_LEASE
+    if record.expires_at <= now or abandoned:
+        IdempotencyKey.objects.filter(pk=record.pk).delete()
+        _finished_keys.delete((user_id, key))
+        return None
+    
+    return record
+
+
+def _replay(record, fingerprint):
+    if record is not None and record.fingerprint != fingerprint:
+        return Response({'error': f'{IDEMPOTENCY_HEADER} was already used for a different request.'}, 
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    
+    if record is None or record.status_code is None:
+        return Response({'error': f'A request with this {IDEMPOTENCY_HEADER} is still being processed.'}, 
+                        status=status.HTTP_409_CONFLICT)
+    
+    response = Response(record.response_data, status=record.status_code)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """
+    Make a viewset create method honour the ``Idempotency-Key`` header.
+    
+    Successful responses are stored and replayed for retries with the same
+    key and body. Failed requests release the key so they can be retried.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        
+        if len(key) > 255:
+            return Response({'error': f'{IDEMPOTENCY_HEADER} must be at most 255 characters.'}, 
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        user_id = request.user.pk
+        fingerprint = _fingerprint(request)
+        
+        record = _lookup(user_id, key)
+        if record is not None:
+            return _replay(record, fingerprint)
+        
+        # Reserve the key first so concurrent retries cannot both create rows.
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user_id=user_id,
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=timezone.now() + settings.IDEMPOTENCY_KEY_TTL
+                )
+        except IntegrityError:
+            return _replay(_lookup(user_id, key), fingerprint)
+        
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        
+        if not status.is_success(response.status_code):
+            record.delete()
+            return response
+        
+        record.status_code = response.status_code
+        record.response_data = response.data
+        # A no-op if the lease ran out and a retry has taken the key over.
+        if IdempotencyKey.objects.filter(pk=record.pk).update(
+            status_code=record.status_code, response_data=record.response_data
+        ):
+            _finished_keys.set((user_id, key), record)
+        
+        return response
+    
+    return wrapper
+
+
+def purge_expired_keys():
+    """
+    Delete expired keys. Returns the number of rows removed.
+    """
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
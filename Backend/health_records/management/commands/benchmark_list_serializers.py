@@ -0,0 +1,100 @@
+"""
+Compare the FastReader list path with the regular model serializers.
+"""
+import random
+import time
+from datetime import date, time as clock, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from health_records.fast_read import FastReader
+from health_records.models import WorkoutLog, WaterLog, VitalsLog
+from health_records.serializers import WorkoutLogSerializer, WaterLogSerializer, VitalsLogSerializer
+
+
+def _workout(user, day, rng):
+    return WorkoutLog(
+        user=user, workout_type='cardio', activity='run', duration=rng.randint(10, 90),
+        calories_burned=rng.randint(50, 900), distance=Decimal(rng.randint(100, 2000)) / 100,
+        notes='', date=day, time=clock(rng.randint(5, 21), rng.randint(0, 59))
+    )
+
+
+def _water(user, day, rng):
+    return WaterLog(user=user, amount=rng.randint(100, 750), date=day, time=clock(rng.randint(5, 21), rng.randint(0, 59)))
+
+
+def _vitals(user, day, rng):
+    return VitalsLog(
+        user=user, heart_rate=rng.randint(55, 95), blood_pressure_systolic=rng.randint(105, 140),
+        blood_pressure_diastolic=rng.randint(60, 90), weight=Decimal(rng.randint(6000, 9000)) / 100,
+        notes='', date=day, time=clock(rng.randint(5, 21), rng.randint(0, 59))
+    )
+
+
+BENCHMARKS = (
+    (WorkoutLog, WorkoutLogSerializer, _workout),
+    (WaterLog, WaterLogSerializer, _water),
+    (VitalsLog, VitalsLogSerializer, _vitals),
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark rows/second of the FastReader list path against the model serializers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000,
+                            help='Number of rows generated per model.')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Timed runs per path; the best one is reported.')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        rng = random.Random(0)
+
+        # Everything runs in a transaction that is rolled back at the end.
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(email=f'benchmark-{time.time_ns()}@example.com')
+            start = date.today() - timedelta(days=rows)
+
+            for model, serializer_class, factory in BENCHMARKS:
+                model.objects.bulk_create(
+                    [factory(user, start + timedelta(days=index), rng) for index in range(rows)],
+                    batch_size=1000
+                )
+                queryset = model.objects.filter(user=user).order_by('-date', '-time', '-id')
+
+                def serializer_path():
+                    return serializer_class(list(queryset), many=True).data
+
+                def fast_path():
+                    reader = FastReader.for_serializer(serializer_class())
+                    return reader.render(reader.values(queryset))
+
+                renderer = JSONRenderer()
+                if renderer.render(serializer_path()) != renderer.render(fast_path()):
+                    raise CommandError(f'{model.__name__}: FastReader output differs from {serializer_class.__name__}.')
+
+                slow = self._best_time(serializer_path, repeat)
+                fast = self._best_time(fast_path, repeat)
+                self.stdout.write(
+                    f'{model.__name__:<12} serializer {rows / slow:>10,.0f} rows/s   '
+                    f'fast path {rows / fast:>10,.0f} rows/s   speedup {slow / fast:.1f}x'
+                )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Outputs identical; benchmark data rolled back.'))
+
+    def _best_time(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
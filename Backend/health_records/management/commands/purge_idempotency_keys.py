@@ -0,0 +1,14 @@
+"""
+Delete expired Idempotency-Key records.
+"""
+from django.core.management.base import BaseCommand
+
+from health_records.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = 'Delete stored Idempotency-Key responses whose TTL has passed.'
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys.'))
@@ -0,0 +1,14 @@
+"""
+Delete sync tombstones older than the retention period.
+"""
+from django.core.management.base import BaseCommand
+
+from health_records.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones older than SYNC_TOMBSTONE_RETENTION; older cursors get a full resync.'
+
+    def handle(self, *args, **options):
+        deleted = purge_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} sync tombstones.'))
@@ -0,0 +1,27 @@
+"""
+Extract FoodItemEntry rows from the food_items JSON of existing meals.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from health_records.foods import rebuild_food_entries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the normalized food item entries from MealLog.food_items (backfill or repair).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='users', default=[],
+                            help='Email of a user to rebuild (repeatable). Defaults to all users.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of meals processed per batch.')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['users']:
+            user_ids = list(
+                get_user_model().objects.filter(email__in=options['users']).values_list('pk', flat=True)
+            )
+
+        written = rebuild_food_entries(user_ids=user_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} food item entries.'))
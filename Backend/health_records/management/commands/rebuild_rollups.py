@@ -0,0 +1,52 @@
+"""
+Recompute DailyRollup rows from the raw health logs.
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+
+from health_records.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-user daily rollups from the health logs (backfill or repair).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='users', default=[],
+                            help='Email of a user to rebuild (repeatable). Defaults to all users.')
+        parser.add_argument('--start', help='First date to rebuild (YYYY-MM-DD).')
+        parser.add_argument('--end', help='Last date to rebuild (YYYY-MM-DD).')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of users rebuilt per transaction.')
+
+    def handle(self, *args, **options):
+        start_date = self._parse_date(options['start'])
+        end_date = self._parse_date(options['end'])
+
+        users = get_user_model().objects.order_by('pk')
+        if options['users']:
+            users = users.filter(email__in=options['users'])
+        user_ids = list(users.values_list('pk', flat=True))
+
+        batch_size = options['batch_size']
+        rows = 0
+
+        for offset in range(0, len(user_ids), batch_size):
+            rows += rebuild_rollups(
+                user_ids=user_ids[offset:offset + batch_size],
+                start_date=start_date,
+                end_date=end_date
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rows} daily rollups for {len(user_ids)} users.'
+        ))
+
+    def _parse_date(self, value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid date "{value}". Use YYYY-MM-DD.')
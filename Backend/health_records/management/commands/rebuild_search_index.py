@@ -0,0 +1,25 @@
+"""
+Rebuild the full-text search index from the health records.
+"""
+from django.core.management.base import BaseCommand
+
+from health_records.search import rebuild_search_index, search_enabled
+from health_records.sync import SYNC_LOG_TYPES
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index used by ?search= on the health log endpoints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of records indexed per batch.')
+
+    def handle(self, *args, **options):
+        if not search_enabled():
+            self.stdout.write(self.style.WARNING(
+                'This database has no full-text index; ?search= uses plain lookups.'
+            ))
+            return
+
+        indexed = rebuild_search_index(SYNC_LOG_TYPES, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} health records.'))
@@ -0,0 +1,119 @@
+# Generated by Django 4.2.9 on 2026-10-17 04:39
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+# The rollup aggregates as of this migration (see health_records.rollups).
+ROLLUP_AGGREGATES = {
+    'MealLog': {
+        'calories_consumed': Sum('total_calories'),
+        'protein': Sum('protein'),
+        'carbs': Sum('carbs'),
+        'fat': Sum('fat'),
+        'meal_count': Count('id'),
+    },
+    'WorkoutLog': {
+        'calories_burned': Sum('calories_burned'),
+        'workout_minutes': Sum('duration'),
+        'workout_count': Count('id'),
+    },
+    'WaterLog': {
+        'water_intake': Sum('amount'),
+        'water_count': Count('id'),
+    },
+    'SleepLog': {
+        'sleep_duration': Sum('duration'),
+        'sleep_quality_total': Sum('quality'),
+        'sleep_count': Count('id'),
+    },
+    'MoodLog': {
+        'mood_total': Sum('mood'),
+        'mood_count': Count('id'),
+        'energy_total': Sum('energy'),
+        'energy_count': Count('energy'),
+        'stress_total': Sum('stress'),
+        'stress_count': Count('stress'),
+    },
+    'MedicationLog': {
+        'medication_taken': Count('id', filter=Q(taken=True)),
+        'medication_missed': Count('id', filter=Q(taken=False)),
+    },
+    'VitalsLog': {
+        'vitals_count': Count('id'),
+    },
+}
+
+
+def build_existing_rollups(apps, schema_editor):
+    """
+    Fill the rollups from the logs that already exist; afterwards the
+    signal handlers keep them current.
+    """
+    DailyRollup = apps.get_model('health_records', 'DailyRollup')
+    rows = defaultdict(dict)
+    
+    for model_name, aggregates in ROLLUP_AGGREGATES.items():
+        model = apps.get_model('health_records', model_name)
+        day = TruncDate('end_time') if model_name == 'SleepLog' else F('date')
+        queryset = model.objects.annotate(day=day).order_by().values('user_id', 'day').annotate(**aggregates)
+        for values in queryset.iterator():
+            key = (values.pop('user_id'), values.pop('day'))
+            rows[key].update({field: value or 0 for field, value in values.items()})
+    
+    DailyRollup.objects.bulk_create(
+        (DailyRollup(user_id=user_id, date=date, **fields) for (user_id, date), fields in rows.items()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('health_records', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('calories_consumed', models.IntegerField(default=0)),
+                ('protein', models.DecimalField(decimal_places=2, default=0, help_text='Protein in grams', max_digits=10)),
+                ('carbs', models.DecimalField(decimal_places=2, default=0, help_text='Carbohydrates in grams', max_digits=10)),
+                ('fat', models.DecimalField(decimal_places=2, default=0, help_text='Fat in grams', max_digits=10)),
+                ('meal_count', models.IntegerField(default=0)),
+                ('calories_burned', models.IntegerField(default=0)),
+                ('workout_minutes', models.IntegerField(default=0)),
+                ('workout_count', models.IntegerField(default=0)),
+                ('water_intake', models.IntegerField(default=0, help_text='Amount in milliliters')),
+                ('water_count', models.IntegerField(default=0)),
+                ('sleep_duration', models.DecimalField(decimal_places=2, default=0, help_text='Total duration in hours', max_digits=8)),
+                ('sleep_quality_total', models.IntegerField(default=0)),
+                ('sleep_count', models.IntegerField(default=0)),
+                ('mood_total', models.IntegerField(default=0)),
+                ('mood_count', models.IntegerField(default=0)),
+                ('energy_total', models.IntegerField(default=0)),
+                ('energy_count', models.IntegerField(default=0)),
+                ('stress_total', models.IntegerField(default=0)),
+                ('stress_count', models.IntegerField(default=0)),
+                ('medication_taken', models.IntegerField(default=0)),
+                ('medication_missed', models.IntegerField(default=0)),
+                ('vitals_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.RunPython(build_existing_rollups, migrations.RunPython.noop),
+    ]
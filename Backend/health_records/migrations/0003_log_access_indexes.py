@@ -0,0 +1,49 @@
+# Generated by Django 4.2.9 on 2026-10-17 04:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_records', '0002_dailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='healthgoal',
+            index=models.Index(fields=['user', 'status'], name='goal_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meallog',
+            index=models.Index(fields=['user', 'date', 'time'], name='meal_user_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicationlog',
+            index=models.Index(fields=['user', 'date', 'time'], name='medication_user_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='moodlog',
+            index=models.Index(fields=['user', 'date', 'time'], name='mood_user_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sleeplog',
+            index=models.Index(fields=['user', 'start_time'], name='sleep_user_start_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sleeplog',
+            index=models.Index(fields=['user', 'end_time'], name='sleep_user_end_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vitalslog',
+            index=models.Index(fields=['user', 'date', 'time'], name='vitals_user_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='waterlog',
+            index=models.Index(fields=['user', 'date', 'time'], name='water_user_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutlog',
+            index=models.Index(fields=['user', 'date', 'time'], name='workout_user_date_time_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.9 on 2026-10-17 04:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+SYNC_LOG_TYPES = {
+    'WorkoutLog': 'workouts',
+    'MealLog': 'meals',
+    'WaterLog': 'water',
+    'SleepLog': 'sleep',
+    'VitalsLog': 'vitals',
+    'MedicationLog': 'medications',
+    'MoodLog': 'mood',
+    'HealthGoal': 'goals',
+}
+
+
+def record_existing_records(apps, schema_editor):
+    """
+    Give every existing record an upsert entry so a first sync returns it.
+    """
+    ChangeLog = apps.get_model('health_records', 'ChangeLog')
+    
+    for model_name, log_type in SYNC_LOG_TYPES.items():
+        model = apps.get_model('health_records', model_name)
+        rows = model.objects.order_by('pk').values_list('pk', 'user_id').iterator()
+        ChangeLog.objects.bulk_create(
+            (ChangeLog(user_id=user_id, log_type=log_type, object_id=pk, action='upsert') for pk, user_id in rows),
+            batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('health_records', '0003_log_access_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('log_type', models.CharField(max_length=20)),
+                ('object_id', models.PositiveIntegerField()),
+                ('action', models.CharField(choices=[('upsert', 'Created or Updated'), ('delete', 'Deleted')], max_length=10)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='change_logs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['user', 'id'], name='changelog_user_id_idx'), models.Index(fields=['log_type', 'object_id'], name='changelog_object_idx')],
+            },
+        ),
+        migrations.RunPython(record_existing_records, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+from django.db import migrations
+
+
+# model -> (log type, number packed into the index row id, indexed fields)
+SEARCH_MODELS = {
+    'WorkoutLog': ('workouts', 1, ['activity', 'notes']),
+    'MealLog': ('meals', 2, ['food_items', 'notes']),
+    'SleepLog': ('sleep', 4, ['notes']),
+    'VitalsLog': ('vitals', 5, ['notes']),
+    'MedicationLog': ('medications', 6, ['medication_name', 'notes']),
+    'MoodLog': ('mood', 7, ['notes']),
+    'HealthGoal': ('goals', 8, ['title', 'description', 'notes']),
+}
+LOG_TYPE_BITS = 4
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE health_records_search USING fts5("
+            "scope, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    elif schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE health_records_search ("
+            "id bigint PRIMARY KEY, "
+            "scope varchar(40) NOT NULL, "
+            "body text NOT NULL, "
+            "document tsvector GENERATED ALWAYS AS (to_tsvector('simple', body)) STORED)"
+        )
+        schema_editor.execute("CREATE INDEX health_records_search_scope_idx ON health_records_search (scope)")
+        schema_editor.execute("CREATE INDEX health_records_search_document_idx ON health_records_search USING gin (document)")
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, dict):
+        return ' '.join(_text(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return ' '.join(_text(item) for item in value)
+    if isinstance(value, (bool, int, float)):
+        return ''
+    return str(value)
+
+
+def index_existing_records(apps, schema_editor):
+    """
+    Add the text of every existing record to the new index.
+    """
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        sql = 'INSERT INTO health_records_search (rowid, scope, body) VALUES (%s, %s, %s)'
+    elif connection.vendor == 'postgresql':
+        sql = 'INSERT INTO health_records_search (id, scope, body) VALUES (%s, %s, %s)'
+    else:
+        return
+
+    for model_name, (log_type, log_type_id, fields) in SEARCH_MODELS.items():
+        model = apps.get_model('health_records', model_name)
+        rows = []
+        for pk, user_id, *values in model.objects.order_by('pk').values_list('pk', 'user_id', *fields).iterator():
+            body = ' '.join(text for text in map(_text, values) if text.strip())
+            if body:
+                rows.append(((pk << LOG_TYPE_BITS) | log_type_id, f'{log_type}{user_id}', body))
+            if len(rows) == 1000:
+                with connection.cursor() as cursor:
+                    cursor.executemany(sql, rows)
+                rows = []
+        if rows:
+            with connection.cursor() as cursor:
+                cursor.executemany(sql, rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS health_records_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_records', '0006_dataversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(index_existing_records, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,118 @@
+# Generated by Django 4.2.9 on 2026-10-17 04:50
+
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+NAME_KEYS = ('name', 'food', 'item')
+DECIMAL_LIMIT = Decimal('1000000')
+
+
+def _decimal(value):
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        value = Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        return None
+    return value if abs(value) < DECIMAL_LIMIT else None
+
+
+def _integer(value):
+    value = _decimal(value)
+    return int(value.to_integral_value()) if value is not None else None
+
+
+def _parse_food_items(food_items):
+    if isinstance(food_items, (str, dict)):
+        food_items = [food_items]
+    if not isinstance(food_items, list):
+        return []
+
+    items = []
+    for item in food_items:
+        if isinstance(item, str):
+            item = {'name': item}
+        if not isinstance(item, dict):
+            continue
+
+        name = next((item[key] for key in NAME_KEYS if isinstance(item.get(key), str)), '')
+        name = ' '.join(name.split()).lower()[:200]
+        if name:
+            items.append((name, {
+                'quantity': _decimal(item.get('quantity')),
+                'calories': _integer(item.get('calories')),
+                'protein': _decimal(item.get('protein')),
+                'carbs': _decimal(item.get('carbs')),
+                'fat': _decimal(item.get('fat')),
+            }))
+    return items
+
+
+def extract_existing_food_items(apps, schema_editor):
+    """
+    Extract the food items of every existing meal.
+    """
+    MealLog = apps.get_model('health_records', 'MealLog')
+    FoodName = apps.get_model('health_records', 'FoodName')
+    FoodItemEntry = apps.get_model('health_records', 'FoodItemEntry')
+
+    food_ids = {}
+    entries = []
+    meals = MealLog.objects.order_by('pk').values_list('pk', 'user_id', 'date', 'food_items')
+    for meal_id, user_id, date, food_items in meals.iterator():
+        for position, (name, values) in enumerate(_parse_food_items(food_items)):
+            if name not in food_ids:
+                food_ids[name] = FoodName.objects.get_or_create(name=name)[0].pk
+            entries.append(FoodItemEntry(
+                meal_id=meal_id, user_id=user_id, food_id=food_ids[name], date=date, position=position, **values
+            ))
+        if len(entries) >= 1000:
+            FoodItemEntry.objects.bulk_create(entries)
+            entries = []
+    FoodItemEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('health_records', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FoodName',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FoodItemEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('quantity', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('calories', models.IntegerField(blank=True, null=True)),
+                ('protein', models.DecimalField(blank=True, decimal_places=2, help_text='Protein in grams', max_digits=8, null=True)),
+                ('carbs', models.DecimalField(blank=True, decimal_places=2, help_text='Carbohydrates in grams', max_digits=8, null=True)),
+                ('fat', models.DecimalField(blank=True, decimal_places=2, help_text='Fat in grams', max_digits=8, null=True)),
+                ('food', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='entries', to='health_records.foodname')),
+                ('meal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='food_entries', to='health_records.meallog')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='food_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['meal', 'position'],
+                'indexes': [models.Index(fields=['user', 'food', 'date'], name='food_entry_user_food_date_idx'), models.Index(fields=['user', 'date'], name='food_entry_user_date_idx')],
+            },
+        ),
+        migrations.RunPython(extract_existing_food_items, migrations.RunPython.noop),
+    ]
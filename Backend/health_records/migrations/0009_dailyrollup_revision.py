@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-17 05:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_records', '0008_food_items'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyrollup',
+            name='revision',
+            field=models.PositiveIntegerField(default=0, help_text="Incremented whenever one of the day's logs changes"),
+        ),
+    ]
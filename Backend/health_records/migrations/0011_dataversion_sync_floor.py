@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-17 05:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health_records', '0010_idempotencykey_started_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataversion',
+            name='sync_floor',
+            field=models.PositiveBigIntegerField(default=0, help_text='Sync cursors below this id missed purged tombstones'),
+        ),
+    ]
@@ -3,6 +3,8 @@ Models for the health_records app.
 """
 from django.db import models
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -32,6 +34,9 @@ class WorkoutLog(models.Model):
     
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            models.Index(fields=['user', 'date', 'time'], name='workout_user_date_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.activity} on {self.date}"
@@ -62,6 +67,9 @@ class MealLog(models.Model):
     
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            models.Index(fields=['user', 'date', 'time'], name='meal_user_date_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.meal_type} on {self.date}"
@@ -79,6 +87,9 @@ class WaterLog(models.Model):
     
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            models.Index(fields=['user', 'date', 'time'], name='water_user_date_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.amount}ml on {self.date}"
@@ -107,6 +118,10 @@ class SleepLog(models.Model):
     
     class Meta:
         ordering = ['-start_time']
+        indexes = [
+            models.Index(fields=['user', 'start_time'], name='sleep_user_start_time_idx'),
+            models.Index(fields=['user', 'end_time'], name='sleep_user_end_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.duration}hrs on {self.start_time.date()}"
@@ -131,6 +146,9 @@ class VitalsLog(models.Model):
     
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            models.Index(fields=['user', 'date', 'time'], name='vitals_user_date_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - Vitals on {self.date}"
@@ -152,6 +170,9 @@ class MedicationLog(models.Model):
     
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            models.Index(fields=['user', 'date', 'time'], name='medication_user_date_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.medication_name} on {self.date}"
@@ -180,6 +201,9 @@ class MoodLog(models.Model):
     
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            models.Index(fields=['user', 'date', 'time'], name='mood_user_date_time_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - Mood: {self.get_mood_display()} on {self.date}"
@@ -220,6 +244,198 @@ class HealthGoal(models.Model):
     
     class Meta:
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['user', 'status'], name='goal_user_status_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.user.email} - {self.title}"
\ No newline at end of file
+        return f"{self.user.email} - {self.title}"
+
+
+class DailyRollup(models.Model):
+    """Per-user daily totals kept current from the individual health logs."""
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    
+    # Nutrition
+    calories_consumed = models.IntegerField(default=0)
+    protein = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text='Protein in grams')
+    carbs = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text='Carbohydrates in grams')
+    fat = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text='Fat in grams')
+    meal_count = models.IntegerField(default=0)
+    
+    # Activity
+    calories_burned = models.IntegerField(default=0)
+    workout_minutes = models.IntegerField(default=0)
+    workout_count = models.IntegerField(default=0)
+    
+    # Hydration
+    water_intake = models.IntegerField(default=0, help_text='Amount in milliliters')
+    water_count = models.IntegerField(default=0)
+    
+    # Sleep (attributed to the day the sleep ended)
+    sleep_duration = models.DecimalField(max_digits=8, decimal_places=2, default=0, help_text='Total duration in hours')
+    sleep_quality_total = models.IntegerField(default=0)
+    sleep_count = models.IntegerField(default=0)
+    
+    # Mood
+    mood_total = models.IntegerField(default=0)
+    mood_count = models.IntegerField(default=0)
+    energy_total = models.IntegerField(default=0)
+    energy_count = models.IntegerField(default=0)
+    stress_total = models.IntegerField(default=0)
+    stress_count = models.IntegerField(default=0)
+    
+    # Medication and vitals
+    medication_taken = models.IntegerField(default=0)
+    medication_missed = models.IntegerField(default=0)
+    vitals_count = models.IntegerField(default=0)
+    
+    revision = models.PositiveIntegerField(default=0, help_text="Incremented whenever one of the day's logs changes")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('user', 'date')
+        ordering = ['-date']
+    
+    def __str__(self):
+        return f"{self.user.email} - Rollup on {self.date}"
+    
+    @property
+    def avg_sleep_duration(self):
+        return self.sleep_duration / self.sleep_count if self.sleep_count else 0
+    
+    @property
+    def avg_sleep_quality(self):
+        return self.sleep_quality_total / self.sleep_count if self.sleep_count else 0
+    
+    @property
+    def avg_mood(self):
+        return self.mood_total / self.mood_count if self.mood_count else 0
+    
+    @property
+    def avg_energy(self):
+        return self.energy_total / self.energy_count if self.energy_count else 0
+    
+    @property
+    def avg_stress(self):
+        return self.stress_total / self.stress_count if self.stress_count else 0
+    
+    @property
+    def record_count(self):
+        return (
+            self.meal_count + self.workout_count + self.water_count + self.sleep_count +
+            self.mood_count + self.medication_taken + self.medication_missed + self.vitals_count
+        )
+
+
+class ChangeLog(models.Model):
+    """
+    Latest change to each health record, read by the sync endpoint.
+    
+    Every write appends a row with a new, increasing id and drops the older
+    rows for the same record, so the table holds one entry per record and
+    deleted records are kept as tombstones.
+    """
+    ACTION_CHOICES = (
+        ('upsert', 'Created or Updated'),
+        ('delete', 'Deleted'),
+    )
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='change_logs')
+    log_type = models.CharField(max_length=20)
+    object_id = models.PositiveIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['user', 'id'], name='changelog_user_id_idx'),
+            models.Index(fields=['log_type', 'object_id'], name='changelog_object_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.email} - {self.action} {self.log_type} #{self.object_id}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Stored response of a create request made with an ``Idempotency-Key``
+    header, replayed when the same request is retried. Rows without a
+    status code belong to requests that are still running; they hold the
+    key for ``IDEMPOTENCY_LEASE`` after ``started_at``.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64, help_text='SHA-256 of the request method, path and body')
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_data = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    started_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ('user', 'key')
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_expires_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.email} - {self.key}"
+
+
+class DataVersion(models.Model):
+    """
+    Per-user counter bumped on every write to a health record. Responses
+    derived from a user's records can be validated against it. The row is
+    also locked while the user's changes are recorded for sync.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='data_version')
+    version = models.PositiveBigIntegerField(default=0)
+    sync_floor = models.PositiveBigIntegerField(default=0, help_text='Sync cursors below this id missed purged tombstones')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.email} - v{self.version}"
+
+
+class FoodName(models.Model):
+    """
+    Dictionary of normalized food names shared by all food item entries.
+    """
+    name = models.CharField(max_length=200, unique=True)
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
+class FoodItemEntry(models.Model):
+    """
+    One food item of a meal, extracted from ``MealLog.food_items`` so food
+    questions can be answered with indexed SQL aggregates.
+    """
+    meal = models.ForeignKey(MealLog, on_delete=models.CASCADE, related_name='food_entries')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='food_entries')
+    food = models.ForeignKey(FoodName, on_delete=models.PROTECT, related_name='entries')
+    date = models.DateField()
+    position = models.PositiveSmallIntegerField(default=0)
+    quantity = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    calories = models.IntegerField(null=True, blank=True)
+    protein = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, help_text='Protein in grams')
+    carbs = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, help_text='Carbohydrates in grams')
+    fat = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, help_text='Fat in grams')
+    
+    class Meta:
+        ordering = ['meal', 'position']
+        indexes = [
+            models.Index(fields=['user', 'food', 'date'], name='food_entry_user_food_date_idx'),
+            models.Index(fields=['user', 'date'], name='food_entry_user_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.email} - {self.food.name} on {self.date}"
@@ -0,0 +1,167 @@
+"""
+Pagination classes for the health_records app.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a fixed, unique ordering such as (date, time, id).
+
+    Each page is selected with a WHERE clause on the key of the last row seen,
+    so deep pages cost the same as the first one and no COUNT(*) is run. The
+    ordering is read from ``view.keyset_ordering``.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = tuple(view.keyset_ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+
+        key, self.reverse = self.decode_cursor(request, queryset.model)
+        ordering = self._invert(self.ordering) if self.reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if key is not None:
+            queryset = queryset.filter(self._after(ordering, key))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = key is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = key is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def encode_cursor(self, row, reverse):
+        values = [self._value(row, field) for field in self.fields]
+        payload = json.dumps({'k': [self._to_json(value) for value in values], 'r': int(reverse)})
+        token = urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+
+        try:
+            payload = json.loads(urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+            values = payload['k']
+            if len(values) != len(self.fields):
+                raise ValueError
+            key = [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return key, bool(payload.get('r'))
+
+    def _after(self, ordering, key):
+        """
+        Build ``(a, b, c) > (x, y, z)`` in the direction of ``ordering``.
+        """
+        condition = Q()
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {self.fields[i]: key[i] for i in range(index)}
+            condition |= Q(**equal, **{f'{name}__{lookup}': key[index]})
+        return condition
+
+    def _invert(self, ordering):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+    def _value(self, row, field):
+        if isinstance(row, dict):
+            return row[field]
+        return getattr(row, field)
+
+    def _to_json(self, value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+
+class HealthLogPagination(KeysetPagination):
+    """
+    Keyset pagination for the health log endpoints. Legacy clients can still
+    opt into page-number pagination by passing ``page``; custom ``ordering``
+    and relevance-ordered ``search`` results also fall back to it because the
+    keyset needs a fixed order.
+    """
+    legacy_pagination_class = PageNumberPagination
+    legacy_query_params = ('page', 'ordering', 'search')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.legacy = None
+        if any(param in request.query_params for param in self.legacy_query_params):
+            self.legacy = self.legacy_pagination_class()
+            return self.legacy.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return super().get_paginated_response(data)
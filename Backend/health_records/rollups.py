@@ -0,0 +1,272 @@
+"""
+Maintenance of the per-user DailyRollup table.
+
+Every saved or deleted health log contributes a fixed delta to the rollup
+row for its (user, date). The signal handlers in ``signals.py`` apply those
+deltas as they happen and ``rebuild_rollups`` recomputes rows from scratch.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    WorkoutLog, MealLog, WaterLog, SleepLog, VitalsLog,
+    MedicationLog, MoodLog, DailyRollup
+)
+
+
+def _meal_contribution(log):
+    return {
+        'calories_consumed': log.total_calories,
+        'protein': log.protein or 0,
+        'carbs': log.carbs or 0,
+        'fat': log.fat or 0,
+        'meal_count': 1,
+    }
+
+
+def _workout_contribution(log):
+    return {
+        'calories_burned': log.calories_burned or 0,
+        'workout_minutes': log.duration,
+        'workout_count': 1,
+    }
+
+
+def _water_contribution(log):
+    return {
+        'water_intake': log.amount,
+        'water_count': 1,
+    }
+
+
+def _sleep_contribution(log):
+    return {
+        'sleep_duration': log.duration,
+        'sleep_quality_total': log.quality,
+        'sleep_count': 1,
+    }
+
+
+def _mood_contribution(log):
+    return {
+        'mood_total': log.mood,
+        'mood_count': 1,
+        'energy_total': log.energy or 0,
+        'energy_count': int(log.energy is not None),
+        'stress_total': log.stress or 0,
+        'stress_count': int(log.stress is not None),
+    }
+
+
+def _medication_contribution(log):
+    return {
+        'medication_taken': int(log.taken),
+        'medication_missed': int(not log.taken),
+    }
+
+
+def _vitals_contribution(log):
+    return {
+        'vitals_count': 1,
+    }
+
+
+# How a single log row contributes to its rollup row.
+ROLLUP_CONTRIBUTIONS = {
+    MealLog: _meal_contribution,
+    WorkoutLog: _workout_contribution,
+    WaterLog: _water_contribution,
+    SleepLog: _sleep_contribution,
+    MoodLog: _mood_contribution,
+    MedicationLog: _medication_contribution,
+    VitalsLog: _vitals_contribution,
+}
+
+# Fields a saved log's rollup row depends on: its day, its contribution
+# and, for vitals, the reading health scores use. A save whose
+# ``update_fields`` leaves all of them alone does not touch the rollup.
+ROLLUP_INPUT_FIELDS = {
+    MealLog: {'user', 'date', 'total_calories', 'protein', 'carbs', 'fat'},
+    WorkoutLog: {'user', 'date', 'calories_burned', 'duration'},
+    WaterLog: {'user', 'date', 'amount'},
+    SleepLog: {'user', 'end_time', 'duration', 'quality'},
+    MoodLog: {'user', 'date', 'mood', 'energy', 'stress'},
+    MedicationLog: {'user', 'date', 'taken'},
+    VitalsLog: {'user', 'date', 'time', 'heart_rate', 'blood_pressure_systolic', 'blood_pressure_diastolic'},
+}
+
+# The same contributions expressed as SQL aggregates, used for rebuilds.
+ROLLUP_AGGREGATES = {
+    MealLog: {
+        'calories_consumed': Sum('total_calories'),
+        'protein': Sum('protein'),
+        'carbs': Sum('carbs'),
+        'fat': Sum('fat'),
+        'meal_count': Count('id'),
+    },
+    WorkoutLog: {
+        'calories_burned': Sum('calories_burned'),
+        'workout_minutes': Sum('duration'),
+        'workout_count': Count('id'),
+    },
+    WaterLog: {
+        'water_intake': Sum('amount'),
+        'water_count': Count('id'),
+    },
+    SleepLog: {
+        'sleep_duration': Sum('duration'),
+        'sleep_quality_total': Sum('quality'),
+        'sleep_count': Count('id'),
+    },
+    MoodLog: {
+        'mood_total': Sum('mood'),
+        'mood_count': Count('id'),
+        'energy_total': Sum('energy'),
+        'energy_count': Count('energy'),
+        'stress_total': Sum('stress'),
+        'stress_count': Count('stress'),
+    },
+    MedicationLog: {
+        'medication_taken': Count('id', filter=Q(taken=True)),
+        'medication_missed': Count('id', filter=Q(taken=False)),
+    },
+    VitalsLog: {
+        'vitals_count': Count('id'),
+    },
+}
+
+
+def touches_rollup(model, update_fields):
+    """
+    Whether a save of ``model`` limited to ``update_fields`` (None for all
+    fields) can change its rollup row.
+    """
+    if update_fields is None:
+        return True
+    inputs = ROLLUP_INPUT_FIELDS[model]
+    return any(field in inputs or field.removesuffix('_id') in inputs for field in update_fields)
+
+
+def rollup_date(log):
+    """
+    Return the day a log counts towards. Sleep belongs to the day it ended.
+    """
+    if isinstance(log, SleepLog):
+        end_time = log.end_time
+        if timezone.is_aware(end_time):
+            end_time = timezone.localtime(end_time)
+        return end_time.date()
+    return log.date
+
+
+def apply_rollup_deltas(added=(), removed=()):
+    """
+    Add the contributions of ``added`` logs to their rollup rows and subtract
+    those of ``removed`` logs. Deltas for the same (user, date) are merged so
+    each affected row is written once, with its revision incremented.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+
+    for sign, logs in ((1, added), (-1, removed)):
+        for log in logs:
+            contribution = ROLLUP_CONTRIBUTIONS[type(log)](log)
+            row = deltas[(log.user_id, rollup_date(log))]
+            for field, value in contribution.items():
+                row[field] += sign * value
+
+    # Rows whose totals cancel out, e.g. for an edited vitals reading, are
+    # still written so their revision shows that the day's logs changed.
+    changes = {
+        key: {field: value for field, value in fields.items() if value}
+        for key, fields in deltas.items()
+    }
+
+    if not changes:
+        return
+
+    now = timezone.now()
+
+    with transaction.atomic():
+        DailyRollup.objects.bulk_create(
+            [DailyRollup(user_id=user_id, date=date) for user_id, date in changes],
+            ignore_conflicts=True
+        )
+
+        for (user_id, date), fields in changes.items():
+            updates = {field: F(field) + value for field, value in fields.items()}
+            DailyRollup.objects.filter(user_id=user_id, date=date).update(
+                updated_at=now, revision=F('revision') + 1, **updates
+            )
+
+
+def get_rollups(user, start_date, end_date):
+    """
+    Return one rollup per day between ``start_date`` and ``end_date`` in date
+    order, read with a single range scan. Days without logs get an unsaved,
+    all-zero rollup.
+    """
+    rollups = {
+        rollup.date: rollup
+        for rollup in DailyRollup.objects.filter(
+            user=user,
+            date__range=(start_date, end_date)
+        ).order_by('date')
+    }
+
+    days = []
+    current_date = start_date
+    while current_date <= end_date:
+        days.append(rollups.get(current_date) or DailyRollup(user=user, date=current_date))
+        current_date += timedelta(days=1)
+
+    return days
+
+
+def rebuild_rollups(user_ids=None, start_date=None, end_date=None):
+    """
+    Recompute rollup rows from the raw logs, optionally limited to some users
+    and a date range. Returns the number of rows written.
+    """
+    rows = defaultdict(dict)
+
+    for model, aggregates in ROLLUP_AGGREGATES.items():
+        queryset = model.objects.all()
+        day = TruncDate('end_time') if model is SleepLog else F('date')
+
+        if user_ids is not None:
+            queryset = queryset.filter(user_id__in=user_ids)
+
+        queryset = queryset.annotate(day=day)
+        if start_date:
+            queryset = queryset.filter(day__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(day__lte=end_date)
+
+        for values in queryset.order_by().values('user_id', 'day').annotate(**aggregates):
+            key = (values.pop('user_id'), values.pop('day'))
+            rows[key].update({field: value or 0 for field, value in values.items()})
+
+    existing = DailyRollup.objects.all()
+    if user_ids is not None:
+        existing = existing.filter(user_id__in=user_ids)
+    if start_date:
+        existing = existing.filter(date__gte=start_date)
+    if end_date:
+        existing = existing.filter(date__lte=end_date)
+
+    with transaction.atomic():
+        existing.delete()
+        DailyRollup.objects.bulk_create(
+            [
+                DailyRollup(user_id=user_id, date=date, **fields)
+                for (user_id, date), fields in rows.items()
+            ],
+            batch_size=1000
+        )
+
+    return len(rows)
@@ -0,0 +1,262 @@
+"""
+Full-text search index for the health_records models.
+
+The searchable text of each record (food items, activity, notes, ...) is
+kept in one index table: an FTS5 virtual table on SQLite and a table with a
+generated ``tsvector`` column on PostgreSQL. Each row carries a ``scope``
+token naming the log type and owner, so a search only touches the postings
+of one user's logs of one type. Other database backends fall back to DRF's
+``SearchFilter``.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+from .sync import SYNC_LOG_TYPES
+
+SEARCH_TABLE = 'health_records_search'
+SEARCH_VENDORS = ('sqlite', 'postgresql')
+
+# Stable numbers used to pack (log type, object id) into the index row id.
+SEARCH_LOG_TYPE_IDS = {
+    'workouts': 1,
+    'meals': 2,
+    'water': 3,
+    'sleep': 4,
+    'vitals': 5,
+    'medications': 6,
+    'mood': 7,
+    'goals': 8,
+}
+LOG_TYPE_BITS = 4
+
+# Fields whose text is indexed for each log type, also used as the
+# viewsets' ``search_fields``.
+SEARCH_FIELDS = {
+    'workouts': ['activity', 'notes'],
+    'meals': ['food_items', 'notes'],
+    'water': [],
+    'sleep': ['notes'],
+    'vitals': ['notes'],
+    'medications': ['medication_name', 'notes'],
+    'mood': ['notes'],
+    'goals': ['title', 'description', 'notes'],
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_enabled():
+    return connection.vendor in SEARCH_VENDORS
+
+
+def _row_id(log_type, object_id):
+    return (object_id << LOG_TYPE_BITS) | SEARCH_LOG_TYPE_IDS[log_type]
+
+
+def _object_id(row_id):
+    return row_id >> LOG_TYPE_BITS
+
+
+def _scope(log_type, user_id):
+    return f'{log_type}{user_id}'
+
+
+def _text(value):
+    """
+    Flatten a field value, including nested JSON, into searchable text.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, dict):
+        return ' '.join(_text(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return ' '.join(_text(item) for item in value)
+    if isinstance(value, (bool, int, float)):
+        return ''
+    return str(value)
+
+
+def document_text(log_type, instance):
+    parts = [_text(getattr(instance, field)) for field in SEARCH_FIELDS[log_type]]
+    return ' '.join(part for part in parts if part.strip())
+
+
+def index_documents(log_type, instances, replace=True):
+    """
+    Add ``instances`` to the search index, replacing their old entries
+    unless ``replace`` is false (newly created records have none).
+    """
+    if not search_enabled() or not SEARCH_FIELDS[log_type]:
+        return
+
+    instances = [instance for instance in instances if instance.pk is not None]
+    rows = [
+        (_row_id(log_type, instance.pk), _scope(log_type, instance.user_id), document_text(log_type, instance))
+        for instance in instances
+    ]
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if replace:
+            _delete_rows(cursor, [row[0] for row in rows])
+
+        rows = [row for row in rows if row[2]]
+        if rows:
+            if connection.vendor == 'sqlite':
+                sql = f'INSERT INTO {SEARCH_TABLE} (rowid, scope, body) VALUES (%s, %s, %s)'
+            else:
+                sql = f'INSERT INTO {SEARCH_TABLE} (id, scope, body) VALUES (%s, %s, %s)'
+            cursor.executemany(sql, rows)
+
+
+def remove_documents(log_type, object_ids):
+    if not search_enabled() or not SEARCH_FIELDS[log_type]:
+        return
+
+    with connection.cursor() as cursor:
+        _delete_rows(cursor, [_row_id(log_type, object_id) for object_id in object_ids])
+
+
+def remove_user_documents(user_id):
+    """
+    Drop every index entry of a user. The index has no foreign keys, so
+    this runs when the user is deleted.
+    """
+    if not search_enabled():
+        return
+
+    scopes = [_scope(log_type, user_id) for log_type, fields in SEARCH_FIELDS.items() if fields]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            match = ' OR '.join(f'"{scope}"' for scope in scopes)
+            cursor.execute(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN '
+                f'(SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s)',
+                [f'scope : ({match})']
+            )
+        else:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE scope = ANY(%s)', [scopes])
+
+
+def _delete_rows(cursor, row_ids):
+    if not row_ids:
+        return
+    column = 'rowid' if connection.vendor == 'sqlite' else 'id'
+    placeholders = ', '.join(['%s'] * len(row_ids))
+    cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE {column} IN ({placeholders})', row_ids)
+
+
+def _match(log_type, user_id, terms):
+    """
+    Return ``(where, params)`` selecting the index rows of one user's logs
+    of ``log_type`` that match every term, or None without search terms.
+    """
+    tokens = TOKEN_RE.findall(' '.join(terms).lower())
+    if not tokens:
+        return None
+
+    scope = _scope(log_type, user_id)
+    if connection.vendor == 'sqlite':
+        query = ' AND '.join(f'"{token}"*' for token in tokens)
+        return f'{SEARCH_TABLE} MATCH %s', [f'scope : "{scope}" AND body : ({query})']
+
+    query = ' & '.join(f'{token}:*' for token in tokens)
+    return "scope = %s AND document @@ to_tsquery('simple', %s)", [scope, query]
+
+
+def search_object_ids_sql(log_type, user_id, terms):
+    """
+    Ids of the records matching ``terms``, as a ``RawSQL`` subquery for
+    ``pk__in``. Every term must match, as a word or a word prefix. None
+    without search terms.
+    """
+    match = _match(log_type, user_id, terms)
+    if match is None:
+        return None
+
+    where, params = match
+    column = 'rowid' if connection.vendor == 'sqlite' else 'id'
+    return RawSQL(f'SELECT {column} >> {LOG_TYPE_BITS} FROM {SEARCH_TABLE} WHERE {where}', params)
+
+
+def search_rank_sql(model, log_type, user_id, terms):
+    """
+    Relevance of each row of ``model`` as a correlated ``RawSQL``
+    subquery on the index; lower is better. None without search terms.
+    """
+    match = _match(log_type, user_id, terms)
+    if match is None:
+        return None
+
+    where, params = match
+    row_id = (
+        f'(({connection.ops.quote_name(model._meta.db_table)}.{connection.ops.quote_name(model._meta.pk.column)}'
+        f' << {LOG_TYPE_BITS}) | {SEARCH_LOG_TYPE_IDS[log_type]})'
+    )
+    if connection.vendor == 'sqlite':
+        return RawSQL(f'SELECT rank FROM {SEARCH_TABLE} WHERE {where} AND rowid = {row_id}', params)
+    return RawSQL(
+        f"SELECT -ts_rank(document, to_tsquery('simple', %s)) FROM {SEARCH_TABLE} WHERE {where} AND id = {row_id}",
+        [params[-1], *params]
+    )
+
+
+def rebuild_search_index(models, batch_size=1000):
+    """
+    Re-index every record of ``models`` (a mapping of model to log type).
+    Returns the number of records indexed.
+    """
+    if not search_enabled():
+        return 0
+
+    indexed = 0
+    # A failed rebuild keeps the old index instead of leaving it empty.
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+        for model, log_type in models.items():
+            fields = SEARCH_FIELDS[log_type]
+            if not fields:
+                continue
+
+            batch = []
+            for instance in model.objects.order_by('pk').only('pk', 'user_id', *fields).iterator(chunk_size=batch_size):
+                batch.append(instance)
+                if len(batch) == batch_size:
+                    index_documents(log_type, batch, replace=False)
+                    indexed += len(batch)
+                    batch = []
+            index_documents(log_type, batch, replace=False)
+            indexed += len(batch)
+
+    return indexed
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    ``?search=`` backed by the full-text index, with prefix matching and
+    results ordered by relevance unless ``ordering`` is given. Falls back
+    to ``SearchFilter`` on databases without an index and for log types
+    with no indexed text.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        log_type = SYNC_LOG_TYPES.get(queryset.model)
+        if log_type is None or not SEARCH_FIELDS[log_type] or not search_enabled():
+            return super().filter_queryset(request, queryset, view)
+
+        terms = self.get_search_terms(request)
+        matches = search_object_ids_sql(log_type, request.user.pk, terms)
+        if matches is None:
+            return queryset
+
+        queryset = queryset.filter(pk__in=matches)
+        if 'ordering' in request.query_params:
+            return queryset
+
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        rank = search_rank_sql(queryset.model, log_type, request.user.pk, terms)
+        return queryset.annotate(search_rank=rank).order_by('search_rank', *ordering, '-pk')
@@ -1,14 +1,34 @@
 """
 Serializers for the health_records app.
 """
+from django.db import models
 from rest_framework import serializers
+from health_project.sparse_fields import DynamicFieldsMixin
 from .models import (
     WorkoutLog, MealLog, WaterLog, SleepLog, VitalsLog,
     MedicationLog, MoodLog, HealthGoal
 )
 
+POSITIVE_INTEGER_FIELDS = (
+    models.PositiveIntegerField, models.PositiveSmallIntegerField, models.PositiveBigIntegerField
+)
+
+
+class PositiveFieldsMixin:
+    """
+    Validate positive integer model fields with ``min_value=0``. SQLite
+    reports no integer range to the model validators, so otherwise a
+    negative value only fails on the database's CHECK constraint.
+    """
+    
+    def build_standard_field(self, field_name, model_field):
+        field_class, field_kwargs = super().build_standard_field(field_name, model_field)
+        if isinstance(model_field, POSITIVE_INTEGER_FIELDS):
+            field_kwargs.setdefault('min_value', 0)
+        return field_class, field_kwargs
+
 
-class WorkoutLogSerializer(serializers.ModelSerializer):
+class WorkoutLogSerializer(PositiveFieldsMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the WorkoutLog model."""
     
     class Meta:
@@ -17,7 +37,7 @@ class WorkoutLogSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
 
-class MealLogSerializer(serializers.ModelSerializer):
+class MealLogSerializer(PositiveFieldsMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the MealLog model."""
     
     class Meta:
@@ -26,7 +46,7 @@ class MealLogSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
 
-class WaterLogSerializer(serializers.ModelSerializer):
+class WaterLogSerializer(PositiveFieldsMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the WaterLog model."""
     
     class Meta:
@@ -35,7 +55,7 @@ class WaterLogSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
 
-class SleepLogSerializer(serializers.ModelSerializer):
+class SleepLogSerializer(PositiveFieldsMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the SleepLog model."""
     
     class Meta:
@@ -44,7 +64,7 @@ class SleepLogSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
 
-class VitalsLogSerializer(serializers.ModelSerializer):
+class VitalsLogSerializer(PositiveFieldsMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the VitalsLog model."""
     
     class Meta:
@@ -53,7 +73,7 @@ class VitalsLogSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
 
-class MedicationLogSerializer(serializers.ModelSerializer):
+class MedicationLogSerializer(PositiveFieldsMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the MedicationLog model."""
     
     class Meta:
@@ -62,7 +82,7 @@ class MedicationLogSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
 
-class MoodLogSerializer(serializers.ModelSerializer):
+class MoodLogSerializer(PositiveFieldsMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the MoodLog model."""
     
     class Meta:
@@ -71,7 +91,7 @@ class MoodLogSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
 
-class HealthGoalSerializer(serializers.ModelSerializer):
+class HealthGoalSerializer(PositiveFieldsMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the HealthGoal model."""
     
     class Meta:
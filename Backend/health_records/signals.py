@@ -0,0 +1,154 @@
+"""
+Signal handlers for the health_records app.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from .foods import sync_food_entries
+from .models import MealLog
+from .rollups import ROLLUP_CONTRIBUTIONS, apply_rollup_deltas, touches_rollup
+from .search import index_documents, remove_documents, remove_user_documents
+from .sync import SYNC_LOG_TYPES, record_changes
+from .versions import bump_data_versions
+
+# Sent by the bulk endpoint after ``bulk_create``, which does not fire
+# post_save. Receivers get the created logs as ``instances``.
+health_logs_bulk_created = Signal()
+
+
+def _is_user_deletion(origin):
+    """
+    Logs removed because their user is being deleted need no bookkeeping;
+    the user's derived rows are deleted by the same cascade.
+    """
+    User = get_user_model()
+    return isinstance(origin, User) or getattr(origin, 'model', None) is User
+
+
+def remember_previous_version(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Keep the stored version of an edited log so its old contribution can be
+    taken back out of the rollup. New logs and saves that leave the rollup
+    inputs alone skip the query.
+    """
+    instance._rollup_previous = None
+    if raw or instance._state.adding or not touches_rollup(sender, update_fields):
+        return
+    
+    instance._rollup_previous = sender._default_manager.filter(pk=instance.pk).first()
+
+
+def update_rollup_on_save(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw or (not created and not touches_rollup(sender, update_fields)):
+        return
+    
+    previous = getattr(instance, '_rollup_previous', None)
+    apply_rollup_deltas(added=[instance], removed=[previous] if previous else [])
+
+
+def update_rollup_on_delete(sender, instance, origin=None, **kwargs):
+    if _is_user_deletion(origin):
+        return
+    
+    apply_rollup_deltas(removed=[instance])
+
+
+@receiver(health_logs_bulk_created)
+def update_rollup_on_bulk_create(sender, instances, **kwargs):
+    if sender in ROLLUP_CONTRIBUTIONS:
+        apply_rollup_deltas(added=instances)
+
+
+def record_change_on_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    
+    record_changes(sender, [instance], 'upsert', replace=not created)
+
+
+def record_change_on_delete(sender, instance, origin=None, **kwargs):
+    if _is_user_deletion(origin):
+        return
+    
+    record_changes(sender, [instance], 'delete')
+
+
+@receiver(health_logs_bulk_created)
+def record_change_on_bulk_create(sender, instances, **kwargs):
+    if sender in SYNC_LOG_TYPES:
+        record_changes(sender, instances, 'upsert', replace=False)
+
+
+def bump_version_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    
+    bump_data_versions([instance.user_id])
+
+
+def bump_version_on_delete(sender, instance, origin=None, **kwargs):
+    if _is_user_deletion(origin):
+        return
+    
+    bump_data_versions([instance.user_id])
+
+
+@receiver(health_logs_bulk_created)
+def bump_version_on_bulk_create(sender, instances, **kwargs):
+    if sender in SYNC_LOG_TYPES:
+        bump_data_versions(instance.user_id for instance in instances)
+
+
+def index_on_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    
+    index_documents(SYNC_LOG_TYPES[sender], [instance], replace=not created)
+
+
+def unindex_on_delete(sender, instance, origin=None, **kwargs):
+    if _is_user_deletion(origin):
+        return
+    
+    remove_documents(SYNC_LOG_TYPES[sender], [instance.pk])
+
+
+@receiver(health_logs_bulk_created)
+def index_on_bulk_create(sender, instances, **kwargs):
+    if sender in SYNC_LOG_TYPES:
+        index_documents(SYNC_LOG_TYPES[sender], instances, replace=False)
+
+
+def unindex_user_on_delete(sender, instance, **kwargs):
+    remove_user_documents(instance.pk)
+
+
+@receiver(post_save, sender=MealLog, dispatch_uid='food_entries_save')
+def extract_food_items_on_save(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    
+    sync_food_entries([instance], replace=not created)
+
+
+@receiver(health_logs_bulk_created)
+def extract_food_items_on_bulk_create(sender, instances, **kwargs):
+    if sender is MealLog:
+        sync_food_entries(instances, replace=False)
+
+
+for model in ROLLUP_CONTRIBUTIONS:
+    pre_save.connect(remember_previous_version, sender=model, dispatch_uid=f'rollup_previous_{model.__name__}')
+    post_save.connect(update_rollup_on_save, sender=model, dispatch_uid=f'rollup_save_{model.__name__}')
+    post_delete.connect(update_rollup_on_delete, sender=model, dispatch_uid=f'rollup_delete_{model.__name__}')
+
+for model in SYNC_LOG_TYPES:
+    post_save.connect(record_change_on_save, sender=model, dispatch_uid=f'sync_save_{model.__name__}')
+    post_delete.connect(record_change_on_delete, sender=model, dispatch_uid=f'sync_delete_{model.__name__}')
+    post_save.connect(bump_version_on_save, sender=model, dispatch_uid=f'version_save_{model.__name__}')
+    post_delete.connect(bump_version_on_delete, sender=model, dispatch_uid=f'version_delete_{model.__name__}')
+    post_save.connect(index_on_save, sender=model, dispatch_uid=f'search_save_{model.__name__}')
+    post_delete.connect(unindex_on_delete, sender=model, dispatch_uid=f'search_delete_{model.__name__}')
+
+post_delete.connect(unindex_user_on_delete, sender=get_user_model(), dispatch_uid='search_delete_user')
@@ -0,0 +1,93 @@
+"""
+Change tracking for the delta-sync endpoint.
+
+Each health record write is recorded in ``ChangeLog`` under the same log
+type name the API uses in its URLs. Clients pass back the id of the last
+change they saw and receive everything written after it.
+
+Changes are recorded while holding a lock on the user's ``DataVersion``
+row, so one user's changes commit in id order and a client cannot step
+past a change that commits later with a lower id. Tombstones older than
+``SYNC_TOMBSTONE_RETENTION`` are purged; cursors from before the purge get
+a full resync.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import (
+    WorkoutLog, MealLog, WaterLog, SleepLog, VitalsLog,
+    MedicationLog, MoodLog, HealthGoal, ChangeLog, DataVersion
+)
+
+SYNC_LOG_TYPES = {
+    WorkoutLog: 'workouts',
+    MealLog: 'meals',
+    WaterLog: 'water',
+    SleepLog: 'sleep',
+    VitalsLog: 'vitals',
+    MedicationLog: 'medications',
+    MoodLog: 'mood',
+    HealthGoal: 'goals',
+}
+
+SYNC_MODELS = {log_type: model for model, log_type in SYNC_LOG_TYPES.items()}
+
+
+def record_changes(model, instances, action, replace=True):
+    """
+    Record ``action`` for each of ``instances``. With ``replace`` the earlier
+    entries for the same records are removed first; newly created records
+    have none, so bulk inserts skip that query.
+    """
+    log_type = SYNC_LOG_TYPES[model]
+    instances = [instance for instance in instances if instance.pk is not None]
+    if not instances:
+        return
+    
+    with transaction.atomic():
+        _lock_users({instance.user_id for instance in instances})
+        if replace:
+            ChangeLog.objects.filter(
+                log_type=log_type,
+                object_id__in=[instance.pk for instance in instances]
+            ).delete()
+        
+        ChangeLog.objects.bulk_create([
+            ChangeLog(user_id=instance.user_id, log_type=log_type, object_id=instance.pk, action=action)
+            for instance in instances
+        ])
+
+
+def _lock_users(user_ids):
+    """
+    Lock the ``DataVersion`` rows of ``user_ids`` until the end of the
+    transaction, creating missing rows first.
+    """
+    DataVersion.objects.bulk_create(
+        [DataVersion(user_id=user_id) for user_id in user_ids],
+        ignore_conflicts=True
+    )
+    list(DataVersion.objects.select_for_update().filter(user_id__in=user_ids).order_by('user_id').values_list('pk'))
+
+
+def purge_tombstones(before=None):
+    """
+    Delete tombstones recorded before ``before`` (default: the retention
+    period ago) and raise each affected user's ``sync_floor`` past them.
+    Returns the number of tombstones removed.
+    """
+    if before is None:
+        before = timezone.now() - settings.SYNC_TOMBSTONE_RETENTION
+    
+    tombstones = ChangeLog.objects.filter(action='delete', changed_at__lt=before)
+    with transaction.atomic():
+        floors = tombstones.order_by().values('user_id').annotate(last_id=Max('id'))
+        for row in floors:
+            DataVersion.objects.filter(user_id=row['user_id']).update(
+                sync_floor=Greatest('sync_floor', row['last_id'])
+            )
+        deleted, _ = tombstones.delete()
+    return deleted
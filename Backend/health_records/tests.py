@@ -0,0 +1,576 @@
+"""
+Tests for the health_records app.
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import User, UserPreference
+from .cache import response_cache
+from .fast_read import FastReader
+from .idempotency import _finished_keys
+from .search import rebuild_search_index, search_enabled
+from .sync import SYNC_LOG_TYPES, purge_tombstones
+from .models import (
+    ChangeLog, DailyRollup, FoodItemEntry, HealthGoal, IdempotencyKey, MealLog, MedicationLog, MoodLog,
+    SleepLog, VitalsLog, WaterLog, WorkoutLog
+)
+from .views import BaseHealthLogViewSet
+
+
+class HealthRecordsTestCase(TestCase):
+    """
+    Base case with an authenticated user and API client.
+    """
+
+    def setUp(self):
+        cache.clear()
+        # User ids and data versions repeat between tests
+        response_cache.clear()
+        self.user = User.objects.create_user(email='user@example.com', password='password')
+        UserPreference.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class BulkCreateTests(HealthRecordsTestCase):
+
+    def test_invalid_records_are_reported_without_aborting_valid_ones(self):
+        response = self.client.post('/api/health/water/bulk/', [
+            {'amount': -1, 'date': '2024-01-01', 'time': '08:00'},
+            {'amount': 250, 'date': '2024-01-01', 'time': '09:00'},
+        ], format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['index'] for error in response.data['errors']], [0])
+        self.assertIn('amount', response.data['errors'][0]['errors'])
+        self.assertEqual(list(WaterLog.objects.values_list('amount', flat=True)), [250])
+
+    def test_negative_amount_is_a_validation_error(self):
+        response = self.client.post('/api/health/water/', {
+            'amount': -1, 'date': '2024-01-01', 'time': '08:00'
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('amount', response.data)
+
+
+class RollupTests(HealthRecordsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.meal = MealLog.objects.create(
+            user=self.user, meal_type='lunch', total_calories=600, food_items=[],
+            date=date(2024, 1, 1), time=time(12)
+        )
+
+    def rollup(self):
+        return DailyRollup.objects.get(user=self.user, date=date(2024, 1, 1))
+
+    def meal_reads(self, queries):
+        return [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT') and 'FROM "health_records_meallog"' in query['sql']
+        ]
+
+    def test_edit_moves_the_contribution(self):
+        self.meal.total_calories = 450
+        self.meal.date = date(2024, 1, 2)
+        self.meal.save()
+
+        self.assertEqual(self.rollup().calories_consumed, 0)
+        self.assertEqual(DailyRollup.objects.get(user=self.user, date=date(2024, 1, 2)).calories_consumed, 450)
+
+    def test_create_does_not_read_a_previous_version(self):
+        with CaptureQueriesContext(connection) as context:
+            MealLog.objects.create(
+                user=self.user, meal_type='snack', total_calories=200, food_items=[],
+                date=date(2024, 1, 1), time=time(16)
+            )
+
+        self.assertEqual(self.meal_reads(context.captured_queries), [])
+        self.assertEqual(self.rollup().calories_consumed, 800)
+
+    def test_save_of_other_fields_leaves_the_rollup_alone(self):
+        revision = self.rollup().revision
+        self.meal.notes = 'leftovers'
+        with CaptureQueriesContext(connection) as context:
+            self.meal.save(update_fields=['notes'])
+
+        self.assertEqual(self.meal_reads(context.captured_queries), [])
+        self.assertEqual(self.rollup().revision, revision)
+        self.assertEqual(self.rollup().calories_consumed, 600)
+
+
+class QueryCountTests(HealthRecordsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for hour in (8, 12, 18):
+            self.client.post('/api/health/meals/', {
+                'meal_type': 'snack', 'total_calories': 500, 'protein': '20', 'carbs': '60', 'fat': '15',
+                'food_items': [], 'date': '2024-01-01', 'time': f'{hour:02d}:00'
+            }, format='json')
+            self.client.post('/api/health/water/', {
+                'amount': 500, 'date': '2024-01-01', 'time': f'{hour:02d}:00'
+            }, format='json')
+        cache.clear()
+
+    def test_daily_summary_takes_at_most_two_queries(self):
+        # The data version check and one rollup read.
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/health/summary/daily/?date=2024-01-01')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_calories_consumed'], 1500)
+        self.assertEqual(response.data['total_water_intake'], 1500)
+        self.assertEqual(response.data['workout_minutes'], 0)
+
+    def test_log_list_takes_at_most_two_queries(self):
+        MealLog.objects.bulk_create([
+            MealLog(user=self.user, meal_type='snack', total_calories=100, food_items=[],
+                    date=date(2024, 1, day), time=time(9))
+            for day in range(2, 28)
+        ])
+
+        for url in ('/api/health/meals/', '/api/health/water/'):
+            with self.subTest(url=url), self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+
+class KeysetPaginationTests(HealthRecordsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        WaterLog.objects.bulk_create([
+            WaterLog(user=self.user, amount=100 * day, date=date(2024, 1, day), time=time(9))
+            for day in range(1, 6)
+        ])
+
+    def amounts(self, response):
+        return [row['amount'] for row in response.data['results']]
+
+    def test_pages_stay_stable_when_rows_are_inserted(self):
+        first = self.client.get('/api/health/water/', {'page_size': 2})
+        self.assertEqual(self.amounts(first), [500, 400])
+        self.assertNotIn('count', first.data)
+
+        # A newer log, and one on the last row's day that sorts before it
+        WaterLog.objects.create(user=self.user, amount=600, date=date(2024, 1, 6), time=time(9))
+        WaterLog.objects.create(user=self.user, amount=450, date=date(2024, 1, 4), time=time(10))
+
+        second = self.client.get(first.data['next'])
+        third = self.client.get(second.data['next'])
+
+        self.assertEqual(self.amounts(second), [300, 200])
+        self.assertEqual(self.amounts(third), [100])
+        self.assertIsNone(third.data['next'])
+        # Going back shows the rows just before the second page as they are now
+        self.assertEqual(self.amounts(self.client.get(second.data['previous'])), [450, 400])
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get('/api/health/water/', {'cursor': 'garbage'}).status_code, 404)
+
+    def test_page_and_ordering_fall_back_to_page_numbers(self):
+        for params in ({'page': 1}, {'ordering': 'amount'}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/health/water/', params)
+                self.assertEqual(response.data['count'], 5)
+                self.assertEqual(len(response.data['results']), 5)
+
+        response = self.client.get('/api/health/water/', {'ordering': 'date'})
+        self.assertEqual(self.amounts(response), [100, 200, 300, 400, 500])
+
+
+class SyncTests(HealthRecordsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.meal = MealLog.objects.create(
+            user=self.user, meal_type='lunch', total_calories=600, food_items=[],
+            date=date(2024, 1, 1), time=time(12)
+        )
+        self.water = WaterLog.objects.create(user=self.user, amount=250, date=date(2024, 1, 1), time=time(9))
+
+    def sync(self, **params):
+        response = self.client.get('/api/health/sync/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def summary(self, data):
+        return [(change['type'], change['id'], change['action']) for change in data['changes']]
+
+    def test_cursor_returns_only_later_changes_and_tombstones(self):
+        first = self.sync()
+        self.assertEqual(self.summary(first), [('meals', self.meal.pk, 'upsert'), ('water', self.water.pk, 'upsert')])
+
+        water_id = self.water.pk
+        self.meal.total_calories = 700
+        self.meal.save()
+        self.water.delete()
+
+        second = self.sync(since=first['cursor'])
+        self.assertEqual(self.summary(second), [('meals', self.meal.pk, 'upsert'), ('water', water_id, 'delete')])
+        self.assertEqual(second['changes'][0]['data']['total_calories'], 700)
+        self.assertNotIn('data', second['changes'][1])
+
+        third = self.sync(since=second['cursor'])
+        self.assertEqual(third['changes'], [])
+        self.assertEqual(third['cursor'], second['cursor'])
+
+    def test_limit_pages_through_the_feed(self):
+        first = self.sync(limit=1)
+        self.assertTrue(first['has_more'])
+        second = self.sync(since=first['cursor'], limit=1)
+        self.assertFalse(second['has_more'])
+        self.assertEqual(self.summary(first) + self.summary(second), self.summary(self.sync()))
+
+    def test_cursor_older_than_purged_tombstones_needs_a_full_resync(self):
+        cursor = self.sync()['cursor']
+        self.water.delete()
+        ChangeLog.objects.filter(action='delete').update(changed_at=timezone.now() - timedelta(days=365))
+
+        self.assertEqual(purge_tombstones(), 1)
+
+        response = self.client.get('/api/health/sync/', {'since': cursor})
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.data['full_resync'])
+        self.assertEqual(self.summary(self.sync()), [('meals', self.meal.pk, 'upsert')])
+
+    def test_sparse_fieldset_parameters_do_not_trim_records(self):
+        for params in ({'fields': 'date'}, {'exclude': 'id'}):
+            with self.subTest(params=params):
+                data = self.sync(**params)
+                record = data['changes'][0]['data']
+                self.assertEqual(record['id'], self.meal.pk)
+                self.assertEqual(record['total_calories'], 600)
+
+    def test_recent_tombstones_are_kept(self):
+        self.water.delete()
+
+        self.assertEqual(purge_tombstones(), 0)
+        self.assertEqual(ChangeLog.objects.filter(action='delete').count(), 1)
+
+
+class ResponseCacheTests(HealthRecordsTestCase):
+    url = '/api/health/summary/daily/?date=2024-01-01'
+
+    def post_meal(self, calories):
+        response = self.client.post('/api/health/meals/', {
+            'meal_type': 'snack', 'total_calories': calories, 'food_items': [],
+            'date': '2024-01-01', 'time': '08:00'
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response
+
+    def test_cached_summary_is_served_until_the_data_version_changes(self):
+        self.post_meal(400)
+        self.assertEqual(self.client.get(self.url).data['total_calories_consumed'], 400)
+
+        response_cache.reset_stats()
+        # Only the data version is read on a hit
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).data['total_calories_consumed'], 400)
+        self.assertEqual(response_cache.stats()['local_hits'], 1)
+
+        self.post_meal(250)
+        self.assertEqual(self.client.get(self.url).data['total_calories_consumed'], 650)
+
+        meal = MealLog.objects.get(total_calories=250)
+        self.client.delete(f'/api/health/meals/{meal.pk}/')
+        self.assertEqual(self.client.get(self.url).data['total_calories_consumed'], 400)
+
+
+class FoodItemTests(HealthRecordsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        response = self.client.post('/api/health/meals/', {
+            'meal_type': 'breakfast', 'total_calories': 450, 'date': '2024-01-01', 'time': '08:00',
+            'food_items': [{'name': ' Oat  Porridge', 'calories': 300}, 'Banana', {'quantity': 1}],
+        }, format='json')
+        self.meal_id = response.data['id']
+
+    def entries(self):
+        return list(FoodItemEntry.objects.order_by('position').values_list('food__name', 'calories', 'date'))
+
+    def test_items_are_extracted_and_normalized(self):
+        self.assertEqual(self.entries(), [('oat porridge', 300, date(2024, 1, 1)), ('banana', None, date(2024, 1, 1))])
+
+    def test_edit_replaces_the_entries(self):
+        self.client.patch(f'/api/health/meals/{self.meal_id}/', {
+            'food_items': [{'name': 'toast', 'calories': 150}], 'date': '2024-01-02'
+        }, format='json')
+
+        self.assertEqual(self.entries(), [('toast', 150, date(2024, 1, 2))])
+
+    def test_delete_removes_the_entries(self):
+        self.client.delete(f'/api/health/meals/{self.meal_id}/')
+
+        self.assertEqual(self.entries(), [])
+
+    def test_frequency_and_nutrients(self):
+        frequency = self.client.get('/api/health/foods/frequency/').data
+        self.assertEqual([food['food'] for food in frequency], ['banana', 'oat porridge'])
+
+        nutrients = self.client.get('/api/health/foods/nutrients/', {'limit': 1}).data
+        self.assertEqual([food['food'] for food in nutrients['foods']], ['oat porridge'])
+        self.assertEqual(nutrients['totals']['calories'], 300)
+
+    def test_invalid_limit_is_rejected(self):
+        for limit in ('abc', '0', '-5'):
+            for url in ('/api/health/foods/frequency/', '/api/health/foods/nutrients/'):
+                with self.subTest(limit=limit, url=url):
+                    self.assertEqual(self.client.get(url, {'limit': limit}).status_code, 400)
+
+
+class FastReaderTests(HealthRecordsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        day, at = date(2024, 3, 10), time(7, 30, 15, 250)
+        WorkoutLog.objects.create(user=self.user, workout_type='cardio', activity='run', duration=30,
+                                  calories_burned=None, distance=Decimal('5.5'), date=day, time=at)
+        WorkoutLog.objects.create(user=self.user, workout_type='strength', activity='lift', duration=45,
+                                  calories_burned=300, distance=None, notes='légs', date=day, time=time(18))
+        MealLog.objects.create(user=self.user, meal_type='lunch', total_calories=650, protein=Decimal('30.10'),
+                               carbs=None, fat=Decimal('0'), notes='', date=day, time=at,
+                               food_items=[{'name': 'rice', 'calories': 400, 'extra': {'ok': True, 'n': None}}])
+        WaterLog.objects.create(user=self.user, amount=250, date=day, time=time(0))
+        SleepLog.objects.create(user=self.user, start_time=timezone.make_aware(datetime(2024, 3, 9, 23, 15)),
+                                end_time=timezone.make_aware(datetime(2024, 3, 10, 6, 45, 0, 123456)),
+                                duration=Decimal('7.5'), quality=4)
+        VitalsLog.objects.create(user=self.user, heart_rate=62, temperature=Decimal('36.6'), glucose=None,
+                                 weight=Decimal('72.05'), date=day, time=at)
+        MedicationLog.objects.create(user=self.user, medication_name='Vitamin D', dosage='1000',
+                                     dosage_unit='IU', taken=False, date=day, time=at)
+        MoodLog.objects.create(user=self.user, mood=4, energy=None, stress=2, date=day, time=at)
+        HealthGoal.objects.create(user=self.user, goal_type='weight', title='Lose 2 kg', description='',
+                                  target_value=None, start_date=day, target_date=date(2024, 6, 1),
+                                  progress=Decimal('12.5'))
+
+    def assertSameBody(self, url, params=None):
+        fast = self.client.get(url, params)
+        with mock.patch.object(BaseHealthLogViewSet, 'fast_list', False):
+            regular = self.client.get(url, params)
+
+        self.assertEqual(fast.status_code, 200)
+        self.assertTrue(fast.data['results'])
+        self.assertEqual(fast.content, regular.content)
+
+    def test_every_log_type_renders_like_its_serializer(self):
+        urls = ['workouts', 'meals', 'water', 'sleep', 'vitals', 'medications', 'mood', 'goals']
+        for zone in ('UTC', 'America/New_York'):
+            for url in urls:
+                with self.subTest(zone=zone, url=url), self.settings(TIME_ZONE=zone):
+                    self.assertSameBody(f'/api/health/{url}/')
+
+    def test_sparse_fieldsets_render_like_the_serializer(self):
+        self.assertSameBody('/api/health/meals/', {'fields': 'id,protein,food_items,created_at'})
+        self.assertSameBody('/api/health/sleep/', {'exclude': 'notes,duration'})
+
+    def test_every_log_type_has_a_reader(self):
+        for viewset in BaseHealthLogViewSet.__subclasses__():
+            with self.subTest(viewset=viewset.__name__):
+                self.assertIsNotNone(FastReader.for_serializer(viewset.serializer_class()))
+
+
+class ColumnarFormatTests(HealthRecordsTestCase):
+
+    def test_weekly_summary_columns_match_rows(self):
+        WaterLog.objects.create(user=self.user, amount=500, date=date(2024, 3, 5), time=time(9))
+        MealLog.objects.create(user=self.user, meal_type='lunch', total_calories=600, food_items=[], date=date(2024, 3, 7),
+                               time=time(12))
+        params = {'date': '2024-03-10', 'weeks': 2}
+
+        rows = self.client.get('/api/health/summary/weekly/', params).json()
+        response = self.client.get('/api/health/summary/weekly/', {**params, 'format': 'columnar'})
+
+        self.assertEqual(response['Content-Type'], 'application/json')
+        columns = response.json()
+        self.assertEqual(columns['start_date'], rows['start_date'])
+        self.assertEqual(set(columns['weeks']), set(rows['weeks'][0]))
+        self.assertEqual(columns['weeks']['weekly_totals'], [week['weekly_totals'] for week in rows['weeks']])
+
+        for index, week in enumerate(rows['weeks']):
+            days = columns['weeks']['daily_summaries'][index]
+            self.assertEqual(set(days), set(week['daily_summaries'][0]))
+            for key, values in days.items():
+                self.assertEqual(values, [day[key] for day in week['daily_summaries']])
+        self.assertEqual(columns['weeks']['daily_summaries'][1]['total_water_intake'], [0, 500, 0, 0, 0, 0, 0])
+
+
+class IdempotencyLeaseTests(HealthRecordsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Finished keys of earlier tests may outlive their rolled back rows
+        _finished_keys.clear()
+
+    def post_water(self):
+        return self.client.post('/api/health/water/', {
+            'amount': 250, 'date': '2024-01-01', 'time': '08:00'
+        }, format='json', HTTP_IDEMPOTENCY_KEY='retry-1')
+
+    def leave_unfinished(self, started_at):
+        """
+        Turn the stored response of a first request back into the
+        reservation of a request that never finished.
+        """
+        self.assertEqual(self.post_water().status_code, 201)
+        WaterLog.objects.all().delete()
+        IdempotencyKey.objects.update(status_code=None, response_data=None, started_at=started_at)
+        _finished_keys.clear()
+
+    def test_unfinished_request_holds_its_key(self):
+        self.leave_unfinished(timezone.now())
+
+        self.assertEqual(self.post_water().status_code, 409)
+        self.assertFalse(WaterLog.objects.exists())
+
+    def test_abandoned_reservation_is_taken_over_after_the_lease(self):
+        self.leave_unfinished(timezone.now() - timedelta(hours=1))
+
+        response = self.post_water()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(WaterLog.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.get(user=self.user, key='retry-1').status_code, 201)
+        self.assertEqual(self.post_water()['Idempotent-Replayed'], 'true')
+
+
+class ConditionalRequestTests(HealthRecordsTestCase):
+
+    def test_etag_changes_with_the_default_date(self):
+        first = self.client.get('/api/health/summary/daily/')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(
+            self.client.get('/api/health/summary/daily/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304
+        )
+
+        tomorrow = date.today() + timedelta(days=1)
+        with mock.patch('health_records.versions.date') as mock_date:
+            mock_date.today.return_value = tomorrow
+            response = self.client.get('/api/health/summary/daily/', HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+
+
+@skipUnless(search_enabled(), 'Needs the full-text search index.')
+class SearchTests(HealthRecordsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for notes in ('banana bread', 'banana', 'banana and oat porridge'):
+            self.client.post('/api/health/meals/', {
+                'meal_type': 'snack', 'total_calories': 300, 'food_items': [], 'notes': notes,
+                'date': '2024-01-01', 'time': '08:00'
+            }, format='json')
+        self.client.post('/api/health/water/', {
+            'amount': 250, 'date': '2024-01-01', 'time': '08:00', 'notes': 'banana'
+        }, format='json')
+
+    def search(self, url, terms):
+        response = self.client.get(url, {'search': terms})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_matches_are_ordered_by_relevance(self):
+        with CaptureQueriesContext(connection) as context:
+            results = self.search('/api/health/meals/', 'banan')
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]['notes'], 'banana')
+        # Ranked in SQL, not with one bound parameter per match
+        self.assertTrue(all(query['sql'].count('WHEN') == 0 for query in context.captured_queries))
+
+    def test_all_terms_must_match(self):
+        results = self.search('/api/health/meals/', 'banana porr')
+
+        self.assertEqual([result['notes'] for result in results], ['banana and oat porridge'])
+
+    def test_failed_rebuild_keeps_the_index(self):
+        with mock.patch('health_records.search.index_documents', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                rebuild_search_index(SYNC_LOG_TYPES)
+
+        self.assertEqual(len(self.search('/api/health/meals/', 'banana')), 3)
+
+    def test_log_types_without_indexed_text_are_not_filtered(self):
+        self.assertEqual(len(self.search('/api/health/water/', 'banana')), 1)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Checks SQLite query plans.')
+class IndexUsageTests(HealthRecordsTestCase):
+
+    def assertUsesIndex(self, queryset, index_name, sorted_by_index=True):
+        self.assertPlanUsesIndex(queryset.explain(), index_name, sorted_by_index)
+
+    def assertPlanUsesIndex(self, plan, index_name, sorted_by_index=True):
+        self.assertIn(f'USING INDEX {index_name}', plan)
+        self.assertNotIn('SCAN', plan)
+        if sorted_by_index:
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def list_query_plans(self, url, table):
+        """
+        EXPLAIN QUERY PLAN of each read of ``table`` made by a GET of ``url``.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if query['sql'].startswith('SELECT') and f'FROM "{table}"' in query['sql']:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+                    plans.append('\n'.join(str(row[-1]) for row in cursor.fetchall()))
+        self.assertTrue(plans)
+        return plans, response
+
+    def test_log_list_pages_read_the_user_date_time_index_in_order(self):
+        for model, index_name, url in (
+            (MealLog, 'meal_user_date_time_idx', '/api/health/meals/'),
+            (WaterLog, 'water_user_date_time_idx', '/api/health/water/'),
+        ):
+            model.objects.bulk_create([
+                model(user=self.user, date=date(2024, 1, day), time=time(9), **(
+                    {'meal_type': 'snack', 'total_calories': 100, 'food_items': []} if model is MealLog
+                    else {'amount': 250}
+                ))
+                for day in range(1, 4)
+            ])
+            with self.subTest(model=model.__name__):
+                first_plans, response = self.list_query_plans(f'{url}?page_size=1', model._meta.db_table)
+                # The next page adds the keyset predicate on (date, time, id)
+                next_plans, _ = self.list_query_plans(response.data['next'], model._meta.db_table)
+                for plan in first_plans + next_plans:
+                    self.assertPlanUsesIndex(plan, index_name)
+
+    def test_daily_filter_uses_the_user_date_time_index(self):
+        queryset = MealLog.objects.filter(user=self.user, date=date(2024, 1, 1))
+        self.assertUsesIndex(queryset, 'meal_user_date_time_idx')
+
+    def test_sleep_by_end_time_uses_the_user_end_time_index(self):
+        day_start = timezone.make_aware(datetime(2024, 1, 1))
+        day_end = timezone.make_aware(datetime.combine(date(2024, 1, 1), time.max))
+        queryset = SleepLog.objects.filter(user=self.user, end_time__range=(day_start, day_end))
+        # Sorted afterwards by the default -start_time ordering
+        self.assertUsesIndex(queryset, 'sleep_user_end_time_idx', sorted_by_index=False)
+
+    def test_goals_by_status_use_the_user_status_index(self):
+        queryset = HealthGoal.objects.filter(user=self.user, status='active')
+        # Sorted afterwards by the default -start_date ordering
+        self.assertUsesIndex(queryset, 'goal_user_status_idx', sorted_by_index=False)
@@ -6,7 +6,7 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     WorkoutLogViewSet, MealLogViewSet, WaterLogViewSet, SleepLogViewSet,
     VitalsLogViewSet, MedicationLogViewSet, MoodLogViewSet, HealthGoalViewSet,
-    HealthSummaryViewSet
+    HealthSummaryViewSet, SyncViewSet, FoodViewSet
 )
 
 router = DefaultRouter()
@@ -19,6 +19,8 @@ router.register(r'medications', MedicationLogViewSet)
 router.register(r'mood', MoodLogViewSet)
 router.register(r'goals', HealthGoalViewSet)
 router.register(r'summary', HealthSummaryViewSet, basename='summary')
+router.register(r'sync', SyncViewSet, basename='sync')
+router.register(r'foods', FoodViewSet, basename='foods')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -0,0 +1,98 @@
+"""
+Per-user data versions and conditional GET support.
+
+Every write to a health record bumps the writer's ``DataVersion``. Views
+wrapped with ``condition_on_data_version`` derive a strong ETag and a
+Last-Modified date from it and answer matching conditional requests with
+304 before doing any other work. Views default their date to today, so both
+also change when the day does, like the ``cache_response`` keys.
+"""
+import hashlib
+from datetime import date, datetime
+from functools import wraps
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import DataVersion
+
+
+def bump_data_versions(user_ids):
+    """
+    Increment the data version of each user in ``user_ids``.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    
+    with transaction.atomic():
+        DataVersion.objects.bulk_create(
+            [DataVersion(user_id=user_id) for user_id in user_ids],
+            ignore_conflicts=True
+        )
+        DataVersion.objects.filter(user_id__in=user_ids).update(
+            version=F('version') + 1,
+            updated_at=timezone.now()
+        )
+
+
+def get_data_version(user):
+    """
+    Return ``(version, updated_at)`` for ``user``; ``(0, None)`` if the user
+    has never written a record.
+    """
+    row = DataVersion.objects.filter(user=user).values_list('version', 'updated_at').first()
+    return row or (0, None)
+
+
+def get_request_data_version(request):
+    """
+    ``get_data_version`` for the requesting user, read once per request.
+    """
+    if not hasattr(request, '_data_version'):
+        request._data_version = get_data_version(request.user)
+    return request._data_version
+
+
+def _etag(request, version, today):
+    """
+    Strong ETag for this user, data version, day and representation.
+    """
+    digest = hashlib.sha256('|'.join([
+        str(request.user.pk),
+        str(version),
+        today.isoformat(),
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+    ]).encode('utf-8')).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def condition_on_data_version(view_method):
+    """
+    Add ETag and Last-Modified headers to a GET view and return 304 Not
+    Modified when the client already holds the current representation.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        version, updated_at = get_request_data_version(request)
+        # Same clock as the ``datetime.now()`` date defaults in the views
+        today = date.today()
+        etag = _etag(request, version, today)
+        start_of_day = datetime.combine(today, datetime.min.time()).timestamp()
+        last_modified = int(max(updated_at.timestamp(), start_of_day)) if updated_at else None
+        
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = view_method(self, request, *args, **kwargs)
+        
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+    
+    return wrapper
@@ -1,51 +1,143 @@
 from datetime import datetime, timedelta
-from django.db.models import Sum, Avg
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
 from rest_framework import viewsets, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from users.permissions import IsOwner
+from health_project.renderers import ColumnarFormatMixin
+from health_project.sparse_fields import SparseFieldsViewMixin
 
 from .models import (
     WorkoutLog, MealLog, WaterLog, SleepLog, VitalsLog,
-    MedicationLog, MoodLog, HealthGoal
+    MedicationLog, MoodLog, HealthGoal, ChangeLog, DataVersion, FoodItemEntry
 )
 from .serializers import (
     WorkoutLogSerializer, MealLogSerializer, WaterLogSerializer,
     SleepLogSerializer, VitalsLogSerializer, MedicationLogSerializer,
     MoodLogSerializer, HealthGoalSerializer, DailyHealthSummarySerializer
 )
-from users.permissions import IsOwner
+from .cache import cache_response
+from .fast_read import FastReader
+from .foods import normalize_food_name
+from .idempotency import idempotent
+from .pagination import HealthLogPagination
+from .search import SEARCH_FIELDS, FullTextSearchFilter
+from .rollups import get_rollups
+from .signals import health_logs_bulk_created
+from .sync import SYNC_MODELS
+from .versions import condition_on_data_version
 
-class BaseHealthLogViewSet(viewsets.ModelViewSet):
+class BaseHealthLogViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """
     Base viewset for health logs with common functionality.
     """
     permission_classes = [permissions.IsAuthenticated, IsOwner]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['date']
     ordering_fields = ['date', 'time', 'created_at']
     ordering = ['-date', '-time']
+    pagination_class = HealthLogPagination
+    keyset_ordering = ['-date', '-time', '-id']
+    bulk_max_records = 5000
+    bulk_batch_size = 500
+    fast_list = True
     
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
     
+    @condition_on_data_version
+    def list(self, request, *args, **kwargs):
+        """
+        List logs through ``FastReader`` when the serializer allows it,
+        which skips model and serializer instantiation per row.
+        """
+        reader = FastReader.for_serializer(self.get_serializer()) if self.fast_list else None
+        if reader is None:
+            return super().list(request, *args, **kwargs)
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = reader.values(queryset, extra=[field.lstrip('-') for field in self.keyset_ordering])
+        
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.render(page))
+        
+        return Response(reader.render(rows))
+    
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+    
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+    
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def bulk(self, request):
+        """
+        Create many log entries in a single request.
+        
+        Accepts a list of records (or ``{"records": [...]}``). Valid records are
+        inserted with one ``bulk_create``; invalid ones are reported by index
+        without aborting the rest of the batch.
+        """
+        records = request.data
+        if isinstance(records, dict):
+            records = records.get('records')
+        
+        if not isinstance(records, list) or not records:
+            return Response({'error': 'Expected a non-empty list of records.'}, 
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(records) > self.bulk_max_records:
+            return Response({'error': f'At most {self.bulk_max_records} records can be created per request.'}, 
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = self.get_serializer(data=records, many=True)
+        errors = []
+        
+        if not serializer.is_valid():
+            # ListSerializer rejects the whole batch, so re-validate only the
+            # records that passed to keep the good rows.
+            errors = [
+                {'index': index, 'errors': item_errors}
+                for index, item_errors in enumerate(serializer.errors)
+                if item_errors
+            ]
+            failed = {error['index'] for error in errors}
+            valid_records = [record for index, record in enumerate(records) if index not in failed]
+            
+            serializer = self.get_serializer(data=valid_records, many=True)
+            serializer.is_valid(raise_exception=True)
+        
+        model = self.queryset.model
+        instances = [model(user=request.user, **attrs) for attrs in serializer.validated_data]
+        
+        with transaction.atomic():
+            created = model.objects.bulk_create(instances, batch_size=self.bulk_batch_size)
+            health_logs_bulk_created.send(sender=model, instances=created)
+        
+        return Response({
+            'created': len(created),
+            'results': self.get_serializer(created, many=True).data,
+            'errors': errors,
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
 
 
 class WorkoutLogViewSet(BaseHealthLogViewSet):
     queryset = WorkoutLog.objects.all()
     serializer_class = WorkoutLogSerializer
     filterset_fields = ['date', 'workout_type', 'activity']
-    search_fields = ['activity', 'notes']
+    search_fields = SEARCH_FIELDS['workouts']
 
 
 class MealLogViewSet(BaseHealthLogViewSet):
     queryset = MealLog.objects.all()
     serializer_class = MealLogSerializer
     filterset_fields = ['date', 'meal_type']
-    search_fields = ['food_items', 'notes']
+    search_fields = SEARCH_FIELDS['meals']
 
 
 class WaterLogViewSet(BaseHealthLogViewSet):
@@ -76,39 +168,42 @@ class WaterLogViewSet(BaseHealthLogViewSet):
 class SleepLogViewSet(BaseHealthLogViewSet):
     queryset = SleepLog.objects.all()
     serializer_class = SleepLogSerializer
-    filterset_fields = ['start_time__date', 'quality']
-    search_fields = ['notes']
+    filterset_fields = {'start_time': ['date'], 'quality': ['exact']}
+    search_fields = SEARCH_FIELDS['sleep']
     ordering_fields = ['start_time', 'duration', 'quality']
     ordering = ['-start_time']
+    keyset_ordering = ['-start_time', '-id']
 
 
 class VitalsLogViewSet(BaseHealthLogViewSet):
     queryset = VitalsLog.objects.all()
     serializer_class = VitalsLogSerializer
     filterset_fields = ['date']
-    search_fields = ['notes']
+    search_fields = SEARCH_FIELDS['vitals']
 
 
 class MedicationLogViewSet(BaseHealthLogViewSet):
     queryset = MedicationLog.objects.all()
     serializer_class = MedicationLogSerializer
     filterset_fields = ['date', 'medication_name', 'taken']
-    search_fields = ['medication_name', 'notes']
+    search_fields = SEARCH_FIELDS['medications']
 
 
 class MoodLogViewSet(BaseHealthLogViewSet):
     queryset = MoodLog.objects.all()
     serializer_class = MoodLogSerializer
     filterset_fields = ['date', 'mood', 'energy', 'stress']
-    search_fields = ['notes']
+    search_fields = SEARCH_FIELDS['mood']
     
 
 class HealthGoalViewSet(BaseHealthLogViewSet):
     queryset = HealthGoal.objects.all()
     serializer_class = HealthGoalSerializer
     filterset_fields = ['goal_type', 'status', 'start_date', 'target_date']
-    search_fields = ['title', 'description', 'notes']
+    search_fields = SEARCH_FIELDS['goals']
     ordering_fields = ['start_date', 'target_date', 'progress', 'created_at']
+    ordering = ['-start_date']
+    keyset_ordering = ['-start_date', '-id']
     
     @action(detail=True, methods=['patch'])
     def update_progress(self, request, pk=None):
@@ -135,10 +230,34 @@ class HealthGoalViewSet(BaseHealthLogViewSet):
         return Response(HealthGoalSerializer(goal).data)
 
 
-class HealthSummaryViewSet(viewsets.ViewSet):
+class HealthSummaryViewSet(ColumnarFormatMixin, viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
+    max_weeks = 52
+    
+    def _summary(self, rollup):
+        """
+        Shape a DailyRollup as a daily summary.
+        """
+        return {
+            'date': rollup.date,
+            'total_calories_consumed': rollup.calories_consumed,
+            'total_calories_burned': rollup.calories_burned,
+            'total_water_intake': rollup.water_intake,
+            'sleep_duration': rollup.avg_sleep_duration,
+            'avg_mood': rollup.avg_mood,
+            'workout_minutes': rollup.workout_minutes
+        }
+    
+    def _daily_summaries(self, user, start_date, end_date):
+        """
+        Build one summary per day between ``start_date`` and ``end_date``
+        from the daily rollups, read with a single range scan.
+        """
+        return [self._summary(rollup) for rollup in get_rollups(user, start_date, end_date)]
     
     @action(detail=False, methods=['get'])
+    @condition_on_data_version
+    @cache_response
     def daily(self, request):
         date_str = request.query_params.get('date', datetime.now().strftime('%Y-%m-%d'))
         try:
@@ -147,43 +266,37 @@ class HealthSummaryViewSet(viewsets.ViewSet):
             return Response({'error': 'Invalid date format. Use YYYY-MM-DD.'}, 
                             status=status.HTTP_400_BAD_REQUEST)
         
-        meals = MealLog.objects.filter(user=request.user, date=date)
-        total_calories = meals.aggregate(total=Sum('total_calories'))['total'] or 0
-        
-        workouts = WorkoutLog.objects.filter(user=request.user, date=date)
-        calories_burned = workouts.aggregate(total=Sum('calories_burned'))['total'] or 0
-        workout_minutes = workouts.aggregate(total=Sum('duration'))['total'] or 0
-        
-        water_logs = WaterLog.objects.filter(user=request.user, date=date)
-        water_intake = water_logs.aggregate(total=Sum('amount'))['total'] or 0
-        
-        end_time_min = datetime.combine(date, datetime.min.time())
-        end_time_max = datetime.combine(date, datetime.max.time())
-        
-        sleep_logs = SleepLog.objects.filter(
-            user=request.user,
-            end_time__range=(end_time_min, end_time_max)
-        )
-        sleep_duration = sleep_logs.aggregate(avg=Avg('duration'))['avg'] or 0
-        
-        mood_logs = MoodLog.objects.filter(user=request.user, date=date)
-        avg_mood = mood_logs.aggregate(avg=Avg('mood'))['avg'] or 0
-        
-        summary = {
-            'date': date,
-            'total_calories_consumed': total_calories,
-            'total_calories_burned': calories_burned,
-            'total_water_intake': water_intake,
-            'sleep_duration': sleep_duration,
-            'avg_mood': avg_mood,
-            'workout_minutes': workout_minutes
-        }
+        summary = self._daily_summaries(request.user, date, date)[0]
         
         serializer = DailyHealthSummarySerializer(summary)
         return Response(serializer.data)
     
+    def _weekly_summary(self, daily_summaries):
+        """
+        Combine seven daily summaries into a weekly summary.
+        """
+        return {
+            'start_date': daily_summaries[0]['date'],
+            'end_date': daily_summaries[-1]['date'],
+            'daily_summaries': daily_summaries,
+            'weekly_totals': {
+                'total_calories_consumed': sum(d['total_calories_consumed'] for d in daily_summaries),
+                'total_calories_burned': sum(d['total_calories_burned'] for d in daily_summaries),
+                'total_water_intake': sum(d['total_water_intake'] for d in daily_summaries),
+                'avg_sleep_duration': sum(d['sleep_duration'] for d in daily_summaries) / 7 if any(d['sleep_duration'] for d in daily_summaries) else 0,
+                'avg_mood': sum(d['avg_mood'] for d in daily_summaries) / 7 if any(d['avg_mood'] for d in daily_summaries) else 0,
+                'total_workout_minutes': sum(d['workout_minutes'] for d in daily_summaries),
+            }
+        }
+    
     @action(detail=False, methods=['get'])
+    @condition_on_data_version
+    @cache_response
     def weekly(self, request):
+        """
+        Summarize the week containing ``date``. With ``weeks=N`` the N weeks
+        ending with that week are returned in a single pass.
+        """
         date_str = request.query_params.get('date', datetime.now().strftime('%Y-%m-%d'))
         try:
             date = datetime.strptime(date_str, '%Y-%m-%d').date()
@@ -193,57 +306,234 @@ class HealthSummaryViewSet(viewsets.ViewSet):
             return Response({'error': 'Invalid date format. Use YYYY-MM-DD.'}, 
                             status=status.HTTP_400_BAD_REQUEST)
         
-        daily_summaries = []
-        current_date = start_date
+        weeks = request.query_params.get('weeks')
+        if weeks is None:
+            daily_summaries = self._daily_summaries(request.user, start_date, end_date)
+            return Response(self._weekly_summary(daily_summaries))
         
-        while current_date <= end_date:
-            meals = MealLog.objects.filter(user=request.user, date=current_date)
-            total_calories = meals.aggregate(total=Sum('total_calories'))['total'] or 0
-            
-            workouts = WorkoutLog.objects.filter(user=request.user, date=current_date)
-            calories_burned = workouts.aggregate(total=Sum('calories_burned'))['total'] or 0
-            workout_minutes = workouts.aggregate(total=Sum('duration'))['total'] or 0
-            
-            water_logs = WaterLog.objects.filter(user=request.user, date=current_date)
-            water_intake = water_logs.aggregate(total=Sum('amount'))['total'] or 0
-            
-            end_time_min = datetime.combine(current_date, datetime.min.time())
-            end_time_max = datetime.combine(current_date, datetime.max.time())
-            
-            sleep_logs = SleepLog.objects.filter(
-                user=request.user,
-                end_time__range=(end_time_min, end_time_max)
-            )
-            sleep_duration = sleep_logs.aggregate(avg=Avg('duration'))['avg'] or 0
-            
-            mood_logs = MoodLog.objects.filter(user=request.user, date=current_date)
-            avg_mood = mood_logs.aggregate(avg=Avg('mood'))['avg'] or 0
-            
-            summary = {
-                'date': current_date,
-                'total_calories_consumed': total_calories,
-                'total_calories_burned': calories_burned,
-                'total_water_intake': water_intake,
-                'sleep_duration': sleep_duration,
-                'avg_mood': avg_mood,
-                'workout_minutes': workout_minutes
-            }
-            
-            daily_summaries.append(summary)
-            current_date += timedelta(days=1)
+        try:
+            weeks = int(weeks)
+            if weeks < 1 or weeks > self.max_weeks:
+                raise ValueError
+        except ValueError:
+            return Response({'error': f'weeks must be a number between 1 and {self.max_weeks}.'}, 
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        start_date -= timedelta(weeks=weeks - 1)
+        daily_summaries = self._daily_summaries(request.user, start_date, end_date)
         
-        weekly_summary = {
+        return Response({
             'start_date': start_date,
             'end_date': end_date,
-            'daily_summaries': daily_summaries,
-            'weekly_totals': {
-                'total_calories_consumed': sum(d['total_calories_consumed'] for d in daily_summaries),
-                'total_calories_burned': sum(d['total_calories_burned'] for d in daily_summaries),
-                'total_water_intake': sum(d['total_water_intake'] for d in daily_summaries),
-                'avg_sleep_duration': sum(d['sleep_duration'] for d in daily_summaries) / 7 if any(d['sleep_duration'] for d in daily_summaries) else 0,
-                'avg_mood': sum(d['avg_mood'] for d in daily_summaries) / 7 if any(d['avg_mood'] for d in daily_summaries) else 0,
-                'total_workout_minutes': sum(d['workout_minutes'] for d in daily_summaries),
+            'weeks': [
+                self._weekly_summary(daily_summaries[offset:offset + 7])
+                for offset in range(0, len(daily_summaries), 7)
+            ]
+        })
+
+
+class SyncViewSet(viewsets.ViewSet):
+    """
+    Delta-sync feed for offline clients.
+    
+    ``since`` is the ``cursor`` returned by the previous call (omit it for a
+    full sync). The response lists every record created, updated or deleted
+    after that point, oldest change first, with the current data for live
+    records and a tombstone for deleted ones. A cursor older than the purged
+    tombstones gets 410 Gone with ``full_resync`` set.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    default_limit = 500
+    max_limit = 1000
+    serializer_classes = {
+        'workouts': WorkoutLogSerializer,
+        'meals': MealLogSerializer,
+        'water': WaterLogSerializer,
+        'sleep': SleepLogSerializer,
+        'vitals': VitalsLogSerializer,
+        'medications': MedicationLogSerializer,
+        'mood': MoodLogSerializer,
+        'goals': HealthGoalSerializer,
+    }
+    
+    def list(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = int(request.query_params.get('limit', self.default_limit))
+            if since < 0 or limit < 1:
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'since and limit must be non-negative integers.'}, 
+                            status=status.HTTP_400_BAD_REQUEST)
+        
+        if since:
+            floor = DataVersion.objects.filter(user=request.user).values_list('sync_floor', flat=True).first()
+            if floor and since < floor:
+                return Response({'error': 'This cursor is too old; sync again without since.', 'full_resync': True}, 
+                                status=status.HTTP_410_GONE)
+        
+        limit = min(limit, self.max_limit)
+        entries = list(
+            ChangeLog.objects.filter(user=request.user, id__gt=since)
+            .order_by('id')
+            .values('id', 'log_type', 'object_id', 'action')[:limit + 1]
+        )
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        
+        # Load the live records with one query per log type.
+        upserts = {}
+        for entry in entries:
+            if entry['action'] == 'upsert':
+                upserts.setdefault(entry['log_type'], []).append(entry['object_id'])
+        
+        records = {}
+        for log_type, ids in upserts.items():
+            serializer_class = self.serializer_classes[log_type]
+            instances = SYNC_MODELS[log_type].objects.filter(user=request.user, pk__in=ids)
+            # Without the request, so ?fields= and ?exclude= cannot trim the
+            # records; sync clients need all of each one.
+            for data in serializer_class(instances, many=True).data:
+                records[(log_type, data['id'])] = data
+        
+        changes = []
+        for entry in entries:
+            change = {'type': entry['log_type'], 'id': entry['object_id'], 'action': entry['action']}
+            if entry['action'] == 'upsert':
+                data = records.get((entry['log_type'], entry['object_id']))
+                if data is None:
+                    # Deleted since; its tombstone comes later in the feed.
+                    continue
+                change['data'] = data
+            changes.append(change)
+        
+        return Response({
+            'cursor': entries[-1]['id'] if entries else since,
+            'has_more': has_more,
+            'changes': changes,
+        })
+
+
+class FoodViewSet(viewsets.ViewSet):
+    """
+    Per-food statistics over the food items extracted from meal logs.
+    
+    Both actions accept ``start_date``/``end_date`` (YYYY-MM-DD) and ``food``
+    to restrict the results to a single food.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    default_limit = 20
+    max_limit = 100
+    
+    def _entries(self, request):
+        """
+        Return the user's food item entries filtered by the query parameters,
+        or an error response.
+        """
+        entries = FoodItemEntry.objects.filter(user=request.user)
+        
+        for param, lookup in (('start_date', 'date__gte'), ('end_date', 'date__lte')):
+            value = request.query_params.get(param)
+            if value:
+                try:
+                    value = datetime.strptime(value, '%Y-%m-%d').date()
+                except ValueError:
+                    return None, Response({'error': 'Invalid date format. Use YYYY-MM-DD.'}, 
+                                          status=status.HTTP_400_BAD_REQUEST)
+                entries = entries.filter(**{lookup: value})
+        
+        food = request.query_params.get('food')
+        if food:
+            entries = entries.filter(food__name=normalize_food_name(food))
+        
+        return entries, None
+    
+    def _limit(self, request):
+        """
+        Return ``limit`` capped at ``max_limit``, or an error response.
+        """
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            return None, Response({'error': 'limit must be a positive integer.'}, 
+                                  status=status.HTTP_400_BAD_REQUEST)
+        return min(limit, self.max_limit), None
+    
+    @action(detail=False, methods=['get'])
+    def frequency(self, request):
+        """
+        How often each food was eaten, most frequent first.
+        """
+        entries, error = self._entries(request)
+        if error:
+            return error
+        
+        limit, error = self._limit(request)
+        if error:
+            return error
+        
+        foods = (
+            entries.values('food__name')
+            .annotate(
+                count=Count('id'),
+                meals=Count('meal', distinct=True),
+                first_eaten=Min('date'),
+                last_eaten=Max('date'),
+            )
+            .order_by('-count', 'food__name')[:limit]
+        )
+        
+        return Response([
+            {
+                'food': food['food__name'],
+                'count': food['count'],
+                'meals': food['meals'],
+                'first_eaten': food['first_eaten'],
+                'last_eaten': food['last_eaten'],
             }
+            for food in foods
+        ])
+    
+    @action(detail=False, methods=['get'])
+    def nutrients(self, request):
+        """
+        Nutrient totals per food, highest calories first, plus overall totals.
+        """
+        entries, error = self._entries(request)
+        if error:
+            return error
+        
+        limit, error = self._limit(request)
+        if error:
+            return error
+        
+        nutrients = {
+            'calories': Sum('calories'),
+            'protein': Sum('protein'),
+            'carbs': Sum('carbs'),
+            'fat': Sum('fat'),
         }
         
-        return Response(weekly_summary)
+        foods = (
+            entries.values('food__name')
+            .annotate(count=Count('id'), **nutrients)
+            .order_by('-calories', 'food__name')[:limit]
+        )
+        totals = entries.aggregate(count=Count('id'), **nutrients)
+        
+        return Response({
+            'foods': [
+                {
+                    'food': food['food__name'],
+                    'count': food['count'],
+                    'calories': food['calories'] or 0,
+                    'protein': food['protein'] or 0,
+                    'carbs': food['carbs'] or 0,
+                    'fat': food['fat'] or 0,
+                }
+                for food in foods
+            ],
+            'totals': {key: value or 0 for key, value in totals.items()},
+        })
@@ -0,0 +1,134 @@
+"""
+Compare the orjson renderer's throughput with DRF's JSONRenderer, and the
+MessagePack renderer's size and parse time, on the monthly report payload.
+The output of both JSON renderers is checked against each other first;
+health_project.tests covers the individual value types.
+"""
+import io
+import json
+import random
+import time
+from datetime import date, time as clock, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from analytics.models import HealthScore
+from health_project.parsers import MessagePackParser
+from health_project.renderers import MessagePackRenderer, ORJSONRenderer, orjson
+from health_records.models import WorkoutLog, MealLog, WaterLog, VitalsLog
+from health_records.rollups import rebuild_rollups
+from reporting.views import ReportGenerationViewSet
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the JSON and MessagePack renderers on a monthly report.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=2000,
+                            help='Renders per timed run.')
+        parser.add_argument('--runs', type=int, default=5,
+                            help='Timed runs per renderer; the best one is reported.')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError('orjson is not installed; ORJSONRenderer uses the stdlib renderer.')
+
+        stdlib, fast = JSONRenderer(), ORJSONRenderer()
+
+        payload = self._monthly_report()
+        expected, actual = stdlib.render(payload), fast.render(payload)
+        if expected != actual:
+            raise CommandError('Monthly report: ORJSONRenderer output differs from JSONRenderer.')
+
+        repeat = options['repeat']
+        slow = self._best_time(lambda: stdlib.render(payload), repeat, options['runs'])
+        quick = self._best_time(lambda: fast.render(payload), repeat, options['runs'])
+        megabytes = len(expected) * repeat / 1e6
+        self.stdout.write(f'Monthly report payload: {len(expected):,} bytes')
+        self.stdout.write(f'JSONRenderer    {repeat / slow:>10,.0f} renders/s   {megabytes / slow:>8.1f} MB/s')
+        self.stdout.write(f'ORJSONRenderer  {repeat / quick:>10,.0f} renders/s   {megabytes / quick:>8.1f} MB/s')
+
+        packer, parser = MessagePackRenderer(), MessagePackParser()
+        packed = packer.render(payload)
+        if parser.parse(io.BytesIO(packed)) != json.loads(expected):
+            raise CommandError('Monthly report: MessagePack output does not round-trip.')
+
+        pack = self._best_time(lambda: packer.render(payload), repeat, options['runs'])
+        parse_json = self._best_time(lambda: json.loads(expected), repeat, options['runs'])
+        parse_packed = self._best_time(lambda: parser.parse(io.BytesIO(packed)), repeat, options['runs'])
+        self.stdout.write(
+            f'MessagePack     {repeat / pack:>10,.0f} renders/s   {len(packed):,} bytes '
+            f'({len(packed) / len(expected):.0%} of JSON)'
+        )
+        self.stdout.write(
+            f'Parsing         JSON {repeat / parse_json:,.0f}/s   MessagePack {repeat / parse_packed:,.0f}/s'
+        )
+        self.stdout.write(self.style.SUCCESS(f'Outputs identical; orjson speedup {slow / quick:.1f}x.'))
+
+    def _monthly_report(self):
+        """
+        Build last month's report for a seeded user inside a transaction
+        that is rolled back. The uncached view is called so no response
+        cache entries outlive the data.
+        """
+        rng = random.Random(0)
+        end_date = date.today().replace(day=1) - timedelta(days=1)
+        start_date = end_date.replace(day=1)
+        days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(email=f'benchmark-{time.time_ns()}@example.com')
+            WorkoutLog.objects.bulk_create([
+                WorkoutLog(user=user, workout_type='cardio', activity='run', duration=rng.randint(20, 90),
+                           calories_burned=rng.randint(150, 900), date=day, time=clock(7, 0))
+                for day in days
+            ])
+            MealLog.objects.bulk_create([
+                MealLog(user=user, meal_type=meal_type, food_items=[], total_calories=rng.randint(300, 900),
+                        date=day, time=clock(hour, 0))
+                for day in days for meal_type, hour in (('breakfast', 8), ('lunch', 13), ('dinner', 19))
+            ])
+            WaterLog.objects.bulk_create([
+                WaterLog(user=user, amount=rng.randint(200, 600), date=day, time=clock(10, 0))
+                for day in days
+            ])
+            VitalsLog.objects.bulk_create([
+                VitalsLog(user=user, weight=Decimal(rng.randint(7000, 7600)) / 100, date=day, time=clock(6, 30))
+                for day in days
+            ])
+            HealthScore.objects.bulk_create([
+                HealthScore(user=user, overall_score=Decimal(rng.randint(5000, 9500)) / 100,
+                            nutrition_score=70, activity_score=70, sleep_score=70, hydration_score=70,
+                            calculation_date=day)
+                for day in days
+            ])
+            rebuild_rollups(user_ids=[user.pk])
+
+            request = Request(APIRequestFactory().get(
+                '/api/reports/generate/monthly/', {'month': start_date.month, 'year': start_date.year}
+            ))
+            request.user = user
+            view = ReportGenerationViewSet(request=request, format_kwarg=None, action='monthly')
+            response = ReportGenerationViewSet.monthly.__wrapped__(view, request)
+            if response.status_code != 200:
+                raise CommandError(f'Monthly report failed with status {response.status_code}.')
+
+            transaction.set_rollback(True)
+
+        return response.data
+
+    def _best_time(self, func, repeat, runs):
+        best = None
+        for _ in range(runs):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
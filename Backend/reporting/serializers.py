@@ -2,10 +2,11 @@
 Serializers for the reporting app.
 """
 from rest_framework import serializers
+from health_project.sparse_fields import DynamicFieldsMixin
 from .models import SavedReport, ReportTemplate, ExportedReport
 
 
-class SavedReportSerializer(serializers.ModelSerializer):
+class SavedReportSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the SavedReport model."""
     
     class Meta:
@@ -14,7 +15,7 @@ class SavedReportSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at']
 
 
-class ReportTemplateSerializer(serializers.ModelSerializer):
+class ReportTemplateSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the ReportTemplate model."""
     
     class Meta:
@@ -23,7 +24,7 @@ class ReportTemplateSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
 
-class ExportedReportSerializer(serializers.ModelSerializer):
+class ExportedReportSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for the ExportedReport model."""
     
     class Meta:
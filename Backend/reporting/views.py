@@ -3,16 +3,19 @@ Views for the reporting app.
 """
 from datetime import datetime, timedelta, date
 from calendar import monthrange
-from django.db.models import Avg, Sum, Max, Min
 from django.http import FileResponse
 from rest_framework import viewsets, permissions, status, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from users.permissions import IsOwner
+from health_project.renderers import ColumnarFormatMixin
+from health_project.sparse_fields import SparseFieldsViewMixin
 from health_records.models import (
     WorkoutLog, MealLog, WaterLog, SleepLog, VitalsLog,
     MedicationLog, MoodLog, HealthGoal
 )
+from health_records.cache import cache_response
+from health_records.rollups import get_rollups
 from analytics.models import HealthScore, Insight
 from .models import SavedReport, ReportTemplate, ExportedReport
 from .serializers import (
@@ -21,7 +24,7 @@ from .serializers import (
 )
 
 
-class SavedReportViewSet(viewsets.ModelViewSet):
+class SavedReportViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for saved reports.
     """
@@ -36,7 +39,7 @@ class SavedReportViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class ReportTemplateViewSet(viewsets.ModelViewSet):
+class ReportTemplateViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for report templates.
     """
@@ -73,7 +76,7 @@ class ReportTemplateViewSet(viewsets.ModelViewSet):
         })
 
 
-class ExportedReportViewSet(viewsets.GenericViewSet, 
+class ExportedReportViewSet(SparseFieldsViewMixin, viewsets.GenericViewSet, 
                            mixins.RetrieveModelMixin,
                            mixins.ListModelMixin,
                            mixins.DestroyModelMixin):
@@ -100,13 +103,14 @@ class ExportedReportViewSet(viewsets.GenericViewSet,
         )
 
 
-class ReportGenerationViewSet(viewsets.ViewSet):
+class ReportGenerationViewSet(ColumnarFormatMixin, viewsets.ViewSet):
     """
     ViewSet for generating reports.
     """
     permission_classes = [permissions.IsAuthenticated]
     
     @action(detail=False, methods=['get'])
+    @cache_response
     def daily(self, request):
         """
         Generate a daily report.
@@ -119,6 +123,10 @@ class ReportGenerationViewSet(viewsets.ViewSet):
             return Response({'error': 'Invalid date format. Use YYYY-MM-DD.'}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
+        # Day totals come from the precomputed rollup; the logs are only
+        # read to list the individual entries
+        rollup, = get_rollups(request.user, report_date, report_date)
+        
         # Get nutrition data
         meals = MealLog.objects.filter(user=request.user, date=report_date)
         nutrition_data = {
@@ -136,10 +144,10 @@ class ReportGenerationViewSet(viewsets.ViewSet):
                 for meal in meals
             ],
             'totals': {
-                'calories': meals.aggregate(total=Sum('total_calories'))['total'] or 0,
-                'protein': float(meals.aggregate(total=Sum('protein'))['total'] or 0),
-                'carbs': float(meals.aggregate(total=Sum('carbs'))['total'] or 0),
-                'fat': float(meals.aggregate(total=Sum('fat'))['total'] or 0)
+                'calories': rollup.calories_consumed,
+                'protein': float(rollup.protein),
+                'carbs': float(rollup.carbs),
+                'fat': float(rollup.fat)
             }
         }
         
@@ -159,8 +167,8 @@ class ReportGenerationViewSet(viewsets.ViewSet):
                 for workout in workouts
             ],
             'totals': {
-                'duration': workouts.aggregate(total=Sum('duration'))['total'] or 0,
-                'calories_burned': workouts.aggregate(total=Sum('calories_burned'))['total'] or 0
+                'duration': rollup.workout_minutes,
+                'calories_burned': rollup.calories_burned
             }
         }
         
@@ -186,8 +194,8 @@ class ReportGenerationViewSet(viewsets.ViewSet):
                 for log in sleep_logs
             ],
             'summary': {
-                'total_duration': float(sleep_logs.aggregate(total=Sum('duration'))['total'] or 0),
-                'average_quality': float(sleep_logs.aggregate(avg=Avg('quality'))['avg'] or 0)
+                'total_duration': float(rollup.sleep_duration),
+                'average_quality': float(rollup.avg_sleep_quality)
             }
         }
         
@@ -201,7 +209,7 @@ class ReportGenerationViewSet(viewsets.ViewSet):
                 }
                 for log in water_logs
             ],
-            'total': water_logs.aggregate(total=Sum('amount'))['total'] or 0
+            'total': rollup.water_intake
         }
         
         # Get vitals data
@@ -237,8 +245,8 @@ class ReportGenerationViewSet(viewsets.ViewSet):
                 }
                 for log in medication_logs
             ],
-            'total_taken': medication_logs.filter(taken=True).count(),
-            'total_missed': medication_logs.filter(taken=False).count()
+            'total_taken': rollup.medication_taken,
+            'total_missed': rollup.medication_missed
         }
         
         # Get mood data
@@ -255,9 +263,9 @@ class ReportGenerationViewSet(viewsets.ViewSet):
                 for log in mood_logs
             ],
             'averages': {
-                'mood': float(mood_logs.aggregate(avg=Avg('mood'))['avg'] or 0),
-                'energy': float(mood_logs.aggregate(avg=Avg('energy'))['avg'] or 0),
-                'stress': float(mood_logs.aggregate(avg=Avg('stress'))['avg'] or 0)
+                'mood': float(rollup.avg_mood),
+                'energy': float(rollup.avg_energy),
+                'stress': float(rollup.avg_stress)
             }
         }
         
@@ -310,6 +318,7 @@ class ReportGenerationViewSet(viewsets.ViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cache_response
     def weekly(self, request):
         """
         Generate a weekly report.
@@ -326,75 +335,48 @@ class ReportGenerationViewSet(viewsets.ViewSet):
             return Response({'error': 'Invalid date format. Use YYYY-MM-DD.'}, 
                            status=status.HTTP_400_BAD_REQUEST)
         
-        # Generate daily summaries for each day in the week
-        daily_summaries = []
-        current_date = start_date
-        
-        while current_date <= end_date:
-            # Get daily totals
-            
-            # Nutrition
-            meals = MealLog.objects.filter(user=request.user, date=current_date)
-            total_calories = meals.aggregate(total=Sum('total_calories'))['total'] or 0
-            
-            # Activity
-            workouts = WorkoutLog.objects.filter(user=request.user, date=current_date)
-            total_workout_minutes = workouts.aggregate(total=Sum('duration'))['total'] or 0
-            total_calories_burned = workouts.aggregate(total=Sum('calories_burned'))['total'] or 0
-            
-            # Water
-            water_logs = WaterLog.objects.filter(user=request.user, date=current_date)
-            total_water = water_logs.aggregate(total=Sum('amount'))['total'] or 0
-            
-            # Sleep
-            end_time_min = datetime.combine(current_date, datetime.min.time())
-            end_time_max = datetime.combine(current_date, datetime.max.time())
-            
-            sleep_logs = SleepLog.objects.filter(
+        # Generate daily summaries for each day in the week from the
+        # daily rollups and the week's health scores
+        health_scores = {
+            score.calculation_date: score
+            for score in HealthScore.objects.filter(
                 user=request.user,
-                end_time__range=(end_time_min, end_time_max)
+                calculation_date__range=(start_date, end_date)
             )
-            
-            sleep_duration = sleep_logs.aggregate(total=Sum('duration'))['total'] or 0
-            sleep_quality = sleep_logs.aggregate(avg=Avg('quality'))['avg'] or 0
-            
-            # Mood
-            mood_logs = MoodLog.objects.filter(user=request.user, date=current_date)
-            avg_mood = mood_logs.aggregate(avg=Avg('mood'))['avg'] or 0
-            
-            # Health Score
-            health_score = HealthScore.objects.filter(
-                user=request.user,
-                calculation_date=current_date
-            ).first()
+        }
+        
+        daily_summaries = []
+        
+        for rollup in get_rollups(request.user, start_date, end_date):
+            current_date = rollup.date
+            health_score = health_scores.get(current_date)
             
             daily_summary = {
                 'date': current_date.strftime('%Y-%m-%d'),
                 'day_of_week': current_date.strftime('%A'),
                 'nutrition': {
-                    'total_calories': total_calories,
-                    'meal_count': meals.count()
+                    'total_calories': rollup.calories_consumed,
+                    'meal_count': rollup.meal_count
                 },
                 'activity': {
-                    'total_workout_minutes': total_workout_minutes,
-                    'total_calories_burned': total_calories_burned,
-                    'workout_count': workouts.count()
+                    'total_workout_minutes': rollup.workout_minutes,
+                    'total_calories_burned': rollup.calories_burned,
+                    'workout_count': rollup.workout_count
                 },
                 'hydration': {
-                    'total_water': total_water
+                    'total_water': rollup.water_intake
                 },
                 'sleep': {
-                    'duration': float(sleep_duration) if sleep_duration else 0,
-                    'quality': float(sleep_quality) if sleep_quality else 0
+                    'duration': float(rollup.sleep_duration) if rollup.sleep_duration else 0,
+                    'quality': float(rollup.avg_sleep_quality) if rollup.avg_sleep_quality else 0
                 },
                 'mood': {
-                    'average': float(avg_mood) if avg_mood else 0
+                    'average': float(rollup.avg_mood) if rollup.avg_mood else 0
                 },
                 'health_score': float(health_score.overall_score) if health_score else None
             }
             
             daily_summaries.append(daily_summary)
-            current_date += timedelta(days=1)
         
         # Calculate weekly totals and averages
         weekly_totals = {
@@ -492,6 +474,7 @@ class ReportGenerationViewSet(viewsets.ViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cache_response
     def monthly(self, request):
         """
         Generate a monthly report.
@@ -510,6 +493,16 @@ class ReportGenerationViewSet(viewsets.ViewSet):
         _, last_day = monthrange(year, month)
         end_date = date(year, month, last_day)
         
+        # Read the month's daily rollups and health scores once; the weekly
+        # periods below are summed from them in memory
+        rollups = get_rollups(request.user, start_date, end_date)
+        health_scores = list(
+            HealthScore.objects.filter(
+                user=request.user,
+                calculation_date__range=(start_date, end_date)
+            ).order_by('calculation_date')
+        )
+        
         # Get weekly summaries for the month
         weekly_summaries = []
         
@@ -536,35 +529,19 @@ class ReportGenerationViewSet(viewsets.ViewSet):
             report_end = min(week_end, end_date)
             
             # Calculate weekly averages and totals for this period
+            period = [rollup for rollup in rollups if report_start <= rollup.date <= report_end]
             
-            # Nutrition
-            meals = MealLog.objects.filter(
-                user=request.user,
-                date__range=(report_start, report_end)
-            )
-            total_calories = meals.aggregate(total=Sum('total_calories'))['total'] or 0
-            
-            # Activity
-            workouts = WorkoutLog.objects.filter(
-                user=request.user,
-                date__range=(report_start, report_end)
-            )
-            total_workout_minutes = workouts.aggregate(total=Sum('duration'))['total'] or 0
-            total_calories_burned = workouts.aggregate(total=Sum('calories_burned'))['total'] or 0
-            
-            # Water
-            water_logs = WaterLog.objects.filter(
-                user=request.user,
-                date__range=(report_start, report_end)
-            )
-            total_water = water_logs.aggregate(total=Sum('amount'))['total'] or 0
+            total_calories = sum(rollup.calories_consumed for rollup in period)
+            total_workout_minutes = sum(rollup.workout_minutes for rollup in period)
+            total_calories_burned = sum(rollup.calories_burned for rollup in period)
+            total_water = sum(rollup.water_intake for rollup in period)
             
             # Health Scores
-            health_scores = HealthScore.objects.filter(
-                user=request.user,
-                calculation_date__range=(report_start, report_end)
-            )
-            avg_health_score = health_scores.aggregate(avg=Avg('overall_score'))['avg'] or 0
+            period_scores = [
+                score.overall_score for score in health_scores
+                if report_start <= score.calculation_date <= report_end
+            ]
+            avg_health_score = sum(period_scores) / len(period_scores) if period_scores else 0
             
             # Days in this period
             days_in_period = (report_end - report_start).days + 1
@@ -613,14 +590,6 @@ class ReportGenerationViewSet(viewsets.ViewSet):
         
         # Get health metrics for the month
         
-        # Mood trend
-        mood_logs = MoodLog.objects.filter(
-            user=request.user,
-            date__range=(start_date, end_date)
-        )
-        
-        avg_mood = mood_logs.aggregate(avg=Avg('mood'))['avg'] or 0
-        
         # Weight trend
         vitals_logs = VitalsLog.objects.filter(
             user=request.user,
@@ -640,13 +609,8 @@ class ReportGenerationViewSet(viewsets.ViewSet):
                 weight_end = float(last_log.weight)
         
         # Health score trend
-        health_scores = HealthScore.objects.filter(
-            user=request.user,
-            calculation_date__range=(start_date, end_date)
-        ).order_by('calculation_date')
-        
         health_score_trend = []
-        if health_scores.exists():
+        if health_scores:
             for score in health_scores:
                 health_score_trend.append({
                     'date': score.calculation_date.strftime('%Y-%m-%d'),
@@ -715,12 +679,7 @@ class ReportGenerationViewSet(viewsets.ViewSet):
         # This is a simplified version; a real implementation would be more sophisticated
         
         # Get all workout days in the month
-        workout_days = set(
-            WorkoutLog.objects.filter(
-                user=request.user,
-                date__range=(start_date, end_date)
-            ).values_list('date', flat=True)
-        )
+        workout_days = {rollup.date for rollup in rollups if rollup.workout_count}
         
         # Check for streaks
         current_streak = 0